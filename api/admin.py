@@ -1,15 +1,26 @@
 # api/admin.py
 from django import forms
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.functional import cached_property
 from django.forms.models import BaseInlineFormSet  # <-- BaseInlineFormSet'ni import qilamiz
-from django.core.exceptions import ValidationError  # <-- ValidationError'ni import qilamiz
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.utils.translation import gettext_lazy as _
+from django.utils import timezone
 import datetime  # <-- datetime'ni import qilamiz
 from datetime import time, timedelta  # <-- time va timedelta'ni ham import qilamiz
 
 # Modellar importi
 from .models import (
-    User, Category, Product, Branch, WorkingHours, Order, OrderItem, Promotion
+    User, Category, Product, Branch, WorkingHours, Order, OrderItem, Promotion, GDriveSyncJob,
+    OrderNotification, BranchEtaProfile
 )
 
 # Parler Admin importlari (agar kerak bo'lsa)
@@ -183,6 +194,10 @@ class OrderItemInline(admin.TabularInline):
     fields = ('product', 'quantity', 'price_per_unit', 'total_price')
     readonly_fields = ('product', 'quantity', 'price_per_unit', 'total_price')
 
+    def get_queryset(self, request):
+        # Mahsulot nomi (tarjima) har bir qator uchun alohida so'ralmasin
+        return super().get_queryset(request).select_related('product').prefetch_related('product__translations')
+
     # Yangi item qo'shish yoki o'chirishni taqiqlash
     def has_add_permission(self, request, obj=None):
         return False
@@ -191,19 +206,67 @@ class OrderItemInline(admin.TabularInline):
         return False
 
 
+# --- Buyurtmalar paneli ---
+# Bundan kichik jadvallarda taxmin emas, aniq COUNT ishlatiladi
+ESTIMATED_COUNT_THRESHOLD = 10_000
+# O'zgartirish ro'yxatida yuklanadigan maydonlar (qolganlari faqat tahrirlash sahifasida kerak)
+ORDER_BOARD_FIELDS = (
+    'id', 'status', 'delivery_type', 'total_price', 'item_count', 'contents_summary', 'created_at',
+    'user', 'user__username', 'user__phone_number',
+    'pickup_branch', 'pickup_branch__name', 'delivery_branch', 'delivery_branch__name',
+)
+# Navbat sahifasidagi "keyingi qadam" tugmasi: joriy holat -> yangi holat
+QUEUE_NEXT_STATUS = {'new': 'preparing', 'on_the_way': 'delivered'}
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Filtrsiz ro'yxat uchun (PostgreSQL) COUNT(*) o'rniga jadval statistikasidagi taxminiy qatorlar soni.
+    Filtr/qidiruv bo'lsa - aniq COUNT (bunda natija odatda kichik va indeks ishlatiladi).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                               [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+                return row[0]
+        return super().count
+
+
+class OrderChangeList(ChangeList):
+    def get_queryset(self, request, *args, **kwargs):
+        # Faqat ro'yxat ustunlari uchun kerakli maydonlar (address, notes va h.k. yuklanmaydi)
+        return super().get_queryset(request, *args, **kwargs).only(*ORDER_BOARD_FIELDS)
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'status', 'delivery_type', 'total_price', 'pickup_branch', 'created_at')
-    list_filter = ('status', 'delivery_type', 'created_at', 'pickup_branch')
-    search_fields = ('id', 'user__username', 'user__phone_number', 'address')
+    list_display = ('id', 'user', 'status', 'delivery_type', 'total_price', 'item_count', 'contents_display',
+                    'pickup_branch', 'delivery_branch', 'created_at')
+    list_filter = ('status', 'delivery_type', 'created_at', 'pickup_branch', 'delivery_branch')
+    list_select_related = ('user', 'pickup_branch', 'delivery_branch')
+    search_fields = ('=id', 'user__username', 'user__phone_number', 'address')
     list_display_links = ('id', 'user')  # ID va User ustunlarini link qilamiz
-    date_hierarchy = 'created_at'  # Sana bo'yicha tezkor navigatsiya
+    # date_hierarchy ishlatilmaydi: u har sahifada butun jadval bo'yicha MIN/MAX va sanalar ro'yxatini so'raydi.
+    # Sana bo'yicha filtr list_filter'dagi 'created_at' orqali (order_created_idx indeksidan foydalanadi)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # Filtrlangan ro'yxatda qo'shimcha COUNT(*) so'rovi bo'lmasin
+    change_list_template = 'admin/api/order/change_list.html'
+    actions = ['mark_preparing', 'mark_on_the_way', 'mark_delivered', 'mark_cancelled']
     inlines = [OrderItemInline]  # OrderItem'larni shu yerda ko'rsatamiz
 
     # Buyurtmani tahrirlash formasida ko'p maydonlarni faqat o'qish uchun qilamiz
     readonly_fields = (
         'user', 'total_price', 'created_at', 'updated_at',
-        'estimated_ready_at', 'estimated_delivery_at'  # Bu maydonlar avtomatik hisoblanadi
+        'estimated_ready_at', 'estimated_delivery_at',  # Bu maydonlar avtomatik hisoblanadi
+        'preparing_at', 'ready_at', 'on_the_way_at', 'delivered_at',
+        'item_count', 'contents_display',
         # Agar buyurtma statusini faqat API orqali o'zgartirmoqchi bo'lsak:
         # 'status', 'delivery_type', 'address', 'latitude', 'longitude',
         # 'payment_type', 'notes', 'pickup_branch'
@@ -214,22 +277,122 @@ class OrderAdmin(admin.ModelAdmin):
     # Buyurtma formasidagi maydonlarni guruhlash (ixtiyoriy)
     fieldsets = (
         (None, {
-            'fields': ('user', 'status', 'total_price')
+            'fields': ('user', 'status', 'total_price', 'item_count', 'contents_display')
         }),
         ('Yetkazib Berish/Olib Ketish', {
-            'fields': ('delivery_type', 'pickup_branch', 'address', 'latitude', 'longitude')
+            'fields': ('delivery_type', 'pickup_branch', 'delivery_branch', 'address', 'latitude', 'longitude')
         }),
         ('To\'lov va Izohlar', {
             'fields': ('payment_type', 'notes')
         }),
         ('Taxminiy Vaqtlar', {
-            'fields': ('estimated_ready_at', 'estimated_delivery_at')
+            'fields': ('estimated_ready_at', 'estimated_delivery_at', 'preparing_at', 'ready_at', 'on_the_way_at',
+                       'delivered_at')
         }),
         ('Sana', {
             'fields': ('created_at', 'updated_at')
         }),
     )
 
+    def get_changelist(self, request, **kwargs):
+        return OrderChangeList
+
+    @admin.display(description=_("Tarkib"))
+    def contents_display(self, obj):
+        # Checkout paytidagi nusxa: OrderItem/Product'ga so'rov yubormaydi
+        return obj.get_contents_summary()
+
+    # --- Ommaviy holat o'zgartirish ---
+    def _bulk_transition(self, request, order_ids, new_status):
+        """Bitta UPDATE (Order.objects.transition): bildirishnomalar navbatga qo'yiladi, signal yuboriladi."""
+        order_ids = list(order_ids)
+        changed = Order.objects.transition(order_ids, new_status, Order.ALLOWED_TRANSITIONS[new_status])
+        status_label = dict(Order.STATUS_CHOICES)[new_status]
+        if changed:
+            self.message_user(request, _("%(count)d ta buyurtma holati: %(status)s") % {
+                'count': len(changed), 'status': status_label}, messages.SUCCESS)
+        skipped = len(order_ids) - len(changed)
+        if skipped:
+            self.message_user(request, _("%(count)d ta buyurtma o'tkazib yuborildi (bu holatga o'tkazib bo'lmaydi)") % {
+                'count': skipped}, messages.WARNING)
+        return changed
+
+    @admin.action(description=_("Tayyorlanmoqda deb belgilash"), permissions=['change'])
+    def mark_preparing(self, request, queryset):
+        self._bulk_transition(request, queryset.values_list('pk', flat=True), 'preparing')
+
+    @admin.action(description=_("Yo'lda deb belgilash"), permissions=['change'])
+    def mark_on_the_way(self, request, queryset):
+        self._bulk_transition(request, queryset.values_list('pk', flat=True), 'on_the_way')
+
+    @admin.action(description=_("Yetkazildi deb belgilash"), permissions=['change'])
+    def mark_delivered(self, request, queryset):
+        self._bulk_transition(request, queryset.values_list('pk', flat=True), 'delivered')
+
+    @admin.action(description=_("Bekor qilish"), permissions=['change'])
+    def mark_cancelled(self, request, queryset):
+        self._bulk_transition(request, queryset.values_list('pk', flat=True), 'cancelled')
+
+    # --- Oshxona navbati ---
+    def get_urls(self):
+        urls = [
+            path('queue/', self.admin_site.admin_view(self.queue_view),
+                 name=f"{self.opts.app_label}_{self.opts.model_name}_queue"),
+        ]
+        return urls + super().get_urls()
+
+    def queue_view(self, request):
+        """
+        Aktiv buyurtmalar (yangi/tayyorlanmoqda/yo'lda) holatlar bo'yicha ustunlarda, eskisi birinchi.
+        Sahifa ADMIN_ORDER_QUEUE_REFRESH sekundda yangilanadi; so'rov order_active_queue_idx qisman indeksidan o'qiydi.
+        """
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+        if request.method == 'POST':
+            if not self.has_change_permission(request):
+                raise PermissionDenied
+            new_status = request.POST.get('status')
+            order_id = request.POST.get('order_id', '')
+            if new_status in Order.ALLOWED_TRANSITIONS and order_id.isdigit():
+                self._bulk_transition(request, [int(order_id)], new_status)
+            return redirect(request.get_full_path())
+
+        branch_id = request.GET.get('branch', '')
+        orders = (Order.objects.filter(status__in=Order.ACTIVE_STATUSES)
+                  .select_related('pickup_branch', 'delivery_branch')
+                  .only('id', 'status', 'delivery_type', 'total_price', 'item_count', 'contents_summary',
+                        'created_at', 'estimated_ready_at', 'estimated_delivery_at',
+                        'pickup_branch', 'pickup_branch__name', 'delivery_branch', 'delivery_branch__name')
+                  .order_by('created_at'))
+        if branch_id.isdigit():
+            orders = orders.filter(Q(pickup_branch_id=branch_id) | Q(delivery_branch_id=branch_id))
+        limit = getattr(settings, 'ADMIN_ORDER_QUEUE_LIMIT', 200)
+        orders = list(orders[:limit])
+
+        status_labels = dict(Order.STATUS_CHOICES)
+        columns = {status: [] for status in Order.ACTIVE_STATUSES}
+        for order in orders:
+            next_status = QUEUE_NEXT_STATUS.get(order.status)
+            if order.status == 'preparing':
+                next_status = 'on_the_way' if order.delivery_type == 'delivery' else 'delivered'
+            order.next_status = next_status
+            order.next_status_label = status_labels[next_status]
+            order.can_cancel = order.status in Order.ALLOWED_TRANSITIONS['cancelled']
+            columns[order.status].append(order)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.opts,
+            'title': _("Oshxona navbati"),
+            'columns': [(status, status_labels[status], columns[status]) for status in Order.ACTIVE_STATUSES],
+            'branches': Branch.objects.filter(is_active=True).only('id', 'name').order_by('name'),
+            'selected_branch': branch_id,
+            'refresh_seconds': getattr(settings, 'ADMIN_ORDER_QUEUE_REFRESH', 15),
+            'truncated': len(orders) >= limit,
+            'has_change_permission': self.has_change_permission(request),
+        }
+        return TemplateResponse(request, 'admin/api/order/queue.html', context)
+
 
 @admin.register(Promotion)
 class PromotionAdmin(TranslatableAdmin):  # <-- TranslatableAdmin dan meros olamiz
@@ -254,3 +417,46 @@ class PromotionAdmin(TranslatableAdmin):  # <-- TranslatableAdmin dan meros olam
 
     is_currently_active_display.boolean = True
     is_currently_active_display.short_description = _("Hozir Aktivmi?")
+
+
+@admin.register(GDriveSyncJob)
+class GDriveSyncJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'action', 'content_type', 'object_id', 'status', 'attempts', 'next_attempt_at', 'updated_at')
+    list_filter = ('status', 'action', 'content_type')
+    search_fields = ('object_id', 'drive_file_id', 'image_name')
+    readonly_fields = [field.name for field in GDriveSyncJob._meta.fields]
+    actions = ['retry_jobs']
+
+    @admin.action(description=_("Tanlangan vazifalarni qayta navbatga qo'yish"))
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status='done').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now(), locked_at=None
+        )
+        self.message_user(request, _("%(count)d ta vazifa qayta navbatga qo'yildi.") % {'count': updated})
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(OrderNotification)
+class OrderNotificationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'order', 'user', 'order_status', 'state', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('state', 'order_status')
+    search_fields = ('order__id', 'user__telegram_id')
+    list_select_related = ('user',)
+    readonly_fields = [field.name for field in OrderNotification._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(BranchEtaProfile)
+class BranchEtaProfileAdmin(admin.ModelAdmin):
+    list_display = ('branch', 'kind', 'hour', 'sample_count', 'p50_minutes', 'p80_minutes', 'p90_minutes',
+                    'updated_at')
+    list_filter = ('kind', 'branch')
+    list_select_related = ('branch',)
+    readonly_fields = [field.name for field in BranchEtaProfile._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,188 @@
+# api/branch_routing.py
+"""
+Yetkazib berish buyurtmasi uchun filial tanlash: mijoz koordinatalariga eng yaqin ochiq filial.
+Aktiv filiallar jarayon xotirasidagi k-d daraxtda saqlanadi (nuqtalar - birlik sferadagi 3D vektorlar,
+shuning uchun qutb/meridian chegaralarida ham to'g'ri ishlaydi). Indeks filial yoki ish vaqti
+o'zgarganda (signals.py) versiya orqali qayta quriladi.
+"""
+import math
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6_371_000
+ROUTING_VERSION_KEY = 'branch_routing:version'
+# Lokal xotira keshida boshqa jarayondagi o'zgarish shu muddatdan keyin albatta ko'rinadi
+BRANCH_ROUTING_INDEX_TTL = getattr(settings, 'BRANCH_ROUTING_INDEX_TTL', 5 * 60)
+
+RouteResult = namedtuple('RouteResult', ['branch', 'distance_m', 'is_open'])
+
+
+# --- Geometriya ---
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Ikki nuqta orasidagi masofa (metr)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _to_unit_vector(lat: float, lon: float) -> tuple:
+    phi, lam = math.radians(lat), math.radians(lon)
+    cos_phi = math.cos(phi)
+    return cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi)
+
+
+def _squared_chord(a: tuple, b: tuple) -> float:
+    # Vatar uzunligi markaziy burchak bilan monoton o'sadi: eng yaqin vatar = eng yaqin haversine
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+
+# --- k-d daraxt ---
+class _Node:
+    __slots__ = ('point', 'item', 'axis', 'left', 'right')
+
+    def __init__(self, point, item, axis, left, right):
+        self.point = point
+        self.item = item
+        self.axis = axis
+        self.left = left
+        self.right = right
+
+
+class BranchIndex:
+    """Filiallar uchun 3D k-d daraxt. Qurish O(n log n), qidiruv o'rtacha O(log n)."""
+
+    def __init__(self, branches):
+        self.branches = list(branches)
+        entries = [(_to_unit_vector(b.latitude, b.longitude), b) for b in self.branches]
+        self.root = self._build(entries, 0)
+
+    def __len__(self):
+        return len(self.branches)
+
+    def _build(self, entries, depth):
+        if not entries:
+            return None
+        axis = depth % 3
+        entries.sort(key=lambda entry: entry[0][axis])
+        median = len(entries) // 2
+        point, item = entries[median]
+        return _Node(point, item, axis,
+                     self._build(entries[:median], depth + 1),
+                     self._build(entries[median + 1:], depth + 1))
+
+    def nearest(self, latitude: float, longitude: float, predicate=None):
+        """Eng yaqin filial (predicate berilsa - shartga mos keladiganlari ichida). Topilmasa None."""
+        target = _to_unit_vector(latitude, longitude)
+        best = [None, math.inf]  # [branch, squared_chord]
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            distance = _squared_chord(node.point, target)
+            if distance < best[1] and (predicate is None or predicate(node.item)):
+                best[0], best[1] = node.item, distance
+            diff = target[node.axis] - node.point[node.axis]
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            # Uzoq tomon faqat bo'luvchi tekislik joriy eng yaxshi masofadan yaqin bo'lsa ko'riladi
+            if far is not None and diff * diff < best[1]:
+                stack.append(far)
+            stack.append(near)  # Avval yaqin tomon (stack oxiri birinchi olinadi)
+        return best[0]
+
+
+def linear_nearest(branches, latitude: float, longitude: float, predicate=None):
+    """Indekssiz qidiruv (benchmark va tekshiruv uchun)."""
+    candidates = [b for b in branches if predicate is None or predicate(b)]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda b: haversine_m(latitude, longitude, b.latitude, b.longitude))
+
+
+# --- Indeks keshi ---
+_index_lock = threading.Lock()
+_index_state = {'index': None, 'version': None, 'built_at': 0.0}
+
+
+def _current_version():
+    version = cache.get(ROUTING_VERSION_KEY)
+    if version is None:
+        version = int(time.time() * 1000)
+        if not cache.add(ROUTING_VERSION_KEY, version, timeout=None):
+            version = cache.get(ROUTING_VERSION_KEY) or version
+    return version
+
+
+def _load_active_branches():
+    from .models import Branch
+    branches = list(Branch.objects.filter(is_active=True).prefetch_related('working_hours'))
+    for branch in branches:
+        branch.get_schedule()  # Jadval indeks bilan birga bir marta quriladi
+    return branches
+
+
+def get_branch_index() -> BranchIndex:
+    """Joriy versiyadagi indeks (versiya o'zgargan yoki TTL o'tgan bo'lsa qayta quriladi)."""
+    version = _current_version()
+    state = _index_state
+    if (state['index'] is not None and state['version'] == version
+            and time.monotonic() - state['built_at'] < BRANCH_ROUTING_INDEX_TTL):
+        return state['index']
+    with _index_lock:
+        if (state['index'] is None or state['version'] != version
+                or time.monotonic() - state['built_at'] >= BRANCH_ROUTING_INDEX_TTL):
+            index = BranchIndex(_load_active_branches())
+            state.update(index=index, version=version, built_at=time.monotonic())
+            logger.info(f"Branch routing index built: {len(index)} active branches (version {version}).")
+        return state['index']
+
+
+def invalidate_branch_index(reason: str = '') -> None:
+    """Filial/ish vaqti o'zgarganda: barcha jarayonlar indeksni commit'dan keyin qayta quradi."""
+
+    def _bump():
+        cache.set(ROUTING_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        logger.debug(f"Branch routing index invalidated ({reason})")
+
+    transaction.on_commit(_bump)
+
+
+# --- Marshrutlash ---
+def route_delivery(latitude: float | None, longitude: float | None, now=None) -> RouteResult | None:
+    """
+    Eng yaqin ochiq aktiv filial. Ochiq filial bo'lmasa - eng yaqin aktiv filial (is_open=False).
+    Koordinatalar bo'lmasa - nom bo'yicha birinchi ochiq filial (masofa None).
+    """
+    index = get_branch_index()
+    if not len(index):
+        logger.warning("No active branches available AT ALL for delivery routing.")
+        return None
+    now = now or timezone.now()
+
+    def is_open(branch):
+        return branch.is_open_at(now)
+
+    if latitude is None or longitude is None:
+        branch = next((b for b in index.branches if is_open(b)), None)
+        if branch is not None:
+            return RouteResult(branch, None, True)
+        logger.warning(f"No OPEN branches found for delivery. Using first ACTIVE branch {index.branches[0].pk}.")
+        return RouteResult(index.branches[0], None, False)
+
+    branch = index.nearest(latitude, longitude, predicate=is_open)
+    opened = branch is not None
+    if not opened:
+        branch = index.nearest(latitude, longitude)
+        logger.warning(f"No OPEN branches found for delivery. Using nearest ACTIVE branch {branch.pk}.")
+    return RouteResult(branch, haversine_m(latitude, longitude, branch.latitude, branch.longitude), opened)
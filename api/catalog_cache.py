@@ -0,0 +1,187 @@
+# api/catalog_cache.py
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.utils import translation
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+# Katalog versiyasi va oxirgi o'zgarish vaqti shu kalitda saqlanadi.
+# Kalit ham snapshot muddati bilan eskiradi: lokal xotira keshida boshqa jarayondagi
+# o'zgarishlar shu muddatdan keyin albatta ko'rinadi.
+CATALOG_STATE_KEY = 'catalog:state'
+CATALOG_SNAPSHOT_TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 60)
+# Bot keshi (bot/utils/api_cache.py) shu kanalni LISTEN qiladi; payload - scope ('catalog', 'branches', ...)
+BOT_CACHE_CHANNEL = 'bot_cache_invalidate'
+
+
+# --- Katalog versiyasi ---
+def _new_state() -> dict:
+    now = time.time()
+    return {'version': int(now * 1000), 'last_modified': int(now)}
+
+
+def get_catalog_state() -> dict:
+    """Joriy katalog versiyasini qaytaradi (keshda bo'lmasa yangisini yaratadi)."""
+    state = cache.get(CATALOG_STATE_KEY)
+    if state is None:
+        state = _new_state()
+        # Boshqa jarayon allaqachon yozgan bo'lsa, o'shanisini olamiz
+        if not cache.add(CATALOG_STATE_KEY, state, timeout=CATALOG_SNAPSHOT_TIMEOUT):
+            state = cache.get(CATALOG_STATE_KEY) or state
+    return state
+
+
+def bump_catalog_version(reason: str = '') -> None:
+    """Katalog versiyasini yangilaydi. Eski snapshotlar endi ishlatilmaydi."""
+
+    def _bump():
+        state = _new_state()
+        cache.set(CATALOG_STATE_KEY, state, timeout=CATALOG_SNAPSHOT_TIMEOUT)
+        logger.info(f"Catalog version bumped to {state['version']} ({reason})")
+        _notify_bot_cache('catalog')
+
+    # Tranzaksiya tugamasdan yangi versiya bilan eski ma'lumot keshga tushmasligi uchun
+    transaction.on_commit(_bump)
+
+
+# --- Bot keshini yangilash (PostgreSQL LISTEN/NOTIFY) ---
+def _notify_bot_cache(scope: str) -> None:
+    if connection.vendor != 'postgresql':
+        return  # Boshqa bazalarda bot keshi faqat TTL bilan yangilanadi
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [BOT_CACHE_CHANNEL, scope])
+    except DatabaseError as e:
+        logger.warning(f"Bot cache invalidation ({scope}) not sent: {e}")
+
+
+def publish_cache_invalidation(scope: str) -> None:
+    """Bot keshidagi shu scope ma'lumotlarini eskirgan deb belgilash (tranzaksiya commit bo'lgandan keyin)."""
+    transaction.on_commit(lambda: _notify_bot_cache(scope))
+
+
+def drop_local_versions(scope: str | None) -> None:
+    """
+    Bot va API bitta jarayonda (BOT_API_TRANSPORT=inprocess) bo'lganda bot listener'i chaqiradi: boshqa jarayondagi
+    o'zgarish (pg_notify) shu jarayon keshidagi versiya kalitlarini ham eskirtiradi. Aks holda lokal xotira keshida
+    in-process view'lar eski snapshotni CATALOG_CACHE_TIMEOUT o'tguncha qaytaradi. Filial ish jadvallari
+    (schedule.py) kaliti ROUTING_VERSION_KEY'ga bog'liq, shuning uchun ular ham birga eskiradi. scope None - hammasi.
+    """
+    from .branch_routing import ROUTING_VERSION_KEY
+    keys = []
+    if scope in (None, 'catalog'):
+        keys.append(CATALOG_STATE_KEY)
+    if scope in (None, 'branches'):
+        keys.append(ROUTING_VERSION_KEY)
+    if keys:
+        cache.delete_many(keys)
+        logger.debug(f"Local cache versions dropped for scope {scope}: {keys}")
+
+
+# --- Snapshot ---
+def _snapshot_key(kind: str, lang: str, version: int) -> str:
+    return f"catalog:snapshot:{kind}:{lang}:{version}"
+
+
+def get_catalog_snapshot(kind: str, lang: str, version: int, build_items) -> dict:
+    """
+    Tilga xos snapshotni keshdan oladi yoki build_items() orqali bir marta yaratadi.
+    Snapshot: {'items': [...], 'index': {id: position}}
+    """
+    key = _snapshot_key(kind, lang, version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        items = list(build_items())
+        snapshot = {
+            'items': items,
+            'index': {item['id']: position for position, item in enumerate(items)},
+        }
+        cache.set(key, snapshot, timeout=CATALOG_SNAPSHOT_TIMEOUT)
+        logger.info(f"Catalog snapshot built: {key} ({len(items)} items)")
+    return snapshot
+
+
+# --- ViewSet mixin ---
+class CatalogSnapshotMixin:
+    """
+    ReadOnlyModelViewSet uchun: list/retrieve javoblarini keshdagi snapshotdan beradi
+    va ETag/Last-Modified orqali 304 javoblarini qo'llab-quvvatlaydi.
+    """
+    snapshot_kind = None
+    # Shu parametrlar bo'lsa, oddiy (DB) yo'lga qaytamiz
+    snapshot_bypass_params = ()
+
+    def get_snapshot_queryset(self):
+        return self.get_queryset()
+
+    def filter_snapshot_items(self, items):
+        """Snapshot elementlarini so'rov parametrlariga qarab filtrlash (kerak bo'lsa)."""
+        return items
+
+    def use_snapshot(self) -> bool:
+        return not any(self.request.query_params.get(param) for param in self.snapshot_bypass_params)
+
+    def _build_snapshot_items(self):
+        serializer = self.get_serializer(self.get_snapshot_queryset(), many=True)
+        return [dict(item) for item in serializer.data]
+
+    def _get_validators(self, state: dict, lang: str):
+        etag = quote_etag(f"{self.snapshot_kind}-{lang}-{state['version']}")
+        return etag, state['last_modified']
+
+    def _finalize_cached_response(self, response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Accept-Language',))
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def _cached_response(self, request, build_data):
+        state = get_catalog_state()
+        lang = translation.get_language() or settings.LANGUAGE_CODE
+        etag, last_modified = self._get_validators(state, lang)
+
+        # Avval arzon tekshiruv: mijozdagi nusxa hali ham yangimi?
+        not_modified = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return self._finalize_cached_response(not_modified, etag, last_modified)
+
+        snapshot = get_catalog_snapshot(self.snapshot_kind, lang, state['version'], self._build_snapshot_items)
+        response = build_data(snapshot)
+        return self._finalize_cached_response(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_snapshot():
+            return super().list(request, *args, **kwargs)
+
+        def build_data(snapshot):
+            items = self.filter_snapshot_items(snapshot['items'])
+            page = self.paginate_queryset(items)
+            if page is not None:
+                return self.get_paginated_response(page)
+            return Response(items)
+
+        return self._cached_response(request, build_data)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            object_id = int(kwargs[lookup_url_kwarg])
+        except (KeyError, TypeError, ValueError):
+            raise NotFound()
+
+        def build_data(snapshot):
+            position = snapshot['index'].get(object_id)
+            if position is None:
+                raise NotFound()
+            return Response(snapshot['items'][position])
+
+        return self._cached_response(request, build_data)
@@ -0,0 +1,226 @@
+# api/eta.py
+"""
+Buyurtma tayyor bo'lishi va yetkazilishi uchun taxminiy vaqt (ETA).
+Har bir filial va soat uchun tayyorlash (preparing -> on_the_way, pickup'da -> delivered) va yetkazish (on_the_way -> delivered)
+davomiyligining taqsimoti BranchEtaProfile jadvalida saqlanadi. Buyurtma holati o'zgarganda
+(order_status_changed) yangi namunalar gistogrammaga qo'shiladi, eski namunalar vazni asta-sekin kamayadi.
+Checkout'da profil keshdan o'qiladi; navbatdagi buyurtmalar soni alohida hisobga olinadi.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Branch, BranchEtaProfile, Order
+
+logger = logging.getLogger(__name__)
+
+ETA_BIN_MINUTES = getattr(settings, 'ETA_BIN_MINUTES', 2)
+ETA_MAX_MINUTES = getattr(settings, 'ETA_MAX_MINUTES', 240)  # Bundan uzun davomiylik namuna sifatida olinmaydi
+ETA_DECAY = getattr(settings, 'ETA_DECAY', 0.99)  # Har bir yangi namunada eski vazn shu koeffitsientga ko'paytiriladi
+ETA_MIN_SAMPLES = getattr(settings, 'ETA_MIN_SAMPLES', 10)  # Profil shundan kam namunada ishlatilmaydi
+ETA_PROMISE_QUANTILE = getattr(settings, 'ETA_PROMISE_QUANTILE', 'p80')  # 'p50', 'p80' yoki 'p90'
+ETA_KITCHEN_PARALLELISM = getattr(settings, 'ETA_KITCHEN_PARALLELISM', 4)  # Bir vaqtda tayyorlanadigan buyurtmalar
+# Bundan eski "osilib qolgan" new/preparing buyurtmalar navbatga qo'shilmaydi
+ETA_QUEUE_WINDOW_HOURS = getattr(settings, 'ETA_QUEUE_WINDOW_HOURS', 6)
+ETA_PROFILE_CACHE_TIMEOUT = 60 * 60
+BIN_COUNT = ETA_MAX_MINUTES // ETA_BIN_MINUTES
+QUANTILES = (('p50', 0.5), ('p80', 0.8), ('p90', 0.9))
+QUEUE_STATUSES = ('new', 'preparing')
+
+DEFAULT_PREPARATION_MINUTES = 30
+DEFAULT_DELIVERY_MINUTES = 20
+
+
+# --- Gistogramma ---
+def add_sample(profile: BranchEtaProfile, minutes: float) -> None:
+    """Namunani profil gistogrammasiga qo'shadi (eski vazn ETA_DECAY ga kamayadi) va kvantillarni yangilaydi."""
+    histogram = profile.histogram if len(profile.histogram) == BIN_COUNT else [0.0] * BIN_COUNT
+    histogram = [weight * ETA_DECAY for weight in histogram]
+    histogram[min(int(minutes // ETA_BIN_MINUTES), BIN_COUNT - 1)] += 1.0
+    profile.histogram = histogram
+    profile.updated_at = timezone.now()  # bulk_update auto_now'ni to'ldirmaydi
+    profile.sample_count += 1
+    profile.weight = sum(histogram)
+    for name, q in QUANTILES:
+        setattr(profile, f"{name}_minutes", _quantile(histogram, profile.weight, q))
+
+
+def _quantile(histogram: list, total: float, q: float) -> float | None:
+    if total <= 0:
+        return None
+    target = q * total
+    cumulative = 0.0
+    for i, weight in enumerate(histogram):
+        if weight and cumulative + weight >= target:
+            # Bin ichida chiziqli interpolyatsiya
+            return round((i + (target - cumulative) / weight) * ETA_BIN_MINUTES, 1)
+        cumulative += weight
+    return float(ETA_MAX_MINUTES)
+
+
+# --- Namunalar ---
+def _order_samples(order: dict, stage: str | None = None):
+    """
+    Buyurtma vaqtlaridan (branch_id, kind, hour, minutes) namunalari.
+    stage - holat o'tishi ('on_the_way' yoki 'delivered'): faqat shu o'tishda yakunlangan bosqich namunasi
+    (har bir bosqich gistogrammaga bir marta tushadi); None - barcha bosqichlar (rebuild).
+    """
+    branch_id = order['delivery_branch_id'] or order['pickup_branch_id']
+    if branch_id is None:
+        return
+    on_the_way_at, delivered_at = order['on_the_way_at'], order['delivered_at']
+    # Tayyorlash on_the_way bilan tugaydi; pickup buyurtmalari esa preparing -> delivered to'g'ridan-to'g'ri o'tadi.
+    # ready_at ikkala holatda ham shu o'tishda yoziladi (undan oldingi buyurtmalarda - holat vaqtlaridan)
+    prep_end = order['ready_at'] or on_the_way_at or delivered_at
+    prep_end_stage = 'on_the_way' if on_the_way_at else 'delivered'
+    if prep_end is not None and stage in (None, prep_end_stage):
+        prep_start = order['preparing_at'] or order['created_at']
+        prep_minutes = (prep_end - prep_start).total_seconds() / 60
+        if 0 < prep_minutes <= ETA_MAX_MINUTES:
+            yield branch_id, 'prep', timezone.localtime(prep_start).hour, prep_minutes
+    if (order['delivery_type'] == 'delivery' and on_the_way_at and delivered_at
+            and stage in (None, 'delivered')):
+        delivery_minutes = (delivered_at - on_the_way_at).total_seconds() / 60
+        if 0 < delivery_minutes <= ETA_MAX_MINUTES:
+            yield branch_id, 'delivery', timezone.localtime(on_the_way_at).hour, delivery_minutes
+
+
+PROFILE_FIELDS = ['histogram', 'sample_count', 'weight', 'p50_minutes', 'p80_minutes', 'p90_minutes', 'updated_at']
+SAMPLE_FIELDS = ('delivery_branch_id', 'pickup_branch_id', 'delivery_type', 'created_at', 'preparing_at',
+                 'on_the_way_at', 'delivered_at', 'ready_at')
+
+
+def _apply_samples(samples, profiles: dict) -> None:
+    """samples: (branch_id, kind, hour, minutes). profiles: (branch_id, kind, hour) -> BranchEtaProfile."""
+    for branch_id, kind, hour, minutes in samples:
+        for key in ((branch_id, kind, hour), (branch_id, kind, BranchEtaProfile.ALL_HOURS)):
+            profile = profiles.get(key)
+            if profile is None:
+                profile = profiles[key] = BranchEtaProfile(branch_id=branch_id, kind=kind, hour=key[2])
+            add_sample(profile, minutes)
+
+
+def record_order_timings(order_ids, stage: str) -> int:
+    """
+    Buyurtmalar stage holatiga o'tganda shu o'tishda yakunlangan bosqichlar bo'yicha profillarni yangilaydi.
+    Qo'shilgan namunalar sonini qaytaradi.
+    """
+    orders = Order.objects.filter(pk__in=order_ids).values(*SAMPLE_FIELDS)
+    samples = [sample for order in orders for sample in _order_samples(order, stage)]
+    if not samples:
+        return 0
+    branch_ids = {branch_id for branch_id, _kind, _hour, _minutes in samples}
+    with transaction.atomic():
+        # Yangi qatorlar oldindan yaratiladi: parallel yangilanishlar bir xil qatorni qulflaydi
+        keys = {(b, k, h) for b, k, h, _m in samples}
+        keys |= {(b, k, BranchEtaProfile.ALL_HOURS) for b, k, _h in keys}
+        BranchEtaProfile.objects.bulk_create(
+            [BranchEtaProfile(branch_id=b, kind=k, hour=h) for b, k, h in keys], ignore_conflicts=True
+        )
+        rows = BranchEtaProfile.objects.select_for_update().filter(
+            branch_id__in=branch_ids, kind__in={k for _b, k, _h in keys}, hour__in={h for _b, _k, h in keys}
+        )
+        profiles = {(p.branch_id, p.kind, p.hour): p for p in rows if (p.branch_id, p.kind, p.hour) in keys}
+        _apply_samples(samples, profiles)
+        BranchEtaProfile.objects.bulk_update(profiles.values(), PROFILE_FIELDS)
+        transaction.on_commit(lambda: invalidate_eta_profiles(branch_ids))
+    logger.debug(f"ETA profiles updated from orders {list(order_ids)}: {len(samples)} samples.")
+    return len(samples)
+
+
+def rebuild_eta_profiles(since=None) -> int:
+    """Barcha profillarni buyurtmalar tarixidan qaytadan quradi (vaqt tartibida). Namunalar sonini qaytaradi."""
+    queryset = Order.objects.filter(Q(ready_at__isnull=False) | Q(on_the_way_at__isnull=False) | Q(delivered_at__isnull=False))
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    profiles = {}
+    count = 0
+    for order in queryset.order_by('created_at').values(*SAMPLE_FIELDS).iterator(chunk_size=2000):
+        samples = list(_order_samples(order))
+        count += len(samples)
+        _apply_samples(samples, profiles)
+    with transaction.atomic():
+        BranchEtaProfile.objects.all().delete()
+        BranchEtaProfile.objects.bulk_create(profiles.values(), batch_size=500)
+        # O'chirilgan profillar ham keshdan ketishi uchun barcha filiallar
+        branch_ids = list(Branch.objects.values_list('pk', flat=True))
+        transaction.on_commit(lambda: invalidate_eta_profiles(branch_ids))
+    logger.info(f"ETA profiles rebuilt: {len(profiles)} rows from {count} samples.")
+    return count
+
+
+# --- Kesh ---
+def _profile_cache_key(branch_id: int) -> str:
+    return f"eta_profile:{branch_id}"
+
+
+def get_branch_profiles(branch_id: int) -> dict:
+    """(kind, hour) -> {'p50', 'p80', 'p90', 'samples'}. Keshdan, bo'lmasa bitta so'rov bilan."""
+    profiles = cache.get(_profile_cache_key(branch_id))
+    if profiles is None:
+        rows = BranchEtaProfile.objects.filter(branch_id=branch_id).values_list(
+            'kind', 'hour', 'p50_minutes', 'p80_minutes', 'p90_minutes', 'sample_count')
+        profiles = {(kind, hour): {'p50': p50, 'p80': p80, 'p90': p90, 'samples': samples}
+                    for kind, hour, p50, p80, p90, samples in rows}
+        cache.set(_profile_cache_key(branch_id), profiles, timeout=ETA_PROFILE_CACHE_TIMEOUT)
+    return profiles
+
+
+def invalidate_eta_profiles(branch_ids) -> None:
+    cache.delete_many([_profile_cache_key(branch_id) for branch_id in branch_ids])
+
+
+# --- Taxmin ---
+def _profile_minutes(profiles: dict, kind: str, hour: int) -> float | None:
+    """Soatlik profil yetarli namunaga ega bo'lsa - o'sha, aks holda filialning umumiy profili."""
+    for key in ((kind, hour), (kind, BranchEtaProfile.ALL_HOURS)):
+        profile = profiles.get(key)
+        if profile and profile['samples'] >= ETA_MIN_SAMPLES and profile[ETA_PROMISE_QUANTILE] is not None:
+            return profile[ETA_PROMISE_QUANTILE]
+    return None
+
+
+def queue_depth(branch) -> int:
+    """Filialda hali tayyorlanib bo'lmagan (new/preparing) buyurtmalar soni."""
+    window_start = timezone.now() - timedelta(hours=ETA_QUEUE_WINDOW_HOURS)
+    return Order.objects.filter(
+        Q(delivery_branch=branch) | Q(pickup_branch=branch),
+        status__in=QUEUE_STATUSES, created_at__gte=window_start,
+    ).count()
+
+
+def estimate_times(branch, delivery_type, now=None, queue=None):
+    """
+    (estimated_ready_at, estimated_delivery_at). Tayyorlash va yetkazish vaqti filialning joriy soatdagi
+    o'rganilgan kvantilidan (ETA_PROMISE_QUANTILE), namunalar yetarli bo'lmasa - Branch'dagi o'rtacha
+    qiymatlardan olinadi. Navbat: oshxona ETA_KITCHEN_PARALLELISM ta buyurtmani bir vaqtda tayyorlaydi,
+    qolganlari oldingilari tayyor bo'lishini kutadi.
+    """
+    if branch is None:
+        return None, None
+    now = now or timezone.now()
+    profiles = get_branch_profiles(branch.pk)
+    local_now = timezone.localtime(now)
+
+    prep_minutes = _profile_minutes(profiles, 'prep', local_now.hour)
+    if prep_minutes is None:
+        prep_minutes = branch.avg_preparation_minutes or DEFAULT_PREPARATION_MINUTES
+    if queue is None:
+        queue = queue_depth(branch)
+    queue_minutes = (queue // max(ETA_KITCHEN_PARALLELISM, 1)) * prep_minutes
+    ready_at = now + timedelta(minutes=queue_minutes + prep_minutes)
+
+    delivery_at = None
+    if delivery_type == 'delivery':
+        delivery_minutes = _profile_minutes(profiles, 'delivery', timezone.localtime(ready_at).hour)
+        if delivery_minutes is None:
+            delivery_minutes = branch.avg_delivery_extra_minutes or DEFAULT_DELIVERY_MINUTES
+        delivery_at = ready_at + timedelta(minutes=delivery_minutes)
+    logger.debug(f"ETA for branch {branch.pk}: queue={queue}, prep={prep_minutes}, ready_at={ready_at}, "
+                 f"delivery_at={delivery_at}")
+    return ready_at, delivery_at
@@ -0,0 +1,202 @@
+# api/gdrive_jobs.py
+import os
+import random
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from .models import GDriveSyncJob, Category, Product, Promotion
+from .gdrive_utils import upload_to_drive, delete_from_drive
+from .catalog_cache import bump_catalog_version, publish_cache_invalidation
+
+logger = logging.getLogger(__name__)
+
+# Qayta urinish sozlamalari (sekundlarda)
+GDRIVE_JOB_MAX_ATTEMPTS = getattr(settings, 'GDRIVE_JOB_MAX_ATTEMPTS', 8)
+GDRIVE_JOB_BACKOFF_BASE = getattr(settings, 'GDRIVE_JOB_BACKOFF_BASE', 30)
+GDRIVE_JOB_BACKOFF_MAX = getattr(settings, 'GDRIVE_JOB_BACKOFF_MAX', 60 * 60)
+# Shu vaqtdan ko'p 'processing' holatida qolgan vazifa (worker o'chib qolgan) qayta olinadi
+GDRIVE_JOB_LOCK_TIMEOUT = getattr(settings, 'GDRIVE_JOB_LOCK_TIMEOUT', 15 * 60)
+
+GDRIVE_ID_FIELD = 'google_drive_file_id'
+GDRIVE_URL_FIELD = 'image_gdrive_url'
+
+
+class PermanentJobError(Exception):
+    """Qayta urinish foyda bermaydigan xatolik (masalan, lokal fayl yo'q)."""
+
+
+# --- Navbatga qo'yish ---
+def enqueue_upload(instance, image_field_name='image') -> GDriveSyncJob:
+    image_file = getattr(instance, image_field_name)
+    job = GDriveSyncJob.objects.create(
+        content_type=ContentType.objects.get_for_model(instance.__class__),
+        object_id=instance.pk,
+        action='upload',
+        image_name=image_file.name,
+        image_field=image_field_name,
+    )
+    logger.info(f"GDrive job #{job.pk}: upload queued for {instance._meta.model_name} PK:{instance.pk}")
+    return job
+
+
+def enqueue_delete(drive_file_id: str, instance=None) -> GDriveSyncJob | None:
+    if not drive_file_id:
+        return None
+    job = GDriveSyncJob.objects.create(
+        content_type=ContentType.objects.get_for_model(instance.__class__) if instance is not None else None,
+        object_id=instance.pk if instance is not None else None,
+        action='delete',
+        drive_file_id=drive_file_id,
+    )
+    logger.info(f"GDrive job #{job.pk}: delete queued for Drive file {drive_file_id}")
+    return job
+
+
+# --- Worker tomoni ---
+def compute_backoff(attempts: int) -> timedelta:
+    """Eksponensial kechikish + jitter (bir vaqtda qayta urinishlar to'planmasligi uchun)."""
+    delay = min(GDRIVE_JOB_BACKOFF_BASE * (2 ** max(attempts - 1, 0)), GDRIVE_JOB_BACKOFF_MAX)
+    return timedelta(seconds=random.uniform(delay / 2, delay))
+
+
+def claim_jobs(batch_size: int = 10) -> list[GDriveSyncJob]:
+    """
+    Bajarilishi kerak bo'lgan vazifalarni oladi va 'processing' deb belgilaydi.
+    Postgres'da SKIP LOCKED tufayli bir nechta worker bir vazifani ikki marta olmaydi.
+    """
+    now = timezone.now()
+    stale_lock = now - timedelta(seconds=GDRIVE_JOB_LOCK_TIMEOUT)
+    with transaction.atomic():
+        ready = (
+                GDriveSyncJob.objects.filter(status='pending', next_attempt_at__lte=now) |
+                GDriveSyncJob.objects.filter(status='processing', locked_at__lt=stale_lock)
+        )
+        jobs = list(
+            ready.select_for_update(skip_locked=True).order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if jobs:
+            GDriveSyncJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status='processing', locked_at=now, updated_at=now
+            )
+    return jobs
+
+
+def _finish(job: GDriveSyncJob, status: str, note: str = '') -> None:
+    GDriveSyncJob.objects.filter(pk=job.pk).update(
+        status=status, locked_at=None, last_error=note, updated_at=timezone.now()
+    )
+
+
+def _schedule_retry(job: GDriveSyncJob, error: str) -> None:
+    attempts = job.attempts + 1
+    now = timezone.now()
+    if attempts >= GDRIVE_JOB_MAX_ATTEMPTS:
+        logger.error(f"GDrive job #{job.pk}: giving up after {attempts} attempts. Last error: {error}")
+        GDriveSyncJob.objects.filter(pk=job.pk).update(
+            status='failed', attempts=attempts, locked_at=None, last_error=error, updated_at=now
+        )
+        return
+    next_attempt_at = now + compute_backoff(attempts)
+    logger.warning(f"GDrive job #{job.pk}: attempt {attempts} failed ({error}). Retry at {next_attempt_at}.")
+    GDriveSyncJob.objects.filter(pk=job.pk).update(
+        status='pending', attempts=attempts, locked_at=None, last_error=error,
+        next_attempt_at=next_attempt_at, updated_at=now
+    )
+
+
+def _process_upload(job: GDriveSyncJob) -> str:
+    model_class = job.content_type.model_class() if job.content_type else None
+    if model_class is None:
+        raise PermanentJobError("Content type not found")
+
+    instance = model_class.objects.filter(pk=job.object_id).first()
+    if instance is None:
+        return "Object deleted before upload"
+
+    image_file = getattr(instance, job.image_field)
+    if not image_file or image_file.name != job.image_name:
+        # Rasm shu orada yana o'zgargan: yangi vazifa uni yuklaydi
+        return "Image changed, superseded by a newer job"
+
+    local_path = image_file.path
+    if not os.path.exists(local_path):
+        raise PermanentJobError(f"Local file not found: {local_path}")
+
+    model_name = instance._meta.model_name
+    base_name, ext = os.path.splitext(os.path.basename(local_path))
+    drive_file_name = f"{model_name}_{instance.pk}_{base_name}{ext}"
+
+    new_id, new_url = upload_to_drive(local_path, drive_file_name)
+    if not (new_id and new_url):
+        raise RuntimeError(f"Upload failed for {local_path}")
+
+    old_id = getattr(instance, GDRIVE_ID_FIELD)
+    # Signallarsiz yangilash; rasm shu orada o'zgarmagan bo'lsagina yoziladi
+    updated = model_class.objects.filter(pk=instance.pk, **{job.image_field: job.image_name}).update(**{
+        GDRIVE_ID_FIELD: new_id,
+        GDRIVE_URL_FIELD: new_url,
+        job.image_field: None,
+    })
+    if not updated:
+        enqueue_delete(new_id, instance)  # Keraksiz bo'lib qolgan yangi faylni ham tozalaymiz
+        return "Image changed during upload, superseded by a newer job"
+
+    if model_class in (Category, Product):
+        bump_catalog_version(f"gdrive upload {model_name} PK:{instance.pk}")
+    elif model_class is Promotion:
+        # Aksiya rasmi URL'i o'zgardi: bot keshidagi aksiyalar ro'yxati eskirgan
+        publish_cache_invalidation('promotions')
+
+    if old_id and old_id != new_id:
+        enqueue_delete(old_id, instance)
+
+    try:
+        os.remove(local_path)
+        logger.info(f"GDrive job #{job.pk}: deleted local temp file {local_path}")
+    except OSError as e:
+        logger.error(f"GDrive job #{job.pk}: failed to delete local temp file {local_path}: {e}")
+    return f"Uploaded as {new_id}"
+
+
+def _process_delete(job: GDriveSyncJob) -> str:
+    if not delete_from_drive(job.drive_file_id):
+        raise RuntimeError(f"Delete failed for Drive file {job.drive_file_id}")
+    return f"Deleted {job.drive_file_id}"
+
+
+def process_job(job: GDriveSyncJob) -> None:
+    try:
+        if job.action == 'upload':
+            note = _process_upload(job)
+            status = 'done' if note.startswith('Uploaded') else 'skipped'
+        elif job.action == 'delete':
+            note = _process_delete(job)
+            status = 'done'
+        else:
+            raise PermanentJobError(f"Unknown action: {job.action}")
+    except PermanentJobError as e:
+        logger.error(f"GDrive job #{job.pk}: permanent error: {e}")
+        GDriveSyncJob.objects.filter(pk=job.pk).update(
+            status='failed', attempts=job.attempts + 1, locked_at=None, last_error=str(e), updated_at=timezone.now()
+        )
+        return
+    except Exception as e:
+        logger.error(f"GDrive job #{job.pk}: error: {e}", exc_info=True)
+        _schedule_retry(job, str(e))
+        return
+
+    logger.info(f"GDrive job #{job.pk}: {status} - {note}")
+    _finish(job, status, note if status == 'skipped' else '')
+
+
+def run_pending_jobs(batch_size: int = 10) -> int:
+    """Bir partiya vazifani bajaradi. Bajarilgan vazifalar sonini qaytaradi."""
+    jobs = claim_jobs(batch_size)
+    for job in jobs:
+        process_job(job)
+    return len(jobs)
@@ -1,46 +1,194 @@
 # api/gdrive_utils.py
 import os
+import uuid
+import shutil
 import logging
+import threading
+from pathlib import Path
+
 from pydrive2.auth import GoogleAuth
 from pydrive2.drive import GoogleDrive
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SERVICE_ACCOUNT_EMAIL = "chocoberry@chocoberryimage.iam.gserviceaccount.com"
 
-def _get_drive_service():
-    """Google Drive servisini autentifikatsiya qilib qaytaradi."""
-    gauth = GoogleAuth()
-    gauth.settings['client_config_backend'] = 'service'
-    gauth.settings['service_config'] = {
-        "client_json_file_path": settings.GOOGLE_DRIVE_CREDENTIALS_JSON_PATH,
-        "client_user_email": "chocoberry@chocoberryimage.iam.gserviceaccount.com"
-    }
-    logger.info("GDRIVE_UTIL: Authenticating GAuth service with service account...")
-    gauth.ServiceAuth()
-    logger.info("GDRIVE_UTIL: GAuth service authenticated. Creating GoogleDrive instance.")
-    return GoogleDrive(gauth)
 
+def build_public_url(file_id: str) -> str:
+    return f"https://drive.google.com/uc?export=view&id={file_id}"
 
-def upload_to_drive(local_file_path: str, drive_file_name: str, drive_folder_id: str = None) -> tuple[
-    str | None, str | None]:
-    try:
-        if not os.path.exists(local_file_path):
-            logger.error(f"GDrive Upload: File not found at path: {local_file_path}")
-            return None, None
 
-        drive = _get_drive_service()
+# --- Haqiqiy Google Drive (PyDrive2) ---
+class PyDrive2Backend:
+    """
+    Jarayon bo'yicha yagona, thread-safe Drive klienti.
+    Autentifikatsiya bir marta qilinadi, token muddati tugasa o'zi yangilanadi,
+    har bir thread o'zining avtorizatsiyalangan HTTP ulanishini qayta ishlatadi.
+    """
+
+    def __init__(self, credentials_path: str, client_user_email: str):
+        self.credentials_path = credentials_path
+        self.client_user_email = client_user_email
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._gauth = None
+        self._drive = None
+
+    def _authenticate(self):
+        gauth = GoogleAuth()
+        gauth.settings['client_config_backend'] = 'service'
+        gauth.settings['service_config'] = {
+            "client_json_file_path": self.credentials_path,
+            "client_user_email": self.client_user_email,
+        }
+        logger.info("GDRIVE_UTIL: Authenticating GAuth service with service account...")
+        gauth.ServiceAuth()
+        logger.info("GDRIVE_UTIL: GAuth service authenticated. Creating GoogleDrive instance.")
+        self._gauth = gauth
+        self._drive = GoogleDrive(gauth)
+
+    def _get_drive(self) -> GoogleDrive:
+        with self._lock:
+            if self._drive is None:
+                self._authenticate()
+            elif self._gauth.access_token_expired:
+                # To'liq qayta autentifikatsiya emas, faqat access tokenni yangilaymiz.
+                # Thread'lardagi HTTP obyektlari shu credentials obyektini ishlatadi.
+                logger.info("GDRIVE_UTIL: Access token expired, refreshing...")
+                try:
+                    self._gauth.Refresh()
+                except Exception as e:
+                    logger.warning(f"GDRIVE_UTIL: Token refresh failed ({e}), re-authenticating.")
+                    self._authenticate()
+                    self._local = threading.local()  # Eski credentials bilan bog'langan HTTP'larni tashlaymiz
+            return self._drive
+
+    def _http(self):
+        """Joriy thread uchun avtorizatsiyalangan (keep-alive) httplib2.Http obyekti."""
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = self._gauth.Get_Http_Object()
+            self._local.http = http
+        return http
+
+    def upload(self, local_file_path: str, drive_file_name: str, drive_folder_id: str = None) -> str:
+        drive = self._get_drive()
         file_metadata = {'title': drive_file_name}
         if drive_folder_id:
             file_metadata['parents'] = [{'id': drive_folder_id}]
 
         drive_file = drive.CreateFile(file_metadata)
         drive_file.SetContentFile(local_file_path)
-        drive_file.Upload()
-        drive_file.InsertPermission({'type': 'anyone', 'value': 'anyone', 'role': 'reader'})
+        drive_file.Upload(param={'http': self._http()})
+        # InsertPermission() ruxsatlar ro'yxatini qayta yuklaydi; bizga kerak emas, to'g'ridan-to'g'ri chaqiramiz
+        self._gauth.service.permissions().insert(
+            fileId=drive_file['id'],
+            body={'type': 'anyone', 'value': 'anyone', 'role': 'reader'},
+            supportsAllDrives=True,
+        ).execute(http=self._http())
+        return drive_file['id']
+
+    def delete(self, file_id: str) -> None:
+        drive = self._get_drive()
+        drive_file = drive.CreateFile({'id': file_id})
+        drive_file.Delete(param={'http': self._http()})
+
+    def public_url(self, file_id: str) -> str:
+        return build_public_url(file_id)
+
+
+# --- Lokal soxta Drive (test va tarmoqsiz ishlab chiqish uchun) ---
+class FakeDriveFileNotFound(Exception):
+    status = 404
+
+
+class LocalFakeDriveBackend:
+    """Fayllarni lokal papkaga nusxalaydi. Google'ga hech qanday so'rov yubormaydi."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def _path_for(self, file_id: str) -> Path | None:
+        matches = list(self.root.glob(f"{file_id}.*")) + list(self.root.glob(file_id))
+        return matches[0] if matches else None
+
+    def upload(self, local_file_path: str, drive_file_name: str, drive_folder_id: str = None) -> str:
+        file_id = f"fake-{uuid.uuid4().hex}"
+        ext = os.path.splitext(drive_file_name)[1]
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(local_file_path, self.root / f"{file_id}{ext}")
+        return file_id
 
-        file_id = drive_file['id']
-        direct_link = f"https://drive.google.com/uc?export=view&id={file_id}"
+    def delete(self, file_id: str) -> None:
+        with self._lock:
+            path = self._path_for(file_id)
+            if path is None:
+                raise FakeDriveFileNotFound(f"File {file_id} not found")
+            path.unlink()
+
+    def exists(self, file_id: str) -> bool:
+        return self._path_for(file_id) is not None
+
+    def public_url(self, file_id: str) -> str:
+        path = self._path_for(file_id)
+        return path.resolve().as_uri() if path else f"file://{self.root}/{file_id}"
+
+
+# --- Jarayon bo'yicha yagona klient ---
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_drive_client():
+    """Sozlamadagi GDRIVE_BACKEND bo'yicha yagona Drive klientini qaytaradi ('pydrive2' yoki 'fake')."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                backend = getattr(settings, 'GDRIVE_BACKEND', 'pydrive2')
+                if backend == 'fake':
+                    _client = LocalFakeDriveBackend(
+                        getattr(settings, 'GDRIVE_FAKE_ROOT', os.path.join(settings.BASE_DIR, 'gdrive_fake')))
+                else:
+                    _client = PyDrive2Backend(
+                        settings.GOOGLE_DRIVE_CREDENTIALS_JSON_PATH,
+                        getattr(settings, 'GDRIVE_SERVICE_ACCOUNT_EMAIL', DEFAULT_SERVICE_ACCOUNT_EMAIL),
+                    )
+                logger.info(f"GDRIVE_UTIL: Using {_client.__class__.__name__}")
+    return _client
+
+
+def reset_drive_client():
+    """Klientni tashlaydi (sozlama o'zgarganda yoki testlarda)."""
+    global _client
+    with _client_lock:
+        _client = None
+
+
+def _is_not_found(error: Exception) -> bool:
+    if getattr(error, 'status', None) == 404:
+        return True
+    resp = getattr(error, 'resp', None)
+    if resp is not None and getattr(resp, 'status', None) == 404:
+        return True
+    # PyDrive2 ApiRequestError: error = {'code': 404, ...}
+    details = getattr(error, 'error', None)
+    return isinstance(details, dict) and details.get('code') == 404
+
+
+def upload_to_drive(local_file_path: str, drive_file_name: str, drive_folder_id: str = None) -> tuple[
+    str | None, str | None]:
+    try:
+        if not os.path.exists(local_file_path):
+            logger.error(f"GDrive Upload: File not found at path: {local_file_path}")
+            return None, None
+
+        client = get_drive_client()
+        file_id = client.upload(local_file_path, drive_file_name, drive_folder_id)
+        direct_link = client.public_url(file_id)
 
         logger.info(f"GDrive Upload: File '{drive_file_name}' uploaded. ID: {file_id}")
         return file_id, direct_link
@@ -55,18 +203,14 @@ def delete_from_drive(file_id: str):
             logger.warning("GDrive Delete: No file ID provided for deletion.")
             return False
 
-        drive = _get_drive_service()
-        drive_file = drive.CreateFile({'id': file_id})
-        drive_file.Delete()
+        get_drive_client().delete(file_id)
         logger.info(f"GDrive Delete: File with ID {file_id} successfully deleted.")
         return True
     except Exception as e:
-        # Google API ba'zan fayl topilmasa ham xatolik bermasligi mumkin,
-        # lekin fayl topilmagani uchun "Cannot retrieve B medlem..." kabi xatolar berishi mumkin.
-        # Agar xato "File not found" yoki shunga o'xshash bo'lsa, warning qilsak yetarli.
-        if hasattr(e, 'resp') and e.resp.status == 404:
+        # Fayl topilmasa (allaqachon o'chirilgan yoki noto'g'ri ID), o'chirish muvaffaqiyatli deb hisoblaymiz
+        if _is_not_found(e):
             logger.warning(
                 f"GDrive Delete: File with ID {file_id} not found on GDrive (already deleted or invalid ID).")
-            return True  # Fayl yo'q bo'lsa, o'chirish muvaffaqiyatli deb hisoblaymiz
+            return True
         logger.error(f"GDrive Delete: Error deleting file with ID {file_id}: {e}", exc_info=True)
         return False
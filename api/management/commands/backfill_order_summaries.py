@@ -0,0 +1,46 @@
+# api/management/commands/backfill_order_summaries.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+
+from api.models import Order, OrderItem
+from api.services import build_order_summary
+
+SUMMARY_FIELDS = ['item_count', 'contents_summary', 'product_names']
+
+
+class Command(BaseCommand):
+    help = ("Checkout'dan oldingi buyurtmalar uchun tarkib nusxasini (item_count, contents_summary, "
+            "product_names) to'ldiradi. Buyurtmalar pk bo'yicha bo'laklarda o'qiladi va har bo'lak alohida "
+            "tranzaksiyada yoziladi; to'xtatilsa, qayta ishga tushirish qolgan joydan davom etadi.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk', type=int, default=500, help="Bir bo'lakdagi buyurtmalar soni")
+        parser.add_argument('--sleep', type=float, default=0.0, help="Bo'laklar orasida kutish (soniya)")
+        parser.add_argument('--start-id', type=int, default=0, help="Shu pk'dan keyingi buyurtmalardan boshlash")
+
+    def handle(self, *args, **options):
+        items = OrderItem.objects.select_related('product').prefetch_related('product__translations')
+        pending = Order.objects.filter(item_count=0).order_by('pk')
+        last_pk, updated, started = options['start_id'], 0, time.perf_counter()
+        while True:
+            # Bo'sh buyurtmalar (mahsulotsiz) 0 bo'lib qoladi: pk__gt tufayli qayta o'qilmaydi
+            orders = list(pending.filter(pk__gt=last_pk).only('pk', *SUMMARY_FIELDS)
+                          .prefetch_related(Prefetch('items', queryset=items))[:options['chunk']])
+            if not orders:
+                break
+            for order in orders:
+                summary = build_order_summary((item.product, item.quantity) for item in order.items.all())
+                for field, value in summary.items():
+                    setattr(order, field, value)
+            with transaction.atomic():
+                Order.objects.bulk_update([o for o in orders if o.item_count], SUMMARY_FIELDS)
+            last_pk = orders[-1].pk
+            updated += sum(1 for o in orders if o.item_count)
+            self.stdout.write(f"... up to #{last_pk}: {updated} orders updated")
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {updated} orders in {time.perf_counter() - started:.1f}s."))
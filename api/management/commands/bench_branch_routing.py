@@ -0,0 +1,86 @@
+# api/management/commands/bench_branch_routing.py
+import math
+import time
+import random
+import statistics
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.branch_routing import BranchIndex, get_branch_index, haversine_m, linear_nearest
+
+
+class Command(BaseCommand):
+    help = ("Yetkazib berish filialini tanlashni o'lchaydi: k-d daraxt (BranchIndex) va chiziqli qidiruv "
+            "taqqoslanadi, natijalar bir xilligi tekshiriladi. Standart: sun'iy filiallar (bazaga yozilmaydi).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branches', type=int, nargs='+', default=[10, 50, 200, 1000],
+                            help="Sun'iy filiallar soni (bir nechta qiymat berish mumkin)")
+        parser.add_argument('--queries', type=int, default=5000, help="Har bir o'lcham uchun qidiruvlar soni")
+        parser.add_argument('--open-ratio', type=float, default=0.7, help="Ochiq filiallar ulushi (0..1)")
+        parser.add_argument('--center', type=float, nargs=2, default=[41.31, 69.28], metavar=('LAT', 'LON'))
+        parser.add_argument('--radius-km', type=float, default=30.0, help="Filial va mijozlar tarqalgan radius")
+        parser.add_argument('--db', action='store_true', help="Sun'iy filiallar o'rniga bazadagi aktiv filiallar")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        if options['db']:
+            branches = get_branch_index().branches
+            if not branches:
+                raise CommandError("Bazada aktiv filial yo'q.")
+            now = timezone.now()
+            self.run_size(branches, lambda b: b.is_open_at(now), rng, options)
+            return
+        for count in options['branches']:
+            branches = [SimpleNamespace(pk=i, is_open=rng.random() < options['open_ratio'],
+                                        **dict(zip(('latitude', 'longitude'), self.random_point(rng, options))))
+                        for i in range(count)]
+            self.run_size(branches, lambda b: b.is_open, rng, options)
+
+    def random_point(self, rng, options):
+        # Markaz atrofida tekis taqsimlangan nuqta (kichik radius uchun tekis yaqinlashish yetarli)
+        lat0, lon0 = options['center']
+        distance = options['radius_km'] * (rng.random() ** 0.5)
+        bearing = rng.uniform(0, 2 * math.pi)
+        lat = lat0 + (distance * math.cos(bearing)) / 111.32
+        lon = lon0 + (distance * math.sin(bearing)) / (111.32 * math.cos(math.radians(lat0)))
+        return lat, lon
+
+    def run_size(self, branches, predicate, rng, options):
+        points = [self.random_point(rng, options) for _ in range(options['queries'])]
+
+        started = time.perf_counter()
+        index = BranchIndex(branches)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        indexed, indexed_ms = self.measure(lambda lat, lon: index.nearest(lat, lon, predicate), points)
+        linear, linear_ms = self.measure(lambda lat, lon: linear_nearest(branches, lat, lon, predicate), points)
+
+        mismatches = 0
+        for (lat, lon), a, b in zip(points, indexed, linear):
+            if a is not b and (a is None or b is None or abs(haversine_m(lat, lon, a.latitude, a.longitude)
+                                                             - haversine_m(lat, lon, b.latitude, b.longitude)) > 1e-6):
+                mismatches += 1
+
+        self.stdout.write(f"branches={len(branches)} queries={len(points)} build={build_ms:.2f}ms")
+        for label, samples in (('kd-tree', indexed_ms), ('linear', linear_ms)):
+            samples = sorted(samples)
+            self.stdout.write(f"  {label:<8} mean={statistics.mean(samples) * 1000:.1f}us "
+                              f"p50={samples[len(samples) // 2] * 1000:.1f}us "
+                              f"p99={samples[int(len(samples) * 0.99) - 1] * 1000:.1f}us")
+        self.stdout.write(f"  speedup={statistics.mean(linear_ms) / statistics.mean(indexed_ms):.1f}x")
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"  {mismatches} natija chiziqli qidiruvdan farq qildi!"))
+        else:
+            self.stdout.write(self.style.SUCCESS("  Natijalar chiziqli qidiruv bilan bir xil."))
+
+    def measure(self, func, points):
+        results, samples = [], []
+        for lat, lon in points:
+            started = time.perf_counter()
+            results.append(func(lat, lon))
+            samples.append((time.perf_counter() - started) * 1000)
+        return results, samples
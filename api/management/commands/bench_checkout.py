@@ -0,0 +1,97 @@
+# api/management/commands/bench_checkout.py
+import time
+import uuid
+import statistics
+import threading
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIClient
+
+from api.models import User, Category, Product, Branch, Cart, CartItem, Order
+
+
+class Command(BaseCommand):
+    help = ("Checkout'ni parallel so'rovlar bilan sinaydi: bir savat uchun bir vaqtda bir nechta checkout "
+            "yuboriladi va dublikat buyurtma yaratilmaganini tekshiradi (PostgreSQL'da ishga tushiring).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=20, help="Savat to'ldirib, checkout qilish soni")
+        parser.add_argument('--parallel', type=int, default=8, help="Har bir raundda bir vaqtdagi so'rovlar soni")
+        parser.add_argument('--items', type=int, default=3, help="Savatdagi mahsulotlar soni")
+        parser.add_argument('--keep', action='store_true', help="Test ma'lumotlarini o'chirmaslik")
+
+    def handle(self, *args, **options):
+        suffix = uuid.uuid4().hex[:8]
+        user = User.objects.create(username=f"bench_checkout_{suffix}", phone_number=f"+000{suffix}",
+                                   telegram_id=-int(suffix, 16))
+        category = Category.objects.create(slug=f"bench-checkout-{suffix}", name=f"Bench {suffix}")
+        products = [
+            Product.objects.create(category=category, price=Decimal('10000') + i, name=f"Bench product {i}")
+            for i in range(options['items'])
+        ]
+        branch = Branch.objects.filter(is_active=True).first()
+        created_branch = None
+        if branch is None:
+            created_branch = branch = Branch.objects.create(name=f"Bench branch {suffix}", address="-",
+                                                          latitude=41.31, longitude=69.28)
+        cart, _created = Cart.objects.get_or_create(user=user)
+
+        try:
+            for mode in ('same-key', 'no-key'):
+                self.run_mode(mode, user, cart, products, options)
+        finally:
+            if not options['keep']:
+                Order.objects.filter(user=user).delete()
+                user.delete()
+                category.delete()
+                if created_branch is not None:
+                    created_branch.delete()
+
+    def run_mode(self, mode, user, cart, products, options):
+        payload = {'delivery_type': 'delivery', 'payment_type': 'cash', 'latitude': 41.31, 'longitude': 69.28}
+        latencies, statuses = [], {}
+        lock = threading.Lock()
+        orders_before = Order.objects.filter(user=user).count()
+
+        def submit(barrier, key):
+            client = APIClient()
+            client.force_authenticate(user=user)
+            headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+            barrier.wait()
+            started = time.perf_counter()
+            try:
+                response = client.post('/api/v1/orders/checkout/', payload, format='json', **headers)
+                code = response.status_code
+            except Exception as e:
+                code = type(e).__name__
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+                statuses[code] = statuses.get(code, 0) + 1
+            connection.close()
+
+        for _round in range(options['rounds']):
+            CartItem.objects.bulk_create([CartItem(cart=cart, product=product, quantity=2) for product in products])
+            key = uuid.uuid4().hex if mode == 'same-key' else None
+            barrier = threading.Barrier(options['parallel'])
+            threads = [threading.Thread(target=submit, args=(barrier, key)) for _ in range(options['parallel'])]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            CartItem.objects.filter(cart=cart).delete()
+
+        orders_created = Order.objects.filter(user=user).count() - orders_before
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+        self.stdout.write(
+            f"[{mode}] rounds={options['rounds']} parallel={options['parallel']} "
+            f"orders_created={orders_created} (expected {options['rounds']}) statuses={statuses} "
+            f"p50={statistics.median(latencies):.1f}ms p95={p95:.1f}ms"
+        )
+        if orders_created != options['rounds']:
+            self.stderr.write(self.style.ERROR(f"[{mode}] duplicate or missing orders detected!"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"[{mode}] no duplicate orders."))
@@ -0,0 +1,142 @@
+# api/management/commands/bench_order_history.py
+import time
+import uuid
+import statistics
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.models import User, Order, OrderItem, Product
+from api.views import OrderHistoryView
+
+FULL_EXPAND = 'items,pickup_branch,user'
+
+
+class Command(BaseCommand):
+    help = ("Buyurtmalar tarixini sahifalashni o'lchaydi: ko'p buyurtmali foydalanuvchi uchun "
+            "PageNumberPagination (COUNT + OFFSET) va kursor (keyset) paginatsiya taqqoslanadi. "
+            "Natijalar ishonchli bo'lishi uchun PostgreSQL'da ishga tushiring.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10_000, help="Foydalanuvchi buyurtmalari soni")
+        parser.add_argument('--pages', type=int, default=50, help="Har bir usulda o'qiladigan sahifalar soni")
+        parser.add_argument('--keep', action='store_true', help="Test ma'lumotlarini o'chirmaslik")
+
+    def handle(self, *args, **options):
+        suffix = uuid.uuid4().hex[:8]
+        user = User.objects.create(username=f"bench_history_{suffix}", phone_number=f"+001{suffix}",
+                                   telegram_id=-int(suffix, 16), is_active=True)
+        try:
+            self.create_orders(user, options['orders'])
+            self.bench_offset(user, options)
+            self.bench_cursor(user, options)
+            self.bench_schema(user, options)
+        finally:
+            if not options['keep']:
+                Order.objects.filter(user=user).delete()
+                user.delete()
+
+    def create_orders(self, user, count):
+        started = time.perf_counter()
+        now = timezone.now()
+        # Har 7-buyurtma oldingisi bilan bir xil created_at: (created_at, id) tartibi ham tekshiriladi
+        orders = [Order(user=user, total_price=Decimal('10000'), status='delivered', delivery_type='delivery')
+                  for _ in range(count)]
+        Order.objects.bulk_create(orders, batch_size=1000)
+        for start in range(0, count, 1000):
+            for i, order in enumerate(orders[start:start + 1000], start=start):
+                order.created_at = now - timedelta(minutes=i - (1 if i % 7 == 0 and i else 0))
+            Order.objects.bulk_update(orders[start:start + 1000], ['created_at'])
+        self.stdout.write(f"Created {count} orders in {time.perf_counter() - started:.1f}s")
+
+    def get(self, view, user, params):
+        request = APIRequestFactory().get('/api/v1/orders/history/', params)
+        force_authenticate(request, user=user)
+        return view(request)
+
+    def measure(self, label, fetch, pages):
+        latencies, queries, seen = [], [], []
+        for page in range(pages):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                data = fetch(page)
+                latencies.append((time.perf_counter() - started) * 1000)
+            if data is None:
+                latencies.pop()
+                break
+            queries.append(len(ctx.captured_queries))
+            seen.extend(order['id'] for order in data['results'])
+        self.stdout.write(
+            f"{label:<8} pages={len(latencies)} mean={statistics.mean(latencies):.1f}ms "
+            f"first={latencies[0]:.1f}ms last={latencies[-1]:.1f}ms queries/page={statistics.mean(queries):.1f} "
+            f"unique_orders={len(set(seen))}/{len(seen)}")
+        return seen
+
+    def bench_offset(self, user, options):
+        # Eski usul: PageNumberPagination bilan bir xil view (taqqoslash uchun)
+        # To'liq (ichma-ich) ko'rinishda, avvalgi javob bilan bir xil hajmda
+        view = OrderHistoryView.as_view(pagination_class=PageNumberPagination)
+        full = {'expand': FULL_EXPAND}
+        total_pages = -(-options['orders'] // 10)
+        # Chuqur sahifalarni ham o'lchaymiz: oxirgi sahifalar OFFSET uchun eng qimmat
+        page_numbers = [1 + (total_pages - 1) * i // max(options['pages'] - 1, 1) for i in range(options['pages'])]
+
+        def fetch(index):
+            response = self.get(view, user, {'page': page_numbers[index], **full})
+            return response.data if response.status_code == 200 else None
+
+        self.measure('offset', fetch, len(page_numbers))
+
+    def bench_cursor(self, user, options):
+        view = OrderHistoryView.as_view()
+        state = {'cursor': None}
+
+        def fetch(index):
+            if index and not state['cursor']:
+                return None  # Oxirgi sahifa o'qildi
+            params = {'cursor': state['cursor']} if state['cursor'] else {}
+            response = self.get(view, user, params)
+            if response.status_code != 200:
+                return None
+            state['cursor'] = response.data['next_cursor']
+            if index == 0:
+                self.stdout.write(f"cursor example: {state['cursor']} ({len(state['cursor'] or '')} chars, "
+                                  f"callback_data {len('hist_page_' + (state['cursor'] or ''))} bytes)")
+            return response.data
+
+        # Kursor bilan butun tarix boshidan oxirigacha o'qiladi (dublikat/yo'qolgan buyurtma yo'qligini tekshirish)
+        seen = self.measure('cursor', fetch, -(-options['orders'] // 10) + 1)
+        if len(seen) == options['orders'] and len(set(seen)) == len(seen):
+            self.stdout.write(self.style.SUCCESS("Cursor walk returned every order exactly once."))
+        else:
+            self.stdout.write(self.style.ERROR(f"Cursor walk returned {len(set(seen))} unique of {len(seen)}."))
+
+    def bench_schema(self, user, options):
+        """Bitta sahifa: yengil ro'yxat ko'rinishi va to'liq (expand) ko'rinish - vaqt, so'rovlar, hajm."""
+        # Buyurtmalarga mahsulot qatorlari qo'shiladi (to'liq ko'rinish narxini ko'rsatish uchun)
+        product = Product.objects.filter(is_available=True).first()
+        if product is not None:
+            orders = list(Order.objects.filter(user=user).order_by('-created_at', '-pk')[:10])
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=1, price_per_unit=product.price,
+                          total_price=product.price)
+                for order in orders for _ in range(3)
+            ])
+        view = OrderHistoryView.as_view()
+        for label, params in (('slim', {}), ('expanded', {'expand': FULL_EXPAND}),
+                              ('fields', {'fields': 'id,status,total_price,created_at'})):
+            latencies, queries, size = [], 0, 0
+            for _ in range(options['pages']):
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    response = self.get(view, user, params)
+                    response.render()
+                    latencies.append((time.perf_counter() - started) * 1000)
+                queries, size = len(ctx.captured_queries), len(response.content)
+            self.stdout.write(f"{label:<8} mean={statistics.mean(latencies):.1f}ms queries={queries} bytes={size}")
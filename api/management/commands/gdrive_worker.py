@@ -0,0 +1,33 @@
+# api/management/commands/gdrive_worker.py
+import time
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.gdrive_jobs import run_pending_jobs
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Google Drive rasm yuklash/o'chirish navbatini bajaradi (fon worker)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Navbatni bir marta bo'shatib chiqib ketish")
+        parser.add_argument('--batch-size', type=int, default=10, help="Bir martada olinadigan vazifalar soni")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Navbat bo'sh bo'lganda kutish (sekund)")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write(f"GDrive worker started (batch_size={batch_size}).")
+        try:
+            while True:
+                close_old_connections()
+                processed = run_pending_jobs(batch_size)
+                if options['once'] and not processed:
+                    break
+                if not processed:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write("GDrive worker stopped.")
@@ -0,0 +1,31 @@
+# api/management/commands/notification_dispatcher.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.notifications import NotificationDispatcher, TelegramSender
+
+
+class Command(BaseCommand):
+    help = "Buyurtma holati bildirishnomalarini (outbox) Telegram'ga yuboradi."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Navbatni bir marta bo'shatib chiqib ketish")
+        parser.add_argument('--batch-size', type=int, default=100, help="Bir martada olinadigan xabarlar soni")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Navbat bo'sh bo'lganda kutish (sekund)")
+
+    def handle(self, *args, **options):
+        if not settings.TELEGRAM_BOT_TOKEN:
+            raise CommandError("TELEGRAM_BOT_TOKEN sozlanmagan!")
+
+        dispatcher = NotificationDispatcher(TelegramSender(settings.TELEGRAM_BOT_TOKEN))
+        self.stdout.write("Notification dispatcher started.")
+        try:
+            if options['once']:
+                while dispatcher.dispatch_batch(options['batch_size']):
+                    pass
+            else:
+                dispatcher.run_forever(options['batch_size'], options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write("Notification dispatcher stopped.")
+        finally:
+            dispatcher.close()
@@ -0,0 +1,21 @@
+# api/management/commands/rebuild_eta_profiles.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.eta import rebuild_eta_profiles
+
+
+class Command(BaseCommand):
+    help = ("Filial ETA profillarini (BranchEtaProfile) buyurtmalar tarixidan qaytadan quradi. "
+            "Odatda profillar holat o'zgarganda o'zi yangilanadi; bu buyruq birinchi ishga tushirishda "
+            "yoki ETA sozlamalari o'zgarganda kerak.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=60, help="Oxirgi necha kunlik buyurtmalar (0 - hammasi)")
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days']) if options['days'] else None
+        count = rebuild_eta_profiles(since)
+        self.stdout.write(self.style.SUCCESS(f"ETA profiles rebuilt from {count} samples."))
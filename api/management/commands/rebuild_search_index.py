@@ -0,0 +1,19 @@
+# api/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from api.catalog_cache import bump_catalog_version
+from api.search import index_products, use_postgres
+
+
+class Command(BaseCommand):
+    help = "Mahsulot qidiruv indeksini (ProductSearchEntry) tarjimalardan qayta quradi."
+
+    def add_arguments(self, parser):
+        parser.add_argument('product_ids', nargs='*', type=int, help="Faqat shu mahsulotlar (bo'sh bo'lsa - hammasi)")
+
+    def handle(self, *args, **options):
+        product_ids = options['product_ids'] or None
+        count = index_products(product_ids)
+        bump_catalog_version("search index rebuilt")  # Xotiradagi indekslar ham qayta quriladi
+        backend = 'postgres' if use_postgres() else 'memory'
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} product translations (backend: {backend})."))
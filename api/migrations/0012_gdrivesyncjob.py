@@ -0,0 +1,40 @@
+# Generated by Django 4.2.20 on 2026-10-18 00:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('api', '0011_alter_category_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GDriveSyncJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Obyekt IDsi')),
+                ('action', models.CharField(choices=[('upload', 'Yuklash'), ('delete', "O'chirish")], max_length=10, verbose_name='Amal')),
+                ('image_name', models.CharField(blank=True, default='', max_length=255, verbose_name='Lokal rasm')),
+                ('drive_file_id', models.CharField(blank=True, max_length=255, null=True, verbose_name='Google Drive Fayl IDsi')),
+                ('status', models.CharField(choices=[('pending', 'Navbatda'), ('processing', 'Bajarilmoqda'), ('done', 'Bajarildi'), ('skipped', "O'tkazib yuborildi"), ('failed', 'Xatolik')], default='pending', max_length=20, verbose_name='Holati')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Urinishlar soni')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Keyingi urinish vaqti')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Worker olgan vaqt')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Oxirgi xatolik')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan vaqti')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan vaqti')),
+                ('content_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype', verbose_name='Model turi')),
+            ],
+            options={
+                'verbose_name': 'Google Drive vazifasi',
+                'verbose_name_plural': 'Google Drive vazifalari',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='gdrive_job_queue_idx')],
+            },
+        ),
+    ]
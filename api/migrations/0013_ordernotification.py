@@ -0,0 +1,38 @@
+# Generated by Django 4.2.20 on 2026-10-18 00:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_gdrivesyncjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_status', models.CharField(choices=[('new', 'Yangi'), ('preparing', 'Tayyorlanmoqda'), ('on_the_way', "Yo'lda"), ('delivered', 'Yetkazildi'), ('cancelled', 'Bekor qilindi')], max_length=20, verbose_name='Buyurtma holati')),
+                ('state', models.CharField(choices=[('pending', 'Navbatda'), ('sent', 'Yuborildi'), ('skipped', "O'tkazib yuborildi"), ('failed', 'Xatolik')], default='pending', max_length=10, verbose_name='Yuborish holati')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Urinishlar soni')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Keyingi urinish vaqti')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Dispatcher olgan vaqt')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Oxirgi xatolik')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan vaqti')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Yuborilgan vaqti')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='api.order', verbose_name='Buyurtma')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_notifications', to=settings.AUTH_USER_MODEL, verbose_name='Foydalanuvchi')),
+            ],
+            options={
+                'verbose_name': 'Buyurtma bildirishnomasi',
+                'verbose_name_plural': 'Buyurtma bildirishnomalari',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['state', 'next_attempt_at'], name='order_notif_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 4.2.20 on 2026-10-18 00:35
+
+import re
+import unicodedata
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+from django.contrib.postgres.search import SearchVector
+
+# Faqat PostgreSQL: to'liq matnli qidiruv (tsvector) va xato yozilgan so'zlar uchun trigram indekslari
+POSTGRES_INDEXES_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS product_search_vector_gin ON api_productsearchentry USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS product_search_name_trgm ON api_productsearchentry "
+    "USING gin (name_document gin_trgm_ops)",
+]
+POSTGRES_DROP_INDEXES_SQL = [
+    "DROP INDEX IF EXISTS product_search_name_trgm",
+    "DROP INDEX IF EXISTS product_search_vector_gin",
+]
+
+
+# api.search.normalize_text'ning shu migratsiya vaqtidagi nusxasi: keyinchalik ilova kodi o'zgarsa ham
+# migratsiya bir xil natija berishi kerak
+_TRANSLIT_TABLE = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo', 'ж': 'j', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'x', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sh',
+    'ъ': '', 'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+    'ў': 'o', 'қ': 'q', 'ғ': 'g', 'ҳ': 'h',
+})
+_APOSTROPHES_RE = re.compile(r"['`‘’ʻʼ]")
+_LATIN_FOLDS = (('kh', 'x'), ('zh', 'j'), ('w', 'v'))
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize_text(text):
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).lower().translate(_TRANSLIT_TABLE)
+    text = _APOSTROPHES_RE.sub('', text)
+    text = ''.join(ch for ch in unicodedata.normalize('NFKD', text) if not unicodedata.combining(ch))
+    for source, target in _LATIN_FOLDS:
+        text = text.replace(source, target)
+    return ' '.join(_TOKEN_RE.findall(text))
+
+
+def create_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in POSTGRES_INDEXES_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in POSTGRES_DROP_INDEXES_SQL:
+        schema_editor.execute(sql)
+
+
+def build_search_entries(apps, schema_editor):
+    ProductTranslation = apps.get_model('api', 'ProductTranslation')
+    ProductSearchEntry = apps.get_model('api', 'ProductSearchEntry')
+    ProductSearchEntry.objects.bulk_create([
+        ProductSearchEntry(
+            product_id=master_id,
+            language_code=language_code,
+            name_document=normalize_text(name),
+            body_document=normalize_text(description),
+        )
+        for master_id, language_code, name, description in
+        ProductTranslation.objects.values_list('master_id', 'language_code', 'name', 'description')
+    ], batch_size=500)
+    if schema_editor.connection.vendor == 'postgresql':
+        ProductSearchEntry.objects.update(
+            search_vector=(SearchVector('name_document', weight='A', config='simple') +
+                           SearchVector('body_document', weight='B', config='simple'))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_order_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language_code', models.CharField(max_length=15)),
+                ('name_document', models.TextField(default='')),
+                ('body_document', models.TextField(blank=True, default='')),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='api.product')),
+            ],
+            options={
+                'verbose_name': 'Mahsulot qidiruv yozuvi',
+                'verbose_name_plural': 'Mahsulot qidiruv yozuvlari',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productsearchentry',
+            constraint=models.UniqueConstraint(fields=('product', 'language_code'), name='unique_product_search_entry'),
+        ),
+        migrations.RunPython(create_postgres_indexes, drop_postgres_indexes),
+        migrations.RunPython(build_search_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.20 on 2026-10-18 00:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_productsearchentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='delivery_branch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='delivery_orders', to='api.branch', verbose_name='Yetkazib beruvchi filial'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.20 on 2026-10-18 00:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_order_delivery_branch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Yetkazilgan vaqt'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='on_the_way_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name="Yo'lga chiqqan vaqt"),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='preparing_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Tayyorlash boshlangan vaqt'),
+        ),
+        migrations.CreateModel(
+            name='BranchEtaProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('prep', 'Tayyorlash'), ('delivery', 'Yetkazish')], max_length=10, verbose_name='Turi')),
+                ('hour', models.PositiveSmallIntegerField(help_text='0-23, 24 - barcha soatlar', verbose_name='Soat')),
+                ('histogram', models.JSONField(default=list, verbose_name='Gistogramma')),
+                ('sample_count', models.PositiveIntegerField(default=0, verbose_name='Namunalar soni')),
+                ('weight', models.FloatField(default=0, verbose_name='Eskirgan vazn')),
+                ('p50_minutes', models.FloatField(blank=True, null=True, verbose_name='Mediana (daqiqa)')),
+                ('p80_minutes', models.FloatField(blank=True, null=True, verbose_name='80-persentil (daqiqa)')),
+                ('p90_minutes', models.FloatField(blank=True, null=True, verbose_name='90-persentil (daqiqa)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan vaqti')),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eta_profiles', to='api.branch', verbose_name='Filial')),
+            ],
+            options={
+                'verbose_name': 'Filial ETA profili',
+                'verbose_name_plural': 'Filial ETA profillari',
+                'ordering': ['branch', 'kind', 'hour'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='branchetaprofile',
+            constraint=models.UniqueConstraint(fields=('branch', 'kind', 'hour'), name='unique_branch_eta_profile'),
+        ),
+    ]
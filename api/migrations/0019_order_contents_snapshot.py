@@ -0,0 +1,28 @@
+# Generated by Django 4.2.20 on 2026-10-18 00:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_order_user_history_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='contents_summary',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Tarkib (qisqa)'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Mahsulotlar soni'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='product_names',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Mahsulot nomlari'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.20 on 2026-10-18 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_order_contents_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at'], name='order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status__in', ('new', 'preparing', 'on_the_way'))), fields=['status', 'created_at'], name='order_active_queue_idx'),
+        ),
+    ]
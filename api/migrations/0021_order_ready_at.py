@@ -0,0 +1,27 @@
+# Generated by Django 4.2.20 on 2026-10-18 01:11
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_ready_at(apps, schema_editor):
+    # Avvalgi buyurtmalar: tayyorlash on_the_way (delivery) yoki delivered (pickup) bilan tugagan
+    Order = apps.get_model('api', 'Order')
+    Order.objects.filter(ready_at__isnull=True).exclude(on_the_way_at__isnull=True, delivered_at__isnull=True).update(
+        ready_at=Coalesce('on_the_way_at', 'delivered_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_order_admin_board_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='ready_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name="Tayyor bo'lgan vaqt"),
+        ),
+        migrations.RunPython(backfill_ready_at, migrations.RunPython.noop),
+    ]
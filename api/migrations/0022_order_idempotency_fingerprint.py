@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-18 01:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_order_ready_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='idempotency_fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64, verbose_name="So'rov izi"),
+        ),
+    ]
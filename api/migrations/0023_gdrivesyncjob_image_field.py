@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-18 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_order_idempotency_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gdrivesyncjob',
+            name='image_field',
+            field=models.CharField(default='image', max_length=64, verbose_name='Rasm maydoni'),
+        ),
+    ]
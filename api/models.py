@@ -1,19 +1,25 @@
 # api/models.py
 import os
 import datetime
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings  # User modelini olish uchun qulay usul
 from django.core.validators import MinValueValidator, MaxValueValidator  # Minimal qiymatni tekshirish uchun
 from django.db.models import UniqueConstraint  # Unikalikni ta'minlash uchun
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import translation
 from django.utils.translation import gettext_lazy as _
 from parler.models import TranslatableModel, TranslatedFields
 from django.utils import timezone
 from django.db.models.signals import post_delete  # Signal uchun
-from django.dispatch import receiver
+from django.dispatch import receiver, Signal
 from .gdrive_utils import upload_to_drive, delete_from_drive
 
-from api.utils import send_direct_telegram_notification, logger
+from api.utils import logger
+from .schedule import WeeklySchedule, get_branch_schedule
 
 
 # --- Foydalanuvchi Modeli ---
@@ -198,6 +204,29 @@ class Product(TranslatableModel):
         verbose_name_plural = _("Mahsulotlar")
 
 
+# --- Mahsulot qidiruv indeksi ---
+class ProductSearchEntry(models.Model):
+    """
+    Mahsulot tarjimasining qidiruv uchun normallashtirilgan (lotinga o'girilgan) nusxasi.
+    api.search yuritadi; PostgreSQL'da search_vector va trigram GIN indekslari ishlatiladi.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='search_entries')
+    language_code = models.CharField(max_length=15)
+    name_document = models.TextField(default='')
+    body_document = models.TextField(default='', blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['product', 'language_code'], name='unique_product_search_entry'),
+        ]
+        verbose_name = _("Mahsulot qidiruv yozuvi")
+        verbose_name_plural = _("Mahsulot qidiruv yozuvlari")
+
+    def __str__(self):
+        return f"{self.product_id} [{self.language_code}] {self.name_document}"
+
+
 class Cart(models.Model):
     """Foydalanuvchining savatchasi."""
     user = models.OneToOneField(
@@ -212,6 +241,10 @@ class Cart(models.Model):
     @property
     def total_price(self):
         """Savatdagi barcha mahsulotlarning umumiy narxini hisoblaydi."""
+        # services.cart_queryset() orqali yuklangan bo'lsa, summa DB'da hisoblangan
+        annotated_total = self.__dict__.get('annotated_total')
+        if annotated_total is not None:
+            return annotated_total
         return sum(item.get_item_total for item in self.items.all())
 
     class Meta:
@@ -245,6 +278,9 @@ class CartItem(models.Model):
     @property
     def get_item_total(self):
         """Shu qatordagi mahsulot(lar)ning umumiy narxini hisoblaydi."""
+        line_total = self.__dict__.get('line_total')  # services.cart_items_queryset() annotatsiyasi
+        if line_total is not None:
+            return line_total
         return self.product.price * self.quantity
 
     class Meta:
@@ -298,21 +334,31 @@ class Branch(models.Model):
     def __str__(self):
         return self.name
 
-    def is_open_now(self):
-        # Joriy vaqtni loyihaning TIME_ZONE'iga o'tkazamiz
-        now_local_dt = timezone.localtime(timezone.now())
-        now_local_time = now_local_dt.time()  # Mahalliy vaqtning time qismi (naive)
-        current_weekday = now_local_dt.weekday()  # Mahalliy vaqtning hafta kuni
+    def get_schedule(self) -> WeeklySchedule:
+        """
+        Haftalik ish jadvali. prefetch_related('working_hours') qilingan bo'lsa, shundan quriladi,
+        aks holda keshdan olinadi (WorkingHours o'zgarganda kesh tozalanadi).
+        """
+        schedule = self.__dict__.get('_schedule')
+        if schedule is None:
+            prefetched = getattr(self, '_prefetched_objects_cache', {}).get('working_hours')
+            if prefetched is not None:
+                schedule = WeeklySchedule.from_working_hours(prefetched)
+            else:
+                schedule = get_branch_schedule(self.pk)
+            self.__dict__['_schedule'] = schedule
+        return schedule
 
-        working_hours_today = self.working_hours.filter(weekday=current_weekday)
+    def is_open_at(self, moment: datetime.datetime) -> bool:
+        # Vaqtni loyihaning TIME_ZONE'iga o'tkazamiz
+        return self.get_schedule().is_open_at(timezone.localtime(moment))
+
+    def is_open_now(self):
+        return self.is_open_at(timezone.now())
 
-        for wh in working_hours_today:
-            if wh.to_hour == datetime.time(0, 0):
-                if wh.from_hour <= now_local_time:
-                    return True
-            elif wh.from_hour <= now_local_time and now_local_time < wh.to_hour:
-                return True
-        return False
+    def next_opening_at(self, moment: datetime.datetime | None = None) -> datetime.datetime | None:
+        """Keyingi ochilish vaqti (hozir ochiq bo'lsa - hozirgi vaqt, jadval bo'sh bo'lsa - None)."""
+        return self.get_schedule().next_opening(timezone.localtime(moment or timezone.now()))
 
 
 class WorkingHours(models.Model):
@@ -353,6 +399,49 @@ class WorkingHours(models.Model):
         return f"{self.branch.name}: {self.get_weekday_display()} ({self.from_hour.strftime('%H:%M')} - {self.to_hour.strftime('%H:%M')})"
 
 
+# Buyurtma holati o'zgarganda (tranzaksiya commit bo'lgandan keyin) yuboriladi.
+# Argumentlar: changes=[(order_id, old_status, new_status), ...]
+order_status_changed = Signal()
+
+# Oshxona navbatidagi (yakunlanmagan) holatlar: admin navbat sahifasi shu holatlar bo'yicha qisman indeksdan o'qiydi
+ACTIVE_ORDER_STATUSES = ('new', 'preparing', 'on_the_way')
+
+
+class OrderQuerySet(models.QuerySet):
+    def transition(self, ids, new_status: str, from_statuses=None) -> list[int]:
+        """
+        Bir nechta buyurtma holatini bitta UPDATE bilan o'zgartiradi.
+        Holati haqiqatan o'zgargan buyurtmalar uchun bildirishnomalar navbatga qo'yiladi
+        va order_status_changed signali yuboriladi. O'zgargan buyurtma IDlarini qaytaradi.
+        """
+        if new_status not in dict(Order.STATUS_CHOICES):
+            raise ValueError(f"Unknown order status: {new_status}")
+
+        with transaction.atomic():
+            queryset = self.filter(pk__in=ids).exclude(status=new_status)
+            if from_statuses is not None:
+                queryset = queryset.filter(status__in=from_statuses)
+            # Eski holatlarni bilish uchun qatorlarni qulflab o'qiymiz (bitta SELECT)
+            rows = list(queryset.select_for_update().values_list('pk', 'status', 'user_id'))
+            if not rows:
+                return []
+
+            changed_ids = [pk for pk, _old_status, _user_id in rows]
+            now = timezone.now()
+            # Holatga birinchi marta o'tilgan vaqt saqlanadi (ETA statistikasi uchun)
+            timestamps = {field: Coalesce(F(field), Value(now)) for field in Order.timestamp_fields_for(new_status)}
+            self.model.objects.filter(pk__in=changed_ids).update(status=new_status, updated_at=now, **timestamps)
+            OrderNotification.objects.bulk_create([
+                OrderNotification(order_id=pk, user_id=user_id, order_status=new_status)
+                for pk, _old_status, user_id in rows if user_id
+            ])
+            changes = [(pk, old_status, new_status) for pk, old_status, _user_id in rows]
+            transaction.on_commit(lambda: order_status_changed.send(sender=self.model, changes=changes))
+
+        logger.info(f"Orders {changed_ids} moved to status '{new_status}' in bulk.")
+        return changed_ids
+
+
 class Order(models.Model):
     """Mijozlar tomonidan qilingan buyurtmalar."""
     STATUS_CHOICES = (
@@ -370,6 +459,22 @@ class Order(models.Model):
         ('cash', _('Naqd pul')),
         ('card', _('Karta orqali')),  # Yoki 'payme', 'click'
     )
+    # Holat -> shu holatga o'tilgan vaqt maydoni (api/eta.py tayyorlash/yetkazish vaqtlarini shulardan o'rganadi)
+    STATUS_TIMESTAMP_FIELDS = {
+        'preparing': 'preparing_at',
+        'on_the_way': 'on_the_way_at',
+        'delivered': 'delivered_at',
+    }
+    # Bu holatlarga birinchi o'tishda tayyorlash tugagan hisoblanadi (ready_at)
+    READY_STATUSES = ('on_the_way', 'delivered')
+    ACTIVE_STATUSES = ACTIVE_ORDER_STATUSES
+    # Yangi holat -> qaysi holatlardan o'tish mumkin (admin ommaviy amallari va navbat sahifasi)
+    ALLOWED_TRANSITIONS = {
+        'preparing': ('new',),
+        'on_the_way': ('preparing',),
+        'delivered': ('preparing', 'on_the_way'),
+        'cancelled': ('new', 'preparing'),
+    }
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='orders',
                              verbose_name=_("Foydalanuvchi"))  # Agar user o'chsa, buyurtma qolsin
@@ -395,6 +500,14 @@ class Order(models.Model):
         related_name='pickup_orders',
         verbose_name=_("Olib ketish filiali")
     )
+    delivery_branch = models.ForeignKey(
+        Branch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,  # Faqat delivery uchun: mijozga eng yaqin ochiq filial (branch_routing.py)
+        related_name='delivery_orders',
+        verbose_name=_("Yetkazib beruvchi filial")
+    )
     # Taxminiy vaqtlar (hisoblab to'ldiriladi)
     estimated_ready_at = models.DateTimeField(
         _("Taxminiy tayyor bo'lish vaqti (pickup)"),
@@ -405,59 +518,92 @@ class Order(models.Model):
         null=True, blank=True
     )
 
+    # Holat o'tish vaqtlari (birinchi marta o'tilgan payt)
+    preparing_at = models.DateTimeField(_("Tayyorlash boshlangan vaqt"), null=True, blank=True, editable=False)
+    on_the_way_at = models.DateTimeField(_("Yo'lga chiqqan vaqt"), null=True, blank=True, editable=False)
+    delivered_at = models.DateTimeField(_("Yetkazilgan vaqt"), null=True, blank=True, editable=False)
+    # Tayyorlash tugagan (oshxonadan chiqqan) vaqt: delivery'da on_the_way, pickup'da preparing -> delivered o'tishi
+    ready_at = models.DateTimeField(_("Tayyor bo'lgan vaqt"), null=True, blank=True, editable=False)
+
+    # Tarkibning checkout paytidagi nusxasi: ro'yxatlar OrderItem/Product/tarjimalarga join qilmaydi,
+    # mahsulot nomi o'zgarsa yoki o'chsa ham buyurtmada avvalgidek qoladi (price_per_unit kabi)
+    item_count = models.PositiveIntegerField(_("Mahsulotlar soni"), default=0, editable=False)
+    contents_summary = models.JSONField(_("Tarkib (qisqa)"), default=dict, blank=True,
+                                        editable=False)  # {'uz': "2× Osh, 1× Choy", 'ru': ...}
+    product_names = models.JSONField(_("Mahsulot nomlari"), default=dict, blank=True,
+                                     editable=False)  # {'uz': ['Osh', 'Choy'], 'ru': [...]}
+
+    # Mijoz yuborgan kalit: bir xil kalit bilan qayta yuborilgan checkout yangi buyurtma yaratmaydi
+    idempotency_key = models.CharField(_("Idempotentlik kaliti"), max_length=64, null=True, blank=True,
+                                       editable=False)
+    # Shu kalit bilan kelgan so'rov mazmuni (savat + yetkazish/to'lov maydonlari) xeshi: kalit boshqa savat bilan
+    # qayta ishlatilsa, asl buyurtma qaytarilmaydi (services.checkout_fingerprint)
+    idempotency_fingerprint = models.CharField(_("So'rov izi"), max_length=64, blank=True, default='',
+                                               editable=False)
+
     created_at = models.DateTimeField(_("Yaratilgan vaqti"), auto_now_add=True)
     updated_at = models.DateTimeField(_("Yangilangan vaqti"), auto_now=True)
 
-    def save(self, *args, **kwargs):
-        is_new_creation = self._state.adding  # Obyekt yangi yaratilyaptimi?
-        old_status = None
-
-        if not is_new_creation and self.pk:  # Agar bu mavjud obyektni yangilash bo'lsa
-            try:
-                # Bazadan obyektning joriy (saqlashdan oldingi) holatini o'qiymiz
-                old_order_instance = Order.objects.get(pk=self.pk)
-                old_status = old_order_instance.status
-            except Order.DoesNotExist:
-                # Bu holat self.pk mavjud bo'lganda bo'lmasligi kerak, lekin ehtiyot shart
-                logger.warning(f"Order with pk {self.pk} not found in DB during save for status check.")
-                pass  # old_status None bo'lib qoladi
-
-        # Asosiy saqlash amalini bajaramiz
-        super().save(*args, **kwargs)
+    objects = OrderQuerySet.as_manager()
 
-        # Saqlashdan keyin, self.status yangi (yoki o'zgarmagan) statusni o'z ichiga oladi
-        new_status_after_save = self.status
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Bazadan yuklangan (yoki yaratilgan) paytdagi holat; save() qo'shimcha SELECT qilmasligi uchun.
+        # Maydon defer() qilingan bo'lsa, None bo'ladi.
+        self._original_status = self.__dict__.get('status')
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None or 'status' in fields:
+            self._original_status = self.__dict__.get('status')
 
-        # Agar bu mavjud buyurtma bo'lsa va status haqiqatan ham o'zgargan bo'lsa, xabar yuboramiz
-        if not is_new_creation and old_status is not None and old_status != new_status_after_save:
-            if self.user and self.user.telegram_id and self.user.language_code:
+    def save(self, *args, **kwargs):
+        is_new_creation = self._state.adding  # Obyekt yangi yaratilyaptimi?
+        update_fields = kwargs.get('update_fields')
+        status_saved = update_fields is None or 'status' in update_fields
+        old_status = self._original_status if status_saved else None
+
+        if not is_new_creation and status_saved and old_status is None and self.pk:
+            # Faqat status defer() qilingan holatda bazadan o'qiymiz
+            old_status = Order.objects.filter(pk=self.pk).values_list('status', flat=True).first()
+
+        if not is_new_creation and status_saved and old_status != self.status:
+            now = timezone.now()
+            for timestamp_field in self.timestamp_fields_for(self.status):
+                if getattr(self, timestamp_field) is None:
+                    setattr(self, timestamp_field, now)
+                    if kwargs.get('update_fields') is not None:
+                        kwargs['update_fields'] = {*kwargs['update_fields'], timestamp_field}
+
+        # Saqlash va bildirishnomani navbatga qo'yish bitta tranzaksiyada (outbox)
+        with transaction.atomic():
+            # Asosiy saqlash amalini bajaramiz
+            super().save(*args, **kwargs)
+
+            # Saqlashdan keyin, self.status yangi (yoki o'zgarmagan) statusni o'z ichiga oladi
+            new_status_after_save = self.status
+
+            # Agar bu mavjud buyurtma bo'lsa va status haqiqatan ham o'zgargan bo'lsa, xabarni navbatga qo'yamiz.
+            # Xabarning o'zini notification_dispatcher yuboradi (bu yerda tarmoq so'rovi yo'q).
+            status_changed = not is_new_creation and old_status is not None and old_status != new_status_after_save
+            if status_changed and self.user_id:
+                OrderNotification.objects.create(order_id=self.pk, user_id=self.user_id,
+                                                 order_status=new_status_after_save)
+            if status_changed:
+                changes = [(self.pk, old_status, new_status_after_save)]
+                transaction.on_commit(lambda: order_status_changed.send(sender=Order, changes=changes))
+
+        if status_saved:
+            self._original_status = new_status_after_save
+
+        if status_changed:
+            if self.user_id:
                 logger.info(
                     f"Order {self.pk} status changed from '{old_status}' to '{new_status_after_save}'. "
-                    f"Attempting to send notification to user {self.user.telegram_id}."
+                    f"Notification queued for user {self.user_id}."
                 )
-                # Statusning foydalanuvchiga ko'rinadigan nomini olamiz
-                # get_status_display() metodi choices'dagi ikkinchi qiymatni qaytaradi
-                status_display_name = self.get_status_display()
-
-                message_text = ""
-                if self.user.language_code == 'uz':
-                    message_text = f"🔔 Sizning #{self.pk} raqamli buyurtmangizning holati \"<b>{status_display_name}</b>\" ga o'zgardi."
-                else:  # Standart til ruscha yoki boshqa tillarni ham qo'shish mumkin
-                    message_text = f"🔔 Статус вашего заказа #{self.pk} изменен на \"<b>{status_display_name}</b>\"."
-
-                try:
-                    # Sinxron xabar yuborish funksiyasini chaqiramiz
-                    send_direct_telegram_notification(  # Bu funksiya utils.py da bo'lishi kerak
-                        telegram_id=self.user.telegram_id,
-                        message_text=message_text
-                    )
-                except Exception as e:
-                    # Xabar yuborishdagi xatolik saqlash jarayonini to'xtatmasligi kerak
-                    logger.error(f"Failed to send order status notification for order {self.pk} (sync): {e}",
-                                 exc_info=True)
             else:
-                logger.warning(
-                    f"Order {self.pk} status changed, but user telegram_id or language_code is missing. Cannot send notification.")
+                logger.warning(f"Order {self.pk} status changed, but order has no user. Cannot send notification.")
         elif is_new_creation:
             # Yangi buyurtma yaratilganda (checkout orqali), xabar yuborish checkout logikasi tomonidan amalga oshiriladi.
             # Bu yerda qo'shimcha xabar yuborish shart emas, faqat log yozamiz.
@@ -468,11 +614,37 @@ class Order(models.Model):
         verbose_name = _("Buyurtma")
         verbose_name_plural = _("Buyurtmalar")
         ordering = ['-created_at']  # Oxirgi buyurtmalar birinchi
+        indexes = [
+            # Buyurtmalar tarixi (OrderHistoryCursorPagination): (created_at, id) bo'yicha keyset
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_history_idx'),
+            # Admin ro'yxati (tartib va sana filtri) butun jadvalni skanerlamasligi uchun
+            models.Index(fields=['-created_at'], name='order_created_idx'),
+            # Oshxona navbati: faqat aktiv buyurtmalar indekslanadi (yakunlanganlar indeksni kattalashtirmaydi)
+            models.Index(fields=['status', 'created_at'], name='order_active_queue_idx',
+                         condition=models.Q(status__in=ACTIVE_ORDER_STATUSES)),
+        ]
+        constraints = [
+            UniqueConstraint(fields=['user', 'idempotency_key'], condition=models.Q(idempotency_key__isnull=False),
+                             name='unique_order_idempotency_key')
+        ]
+
+    @classmethod
+    def timestamp_fields_for(cls, status: str) -> list[str]:
+        """status holatiga o'tganda (bo'sh bo'lsa) to'ldiriladigan vaqt maydonlari."""
+        fields = [cls.STATUS_TIMESTAMP_FIELDS[status]] if status in cls.STATUS_TIMESTAMP_FIELDS else []
+        if status in cls.READY_STATUSES:
+            fields.append('ready_at')
+        return fields
+
+    def get_contents_summary(self, language: str | None = None) -> str:
+        """Joriy (yoki berilgan) tildagi qisqa tarkib; bo'lmasa standart tildagisi."""
+        summary = self.contents_summary or {}
+        language = language or translation.get_language() or settings.LANGUAGE_CODE
+        return summary.get(language) or summary.get(settings.LANGUAGE_CODE) or next(iter(summary.values()), '')
 
     def __str__(self):
-        # Foydalanuvchi None bo'lishi mumkinligini hisobga olamiz (SET_NULL tufayli)
-        user_display = self.user.username if self.user else (self.user.phone_number if self.user else _('Noma\'lum'))
-        return f"Buyurtma #{self.pk} ({user_display}) - {self.get_status_display()}"
+        # self.user'ga murojaat qilinmaydi: admin ro'yxatlari va FK tanlovlarida har qator uchun so'rov bo'lmasin
+        return f"Buyurtma #{self.pk} - {self.get_status_display()}"
 
 
 class UserAddress(models.Model):
@@ -599,3 +771,125 @@ class Promotion(TranslatableModel):
         if self.start_date > now: return False
         if self.end_date and self.end_date < now: return False
         return True
+
+
+# --- Google Drive sinxronlash navbati ---
+class GDriveSyncJob(models.Model):
+    """Rasmlarni Google Drive'ga yuklash/o'chirish uchun fon vazifalari (gdrive_worker bajaradi)."""
+    ACTION_CHOICES = (
+        ('upload', _('Yuklash')),
+        ('delete', _("O'chirish")),
+    )
+    STATUS_CHOICES = (
+        ('pending', _('Navbatda')),
+        ('processing', _('Bajarilmoqda')),
+        ('done', _('Bajarildi')),
+        ('skipped', _("O'tkazib yuborildi")),
+        ('failed', _('Xatolik')),
+    )
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True,
+                                     verbose_name=_("Model turi"))
+    object_id = models.PositiveBigIntegerField(_("Obyekt IDsi"), null=True, blank=True)
+    action = models.CharField(_("Amal"), max_length=10, choices=ACTION_CHOICES)
+    # Yuklash uchun: navbatga qo'yilgan paytdagi lokal rasm nomi (ImageField.name)
+    image_name = models.CharField(_("Lokal rasm"), max_length=255, blank=True, default='')
+    # Rasm qaysi ImageField'da (enqueue_upload(image_field_name=...))
+    image_field = models.CharField(_("Rasm maydoni"), max_length=64, default='image')
+    # O'chirish uchun: Drive'dagi fayl IDsi
+    drive_file_id = models.CharField(_("Google Drive Fayl IDsi"), max_length=255, blank=True, null=True)
+
+    status = models.CharField(_("Holati"), max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(_("Urinishlar soni"), default=0)
+    next_attempt_at = models.DateTimeField(_("Keyingi urinish vaqti"), default=timezone.now)
+    locked_at = models.DateTimeField(_("Worker olgan vaqt"), null=True, blank=True)
+    last_error = models.TextField(_("Oxirgi xatolik"), blank=True, default='')
+    created_at = models.DateTimeField(_("Yaratilgan vaqti"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("Yangilangan vaqti"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Google Drive vazifasi")
+        verbose_name_plural = _("Google Drive vazifalari")
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='gdrive_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} #{self.pk} ({self.content_type_id}:{self.object_id}) - {self.get_status_display()}"
+
+
+# --- Buyurtma holati bildirishnomalari (outbox) ---
+class OrderNotification(models.Model):
+    """
+    Buyurtma holati o'zgarganda foydalanuvchiga yuboriladigan Telegram xabarlari navbati.
+    Order bilan bir tranzaksiyada yoziladi, notification_dispatcher yuboradi.
+    """
+    STATE_CHOICES = (
+        ('pending', _('Navbatda')),
+        ('sent', _('Yuborildi')),
+        ('skipped', _("O'tkazib yuborildi")),
+        ('failed', _('Xatolik')),
+    )
+
+    order = models.ForeignKey('Order', on_delete=models.CASCADE, related_name='notifications',
+                              verbose_name=_("Buyurtma"))
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='order_notifications', verbose_name=_("Foydalanuvchi"))
+    order_status = models.CharField(_("Buyurtma holati"), max_length=20, choices=Order.STATUS_CHOICES)
+    state = models.CharField(_("Yuborish holati"), max_length=10, choices=STATE_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(_("Urinishlar soni"), default=0)
+    next_attempt_at = models.DateTimeField(_("Keyingi urinish vaqti"), default=timezone.now)
+    locked_at = models.DateTimeField(_("Dispatcher olgan vaqt"), null=True, blank=True)
+    last_error = models.TextField(_("Oxirgi xatolik"), blank=True, default='')
+    created_at = models.DateTimeField(_("Yaratilgan vaqti"), auto_now_add=True)
+    sent_at = models.DateTimeField(_("Yuborilgan vaqti"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Buyurtma bildirishnomasi")
+        verbose_name_plural = _("Buyurtma bildirishnomalari")
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['state', 'next_attempt_at'], name='order_notif_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"Buyurtma #{self.order_id}: {self.get_order_status_display()} - {self.get_state_display()}"
+
+
+# --- Filial ETA profili ---
+class BranchEtaProfile(models.Model):
+    """
+    Filial va soat bo'yicha tayyorlash/yetkazish davomiyligining o'rganilgan taqsimoti (api/eta.py).
+    Gistogramma har bir yangi namunada eskirish koeffitsienti bilan yangilanadi, kvantillar
+    oldindan hisoblanib saqlanadi - checkout faqat tayyor qiymatni o'qiydi.
+    """
+    KIND_CHOICES = (
+        ('prep', _('Tayyorlash')),
+        ('delivery', _('Yetkazish')),
+    )
+    ALL_HOURS = 24  # Soatdan qat'i nazar umumiy taqsimot
+
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='eta_profiles',
+                               verbose_name=_("Filial"))
+    kind = models.CharField(_("Turi"), max_length=10, choices=KIND_CHOICES)
+    hour = models.PositiveSmallIntegerField(_("Soat"), help_text=_("0-23, 24 - barcha soatlar"))
+    histogram = models.JSONField(_("Gistogramma"), default=list)
+    sample_count = models.PositiveIntegerField(_("Namunalar soni"), default=0)
+    weight = models.FloatField(_("Eskirgan vazn"), default=0)
+    p50_minutes = models.FloatField(_("Mediana (daqiqa)"), null=True, blank=True)
+    p80_minutes = models.FloatField(_("80-persentil (daqiqa)"), null=True, blank=True)
+    p90_minutes = models.FloatField(_("90-persentil (daqiqa)"), null=True, blank=True)
+    updated_at = models.DateTimeField(_("Yangilangan vaqti"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Filial ETA profili")
+        verbose_name_plural = _("Filial ETA profillari")
+        ordering = ['branch', 'kind', 'hour']
+        constraints = [
+            UniqueConstraint(fields=['branch', 'kind', 'hour'], name='unique_branch_eta_profile')
+        ]
+
+    def __str__(self):
+        hour = _("barcha soatlar") if self.hour == self.ALL_HOURS else f"{self.hour:02d}:00"
+        return f"{self.branch_id}: {self.get_kind_display()} ({hour}) - p50={self.p50_minutes}"
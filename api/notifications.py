@@ -0,0 +1,220 @@
+# api/notifications.py
+import time
+import random
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction, close_old_connections
+from django.utils import timezone, translation
+
+from .models import Order, OrderNotification
+from .utils import get_telegram_session
+
+logger = logging.getLogger(__name__)
+
+# Telegram cheklovlari: ~30 xabar/sek umumiy, bitta chatga ~1 xabar/sek
+NOTIFICATION_GLOBAL_RATE = getattr(settings, 'NOTIFICATION_GLOBAL_RATE', 25)
+NOTIFICATION_PER_CHAT_INTERVAL = getattr(settings, 'NOTIFICATION_PER_CHAT_INTERVAL', 1.0)
+NOTIFICATION_MAX_ATTEMPTS = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+NOTIFICATION_WORKERS = getattr(settings, 'NOTIFICATION_WORKERS', 8)
+NOTIFICATION_LOCK_TIMEOUT = 5 * 60  # 'Olingan', lekin yakunlanmagan xabarlar shu vaqtdan keyin qayta olinadi
+
+SendResult = namedtuple('SendResult', ['ok', 'permanent', 'retry_after', 'error'])
+
+
+# --- Rate limiter ---
+class RateLimiter:
+    """Thread-safe token bucket. 429 javobida pause() bilan hammasi to'xtatib turiladi."""
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = rate
+        self.capacity = burst or max(int(rate), 1)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+# --- Telegram'ga yuborish ---
+class TelegramSender:
+    def __init__(self, bot_token: str, session: requests.Session | None = None):
+        self.send_url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+        self.session = session or get_telegram_session()
+
+    def send(self, chat_id: int, text: str) -> SendResult:
+        payload = {'chat_id': str(chat_id), 'text': text, 'parse_mode': 'HTML'}
+        try:
+            response = self.session.post(self.send_url, json=payload, timeout=(3.05, 10))
+        except requests.exceptions.RequestException as e:
+            return SendResult(False, False, None, f"Network error: {e}")
+
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+        if response.status_code == 200 and data.get('ok'):
+            return SendResult(True, False, None, '')
+
+        description = data.get('description') or response.text[:200]
+        error = f"[{response.status_code}] {description}"
+        if response.status_code == 429:
+            retry_after = (data.get('parameters') or {}).get('retry_after', 1)
+            return SendResult(False, False, float(retry_after), error)
+        if response.status_code in (400, 403):
+            # Chat topilmadi / bot bloklangan: qayta urinish foyda bermaydi
+            return SendResult(False, True, None, error)
+        return SendResult(False, False, None, error)
+
+
+def render_status_message(notification: OrderNotification) -> str:
+    """Xabar matnini yuborish paytida, foydalanuvchi tilida tayyorlaydi."""
+    lang = notification.user.language_code or 'uz'
+    with translation.override(lang):
+        status_display_name = str(dict(Order.STATUS_CHOICES).get(notification.order_status,
+                                                                   notification.order_status))
+    if lang == 'uz':
+        return f"🔔 Sizning #{notification.order_id} raqamli buyurtmangizning holati \"<b>{status_display_name}</b>\" ga o'zgardi."
+    # Standart til ruscha
+    return f"🔔 Статус вашего заказа #{notification.order_id} изменен на \"<b>{status_display_name}</b>\"."
+
+
+def compute_backoff(attempts: int) -> timedelta:
+    delay = min(5 * (2 ** max(attempts - 1, 0)), 15 * 60)
+    return timedelta(seconds=random.uniform(delay / 2, delay))
+
+
+# --- Dispatcher ---
+class NotificationDispatcher:
+    def __init__(self, sender: TelegramSender, global_rate: float = NOTIFICATION_GLOBAL_RATE,
+                 per_chat_interval: float = NOTIFICATION_PER_CHAT_INTERVAL, workers: int = NOTIFICATION_WORKERS):
+        self.sender = sender
+        self.limiter = RateLimiter(global_rate)
+        self.per_chat_interval = per_chat_interval
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='notify')
+        self._chat_last_sent = {}  # chat_id -> time.monotonic()
+        self._chat_lock = threading.Lock()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def claim(self, batch_size: int) -> list[OrderNotification]:
+        now = timezone.now()
+        stale_lock = now - timedelta(seconds=NOTIFICATION_LOCK_TIMEOUT)
+        with transaction.atomic():
+            ready = (
+                    OrderNotification.objects.filter(state='pending', next_attempt_at__lte=now, locked_at__isnull=True) |
+                    OrderNotification.objects.filter(state='pending', locked_at__lt=stale_lock)
+            )
+            ids = list(
+                ready.select_for_update(skip_locked=True).order_by('next_attempt_at', 'id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if ids:
+                OrderNotification.objects.filter(pk__in=ids).update(locked_at=now)
+        # Foydalanuvchi ma'lumotlari bitta so'rovda
+        return list(OrderNotification.objects.filter(pk__in=ids).select_related('user').order_by('id'))
+
+    def _release(self, notification_ids, **fields):
+        if notification_ids:
+            OrderNotification.objects.filter(pk__in=notification_ids).update(locked_at=None, **fields)
+
+    def _send_one(self, chat_id: int, text: str) -> SendResult:
+        self.limiter.acquire()
+        result = self.sender.send(chat_id, text)
+        if result.retry_after:
+            # Telegram 429 qaytardi: barcha yuborishlarni shu vaqtga to'xtatamiz
+            self.limiter.pause(result.retry_after)
+        else:
+            with self._chat_lock:
+                self._chat_last_sent[chat_id] = time.monotonic()
+        return result
+
+    def dispatch_batch(self, batch_size: int = 100) -> int:
+        notifications = self.claim(batch_size)
+        if not notifications:
+            return 0
+
+        now = timezone.now()
+        latest_per_order = {}
+        for notification in notifications:
+            latest_per_order[notification.order_id] = notification.pk
+
+        to_send, skipped, deferred = [], [], []
+        chats_in_batch = set()
+        monotonic_now = time.monotonic()
+        for notification in notifications:
+            user = notification.user
+            if latest_per_order[notification.order_id] != notification.pk:
+                skipped.append(notification.pk)  # Shu buyurtma uchun yangiroq holat bor
+                continue
+            if not user or not user.telegram_id:
+                skipped.append(notification.pk)
+                continue
+            chat_id = user.telegram_id
+            with self._chat_lock:
+                last_sent = self._chat_last_sent.get(chat_id)
+            too_soon = last_sent is not None and monotonic_now - last_sent < self.per_chat_interval
+            if chat_id in chats_in_batch or too_soon:
+                deferred.append(notification.pk)  # Bitta chatga sekundiga bittadan ko'p emas
+                continue
+            chats_in_batch.add(chat_id)
+            to_send.append((notification, chat_id, render_status_message(notification)))
+
+        self._release(skipped, state='skipped', last_error='Superseded or no telegram_id')
+        self._release(deferred, next_attempt_at=now + timedelta(seconds=self.per_chat_interval))
+
+        futures = [(notification, self.executor.submit(self._send_one, chat_id, text))
+                   for notification, chat_id, text in to_send]
+        sent_ids = []
+        for notification, future in futures:
+            try:
+                result = future.result()
+            except Exception as e:
+                # Kutilmagan xato sikldan chiqib ketmasin: aks holda yuborilganlar 'sent' bo'lmay qoladi va
+                # lock muddati o'tgach qayta yuboriladi. Bu xabar oddiy xato kabi qayta urinishga qo'yiladi.
+                logger.exception(f"Order notification #{notification.pk} raised while sending")
+                result = SendResult(False, False, None, f"Unexpected error: {e!r}")
+            if result.ok:
+                sent_ids.append(notification.pk)
+                continue
+            attempts = notification.attempts + 1
+            if result.permanent or attempts >= NOTIFICATION_MAX_ATTEMPTS:
+                logger.error(f"Order notification #{notification.pk} failed permanently: {result.error}")
+                self._release([notification.pk], state='failed', attempts=attempts, last_error=result.error)
+                continue
+            delay = timedelta(seconds=result.retry_after) if result.retry_after else compute_backoff(attempts)
+            logger.warning(f"Order notification #{notification.pk} failed ({result.error}), retry in {delay}.")
+            self._release([notification.pk], attempts=attempts, last_error=result.error,
+                          next_attempt_at=timezone.now() + delay)
+
+        self._release(sent_ids, state='sent', sent_at=timezone.now(), last_error='')
+        logger.info(f"Order notifications: {len(sent_ids)} sent, {len(skipped)} skipped, "
+                    f"{len(deferred)} deferred, {len(to_send) - len(sent_ids)} failed.")
+        return len(notifications)
+
+    def run_forever(self, batch_size: int = 100, idle_sleep: float = 1.0) -> None:
+        while True:
+            close_old_connections()
+            if not self.dispatch_batch(batch_size):
+                time.sleep(idle_sleep)
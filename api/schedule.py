@@ -0,0 +1,104 @@
+# api/schedule.py
+import datetime
+import logging
+from bisect import bisect_right
+
+from django.core.cache import cache
+
+from .branch_routing import BRANCH_ROUTING_INDEX_TTL, _current_version
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 24 * 60 * 60
+SECONDS_PER_WEEK = 7 * SECONDS_PER_DAY
+# Lokal xotira keshida (har jarayonda alohida) boshqa jarayondagi o'zgarish shu muddatdan keyin albatta ko'rinadi
+BRANCH_SCHEDULE_CACHE_TIMEOUT = BRANCH_ROUTING_INDEX_TTL
+
+
+def _seconds_of_day(value: datetime.time) -> int:
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _seconds_of_week(local_dt: datetime.datetime) -> float:
+    return (local_dt.weekday() * SECONDS_PER_DAY + _seconds_of_day(local_dt.time())
+            + local_dt.microsecond / 1_000_000)
+
+
+class WeeklySchedule:
+    """
+    Filialning haftalik ish vaqti: hafta boshidan (dushanba 00:00) sekundlarda
+    saralangan, kesishmaydigan [start, end) intervallar. Qidiruv bisect bilan - O(log n).
+    """
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self, intervals):
+        merged = []
+        for start, end in sorted(intervals):
+            if end <= start:
+                continue
+            if merged and start <= merged[-1][1]:
+                # Kesishgan yoki yonma-yon intervallarni birlashtiramiz (masalan, 22:00-00:00 va 00:00-02:00)
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = [start for start, _end in merged]
+        self.ends = [end for _start, end in merged]
+
+    @classmethod
+    def from_rows(cls, rows):
+        """rows: (weekday, from_hour, to_hour) ketma-ketligi. to_hour 00:00 - kun oxirigacha degani."""
+        intervals = []
+        for weekday, from_hour, to_hour in rows:
+            day_start = weekday * SECONDS_PER_DAY
+            start = _seconds_of_day(from_hour)
+            end = SECONDS_PER_DAY if to_hour == datetime.time(0, 0) else _seconds_of_day(to_hour)
+            intervals.append((day_start + start, day_start + end))
+        return cls(intervals)
+
+    @classmethod
+    def from_working_hours(cls, working_hours):
+        return cls.from_rows((wh.weekday, wh.from_hour, wh.to_hour) for wh in working_hours)
+
+    def to_intervals(self) -> list:
+        return list(zip(self.starts, self.ends))
+
+    def is_open_at(self, local_dt: datetime.datetime) -> bool:
+        """local_dt - filial vaqt zonasidagi vaqt (timezone.localtime)."""
+        t = _seconds_of_week(local_dt)
+        i = bisect_right(self.starts, t) - 1
+        return i >= 0 and t < self.ends[i]
+
+    def next_opening(self, local_dt: datetime.datetime) -> datetime.datetime | None:
+        """Keyingi ochilish vaqti. Hozir ochiq bo'lsa, local_dt ning o'zi. Jadval bo'sh bo'lsa - None."""
+        if not self.starts:
+            return None
+        if self.is_open_at(local_dt):
+            return local_dt
+        t = _seconds_of_week(local_dt)
+        i = bisect_right(self.starts, t)
+        next_start = self.starts[i] if i < len(self.starts) else self.starts[0] + SECONDS_PER_WEEK
+        return local_dt + datetime.timedelta(seconds=next_start - t)
+
+
+# --- Kesh ---
+# Kalitda filial marshrutlash versiyasi bor: WorkingHours o'zgarganda versiya oshadi (signals.py) va
+# in-process rejimda drop_local_versions uni tashlaydi - eski jadvallar o'z-o'zidan ishlatilmay qoladi
+def _cache_key(branch_id: int) -> str:
+    return f"branch_schedule:{_current_version()}:{branch_id}"
+
+
+def get_branch_schedule(branch_id: int) -> WeeklySchedule:
+    """Prefetch qilinmagan filial uchun jadval: keshdan yoki bitta so'rov bilan bazadan."""
+    key = _cache_key(branch_id)
+    intervals = cache.get(key)
+    if intervals is None:
+        from .models import WorkingHours
+        rows = WorkingHours.objects.filter(branch_id=branch_id).values_list('weekday', 'from_hour', 'to_hour')
+        schedule = WeeklySchedule.from_rows(rows)
+        cache.set(key, schedule.to_intervals(), timeout=BRANCH_SCHEDULE_CACHE_TIMEOUT)
+        return schedule
+    return WeeklySchedule(intervals)
+
+
+def invalidate_branch_schedule(branch_id: int) -> None:
+    cache.delete(_cache_key(branch_id))
@@ -0,0 +1,196 @@
+# api/search.py
+import re
+import logging
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Max, Q, Value
+from django.db.models.functions import Coalesce
+
+from .models import Product, ProductSearchEntry
+from .catalog_cache import get_catalog_state
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_SEARCH_BACKEND = getattr(settings, 'PRODUCT_SEARCH_BACKEND', 'auto')  # 'auto', 'postgres' yoki 'memory'
+SEARCH_RESULT_LIMIT = 200
+TRIGRAM_THRESHOLD = 0.4  # Xato yozilgan so'zlar uchun (faqat PostgreSQL)
+NAME_WEIGHT = 2.0
+BODY_WEIGHT = 1.0
+
+# --- Normallashtirish va transliteratsiya ---
+# Kirill (rus va o'zbek) harflari o'zbek lotin yozuviga o'giriladi, shunda "шоколад" va "shokolad"
+# bir xil tokenga aylanadi. Lotindagi tutuq belgilari (o', g') olib tashlanadi.
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo', 'ж': 'j', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'x', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sh',
+    'ъ': '', 'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+    'ў': 'o', 'қ': 'q', 'ғ': 'g', 'ҳ': 'h',
+}
+_TRANSLIT_TABLE = str.maketrans(CYRILLIC_TO_LATIN)
+_APOSTROPHES_RE = re.compile(r"['`‘’ʻʼ]")
+# Rus tilidan lotinga o'girilgan so'zlardagi variantlarni o'zbekcha shaklga keltiramiz (khachapuri -> xachapuri)
+_LATIN_FOLDS = (('kh', 'x'), ('zh', 'j'), ('w', 'v'))
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize_text(text: str | None) -> str:
+    """Matnni qidiruv uchun yagona ko'rinishga keltiradi: kichik harf, lotin yozuvi, diakritikasiz."""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).lower().translate(_TRANSLIT_TABLE)
+    text = _APOSTROPHES_RE.sub('', text)
+    text = ''.join(ch for ch in unicodedata.normalize('NFKD', text) if not unicodedata.combining(ch))
+    for source, target in _LATIN_FOLDS:
+        text = text.replace(source, target)
+    return ' '.join(_TOKEN_RE.findall(text))
+
+
+def tokenize(text: str | None) -> list[str]:
+    return normalize_text(text).split()
+
+
+def use_postgres() -> bool:
+    if PRODUCT_SEARCH_BACKEND == 'memory':
+        return False
+    if PRODUCT_SEARCH_BACKEND == 'postgres':
+        return True
+    return connection.vendor == 'postgresql'
+
+
+# --- Indeksni yangilash ---
+def index_products(product_ids=None) -> int:
+    """
+    Mahsulot tarjimalaridan qidiruv yozuvlarini qayta quradi (product_ids=None bo'lsa - hammasi).
+    Yozilgan yozuvlar sonini qaytaradi.
+    """
+    translation_model = Product._parler_meta.root_model
+    translations = translation_model.objects.all()
+    entries = ProductSearchEntry.objects.all()
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        translations = translations.filter(master_id__in=product_ids)
+        entries = entries.filter(product_id__in=product_ids)
+
+    new_entries = [
+        ProductSearchEntry(
+            product_id=master_id,
+            language_code=language_code,
+            name_document=normalize_text(name),
+            body_document=normalize_text(description),
+        )
+        for master_id, language_code, name, description in
+        translations.values_list('master_id', 'language_code', 'name', 'description')
+    ]
+    with transaction.atomic():
+        entries.delete()
+        created = ProductSearchEntry.objects.bulk_create(new_entries)
+        if created and use_postgres():
+            ProductSearchEntry.objects.filter(pk__in=[entry.pk for entry in created]).update(
+                search_vector=(SearchVector('name_document', weight='A', config='simple') +
+                               SearchVector('body_document', weight='B', config='simple'))
+            )
+    return len(new_entries)
+
+
+# --- Xotiradagi indeks (SQLite / test / PostgreSQL bo'lmaganda) ---
+class InMemorySearchIndex:
+    """
+    Inverted index: token -> {product_id: og'irlik}. Tokenlar saralangan ro'yxatda saqlanadi,
+    prefiks bo'yicha qidiruv bisect bilan bajariladi.
+    """
+
+    def __init__(self, rows):
+        postings = defaultdict(dict)
+        for product_id, name_document, body_document in rows:
+            for weight, document in ((NAME_WEIGHT, name_document), (BODY_WEIGHT, body_document)):
+                for token in document.split():
+                    if postings[token].get(product_id, 0) < weight:
+                        postings[token][product_id] = weight
+        self.postings = dict(postings)
+        self.tokens = sorted(self.postings)
+
+    def _prefix_matches(self, prefix: str):
+        i = bisect_left(self.tokens, prefix)
+        while i < len(self.tokens) and self.tokens[i].startswith(prefix):
+            yield self.tokens[i]
+            i += 1
+
+    def search(self, query: str, limit: int = SEARCH_RESULT_LIMIT) -> list[int]:
+        """Barcha so'rov tokenlari (prefiks sifatida) mos kelgan mahsulotlar, reyting bo'yicha."""
+        scores = None
+        for query_token in tokenize(query):
+            token_scores = {}
+            for token in self._prefix_matches(query_token):
+                exact_bonus = 1.0 if token == query_token else 0.5
+                for product_id, weight in self.postings[token].items():
+                    token_scores[product_id] = max(token_scores.get(product_id, 0), weight * exact_bonus)
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {pid: score + token_scores[pid] for pid, score in scores.items() if pid in token_scores}
+            if not scores:
+                return []
+        if not scores:
+            return []
+        return sorted(scores, key=lambda pid: (-scores[pid], pid))[:limit]
+
+
+_memory_index = None  # (catalog_version, InMemorySearchIndex)
+_memory_index_lock = threading.Lock()
+
+
+def get_memory_index() -> InMemorySearchIndex:
+    """Katalog versiyasi o'zgarguncha jarayonda bir marta quriladi."""
+    global _memory_index
+    version = get_catalog_state()['version']
+    current = _memory_index
+    if current is not None and current[0] == version:
+        return current[1]
+    with _memory_index_lock:
+        if _memory_index is None or _memory_index[0] != version:
+            rows = ProductSearchEntry.objects.values_list('product_id', 'name_document', 'body_document')
+            _memory_index = (version, InMemorySearchIndex(rows))
+        return _memory_index[1]
+
+
+# --- PostgreSQL ---
+def _postgres_search(tokens: list[str], limit: int) -> list[int]:
+    # Oxirgi so'z yozilayotgan bo'lishi mumkin: hamma tokenlar prefiks sifatida qidiriladi
+    search_query = SearchQuery(' & '.join(f"{token}:*" for token in tokens), search_type='raw', config='simple')
+    text = ' '.join(tokens)
+    # WHERE'da indekslanadigan operatorlar: tsvector @@ (search_vector GIN) va %> (name_document gin_trgm_ops),
+    # shunda OR ikkala indeks bo'yicha BitmapOr bo'ladi. O'xshashlik qiymati faqat tartiblash uchun.
+    similarity = TrigramWordSimilarity(Value(text), 'name_document')
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # %> chegarasi pg_trgm sozlamasidan olinadi (standart 0.6); faqat shu tranzaksiya uchun
+            cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                           [str(TRIGRAM_THRESHOLD)])
+        rows = (
+            ProductSearchEntry.objects
+            .filter(Q(search_vector=search_query) | Q(name_document__trigram_word_similar=text))
+            .values('product_id')
+            .annotate(score=Max(Coalesce(SearchRank(F('search_vector'), search_query), Value(0.0)) + similarity,
+                                output_field=FloatField()))
+            .order_by('-score', 'product_id')
+            .values_list('product_id', flat=True)[:limit]
+        )
+        return list(rows)
+
+
+# --- Umumiy kirish nuqtasi ---
+def search_product_ids(query: str, limit: int = SEARCH_RESULT_LIMIT) -> list[int]:
+    """So'rovga mos mahsulot ID'lari, eng mosidan boshlab. Kirill va lotin yozuvlari teng."""
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    if use_postgres():
+        return _postgres_search(tokens, limit)
+    return get_memory_index().search(' '.join(tokens), limit)
@@ -11,6 +11,52 @@ from .models import (
 )
 
 
+def parse_field_list(value) -> list:
+    """'id,status, total_price' -> ['id', 'status', 'total_price']"""
+    if not value:
+        return []
+    return [name.strip() for name in str(value).split(',') if name.strip()]
+
+
+class DynamicFieldsMixin:
+    """
+    Maydonlarni so'rov orqali tanlash:
+    ?fields=id,status - javobda faqat shu maydonlar;
+    ?expand=items,user - expandable_fields'dagi bog'liq obyektlar qo'shiladi (standart holatda ular yo'q).
+    Faqat eng yuqori serializer so'rov parametrlarini o'qiydi, ichki serializerlarga ta'sir qilmaydi.
+    """
+    expandable_fields = {}  # nom -> (serializer klassi, qo'shimcha kwargs)
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None:
+            if fields is None:
+                fields = parse_field_list(request.query_params.get('fields'))
+            if expand is None:
+                expand = parse_field_list(request.query_params.get('expand'))
+
+        for name in expand or ():
+            if name in self.expandable_fields and name not in self.fields:
+                serializer_class, serializer_kwargs = self.expandable_fields[name]
+                self.fields[name] = serializer_class(read_only=True, **serializer_kwargs)
+        if fields:
+            allowed = set(fields) | set(expand or ())
+            for name in list(self.fields):
+                if name not in allowed:
+                    self.fields.pop(name)
+
+    @classmethod
+    def requested_relations(cls, request, default=()) -> set:
+        """View uchun: javobga kiradigan bog'liq obyektlar (faqat shularni oldindan yuklash kerak)."""
+        expand = set(parse_field_list(request.query_params.get('expand'))) & set(cls.expandable_fields)
+        fields = parse_field_list(request.query_params.get('fields'))
+        relations = set(default) | expand
+        if fields:
+            relations &= set(fields) | expand
+        return relations
+
+
 # --- User Serializer ---
 class UserSerializer(serializers.ModelSerializer):
     """Foydalanuvchi ma'lumotlarini API uchun tayyorlaydi."""
@@ -198,12 +244,20 @@ class CartSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'updated_at']
 
 
+class OrderProductSerializer(TranslatableModelSerializer):
+    """Buyurtma qatoridagi mahsulot: nomi va rasmi (kategoriyasiz)."""
+    image_url = serializers.URLField(source='image_gdrive_url', read_only=True, allow_null=True)
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'image_url']
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     """Buyurtma tarkibidagi mahsulotni serializatsiya qiladi."""
-    # Mahsulot ma'lumotlarini ProductSerializer orqali ko'rsatamiz
+    # Mahsulotning qisqa ko'rinishi (to'liq ProductSerializer + CategorySerializer o'rniga)
     # (Faqat o'qish uchun, chunki buyurtma yaratilgandan keyin o'zgarmaydi)
-    # ProductSerializer avvalroq aniqlangan bo'lishi kerak
-    product = ProductSerializer(read_only=True)
+    product = OrderProductSerializer(read_only=True)
 
     class Meta:
         model = OrderItem
@@ -256,26 +310,61 @@ class BranchSerializer(serializers.ModelSerializer):
         ]
 
 
-class OrderSerializer(serializers.ModelSerializer):
-    """Buyurtma ma'lumotlarini (mahsulotlari bilan) serializatsiya qiladi."""
+class OrderBranchSerializer(serializers.ModelSerializer):
+    """Buyurtmadagi filialning qisqa ko'rinishi: ish vaqtlari va is_open yo'q (tarixiy buyurtma uchun kerak emas)."""
+
+    class Meta:
+        model = Branch
+        fields = ['id', 'name', 'address', 'latitude', 'longitude']
+
+
+class OrderListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Buyurtmalar tarixi uchun yengil ko'rinish (bog'liq obyektlarsiz).
+    Kerak bo'lsa ?expand=items,pickup_branch,delivery_branch,user bilan kengaytiriladi.
+    """
+    expandable_fields = {
+        'items': (OrderItemSerializer, {'many': True}),
+        'pickup_branch': (OrderBranchSerializer, {}),
+        'delivery_branch': (OrderBranchSerializer, {}),
+        'user': (UserSerializer, {}),
+    }
+    summary = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Order
+        fields = [
+            'id',
+            'status',  # Hozircha kodini chiqaramiz ('new', 'preparing', ...)
+            'total_price',
+            'delivery_type',
+            'payment_type',
+            'estimated_ready_at',
+            'estimated_delivery_at',
+            'item_count',
+            'summary',
+            'created_at',
+        ]
+
+    def get_summary(self, obj):
+        # So'rov tilidagi qisqa tarkib (checkout paytidagi nusxadan, join'siz)
+        return obj.get_contents_summary()
+
+
+class OrderSerializer(OrderListSerializer):
+    """Buyurtma ma'lumotlarini (mahsulotlari bilan) serializatsiya qiladi. ?fields / ?expand ham ishlaydi."""
     # Buyurtma tarkibidagi mahsulotlar ro'yxati
     items = OrderItemSerializer(many=True, read_only=True)
-    # Foydalanuvchi ma'lumotlari (ixtiyoriy, ID sini chiqaramiz)
-    user = UserSerializer(read_only=True)  # Yoki user_id = serializers.PrimaryKeyRelatedField(read_only=True)
-    pickup_branch = BranchSerializer(read_only=True)
-
-    # Status, delivery_type, payment_type uchun tushunarli nomlarni chiqarish (ixtiyoriy)
-    # status_display = serializers.CharField(source='get_status_display', read_only=True)
-    # delivery_type_display = serializers.CharField(source='get_delivery_type_display', read_only=True)
-    # payment_type_display = serializers.CharField(source='get_payment_type_display', read_only=True)
+    # Foydalanuvchi ma'lumotlari
+    user = UserSerializer(read_only=True)
+    pickup_branch = OrderBranchSerializer(read_only=True)
 
     class Meta:
         model = Order
         fields = [
             'id',
             'user',
-            'status',  # Hozircha kodini chiqaramiz ('new', 'preparing', ...)
-            # 'status_display', # Agar yuqoridagi kabi qo'shilsa
+            'status',
             'total_price',
             'delivery_type',
             'address',
@@ -286,6 +375,8 @@ class OrderSerializer(serializers.ModelSerializer):
             'pickup_branch',
             'estimated_ready_at',
             'estimated_delivery_at',
+            'item_count',
+            'summary',
             'items',
             'created_at',
             'updated_at',
@@ -299,7 +390,8 @@ class CheckoutSerializer(serializers.Serializer):
         required=True
     )
     pickup_branch_id = serializers.PrimaryKeyRelatedField(
-        queryset=Branch.objects.filter(is_active=True),
+        # Ochiqlik tekshiruvi keshdagi emas, bazadagi joriy ish vaqti bo'yicha
+        queryset=Branch.objects.filter(is_active=True).prefetch_related('working_hours'),
         source='pickup_branch',
         required=False,
         allow_null=True,
@@ -362,6 +454,43 @@ class CheckoutSerializer(serializers.Serializer):
         return data
 
 
+class CheckoutItemSerializer(serializers.ModelSerializer):
+    """Checkout javobidagi mahsulot qatori: to'liq ProductSerializer o'rniga faqat nomi."""
+    product_id = serializers.IntegerField(read_only=True)
+    product_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OrderItem
+        fields = ['product_id', 'product_name', 'quantity', 'price_per_unit', 'total_price']
+
+    def get_product_name(self, obj):
+        if obj.product is None:
+            return None
+        return obj.product.safe_translation_getter('name', any_language=True)
+
+
+class CheckoutResultSerializer(serializers.ModelSerializer):
+    """Checkout natijasi: bot ko'rsatadigan maydonlargina (ixcham javob)."""
+    items = CheckoutItemSerializer(many=True, read_only=True)
+    pickup_branch = OrderBranchSerializer(read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id',
+            'status',
+            'total_price',
+            'delivery_type',
+            'address',
+            'payment_type',
+            'pickup_branch',
+            'estimated_ready_at',
+            'estimated_delivery_at',
+            'items',
+            'created_at',
+        ]
+
+
 class UserAddressSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserAddress
@@ -0,0 +1,268 @@
+# api/services.py
+import json
+import hashlib
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Prefetch, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import translation
+from django.utils.translation import gettext_lazy as _
+
+from .branch_routing import route_delivery
+from .eta import estimate_times
+from .models import Cart, CartItem, Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+MONEY_FIELD = DecimalField(max_digits=12, decimal_places=2)
+
+
+# --- Savat ---
+def cart_items_queryset():
+    """Serializer uchun kerakli hamma narsa oldindan yuklangan, qator summasi (line_total) DB'da hisoblangan itemlar."""
+    return (
+        CartItem.objects
+        .select_related('product', 'product__category')
+        .prefetch_related('product__translations', 'product__category__translations')
+        .annotate(line_total=ExpressionWrapper(F('product__price') * F('quantity'), output_field=MONEY_FIELD))
+    )
+
+
+def cart_queryset():
+    """Savat + uning umumiy summasi (annotated_total) bitta so'rovda."""
+    cart_total = (
+        CartItem.objects
+        .filter(cart=OuterRef('pk'))
+        .values('cart')
+        .annotate(total=Sum(ExpressionWrapper(F('product__price') * F('quantity'), output_field=MONEY_FIELD)))
+        .values('total')
+    )
+    return (
+        Cart.objects
+        .select_related('user')
+        .annotate(annotated_total=Coalesce(Subquery(cart_total, output_field=MONEY_FIELD),
+                                           Value(Decimal('0')), output_field=MONEY_FIELD))
+        .prefetch_related(Prefetch('items', queryset=cart_items_queryset()))
+    )
+
+
+def load_cart(cart_id: int) -> Cart:
+    """Serializatsiya uchun tayyor savat (GET/POST/PATCH/DELETE javoblari shu orqali)."""
+    return cart_queryset().get(pk=cart_id)
+
+
+def load_cart_for_user(user) -> Cart:
+    """Foydalanuvchi savatini yuklaydi, bo'lmasa yaratadi."""
+    cart = cart_queryset().filter(user=user).first()
+    if cart is None:
+        cart, created = Cart.objects.get_or_create(user=user)
+        if created:
+            logger.info(f"Created new cart (ID: {cart.pk}) for user {user.pk}")
+        cart = load_cart(cart.pk)
+    return cart
+
+
+# --- Checkout ---
+class CheckoutError(Exception):
+    """Checkout bajarilmadi; xabar to'g'ridan-to'g'ri mijozga qaytariladi."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def choose_delivery_branch(latitude=None, longitude=None):
+    """Yetkazib berish uchun filial: mijozga eng yaqin ochiq aktiv filial (batafsil: branch_routing.py)."""
+    route = route_delivery(latitude, longitude)
+    if route is None:
+        return None
+    if route.distance_m is not None:
+        logger.info(f"Delivery to ({latitude},{longitude}) routed to branch {route.branch.pk} "
+                    f"({route.distance_m / 1000:.1f} km, open={route.is_open}).")
+    return route.branch
+
+
+ORDER_SUMMARY_MAX_LENGTH = 120
+
+
+def _product_names(product) -> dict:
+    """Mahsulotning barcha tillardagi nomi (translations prefetch qilingan bo'lishi kerak)."""
+    if product is None:
+        return {}
+    return {t.language_code: t.name for t in product.translations.all() if t.name}
+
+
+def build_order_summary(lines) -> dict:
+    """
+    lines: (product, quantity) ketma-ketligi. Order'ning item_count, contents_summary va
+    product_names maydonlari uchun qiymatlar (har bir til uchun alohida).
+    """
+    languages = [code for code, _name in settings.LANGUAGES]
+    item_count = 0
+    parts = {lang: [] for lang in languages}
+    names_by_language = {lang: [] for lang in languages}
+    for product, quantity in lines:
+        item_count += quantity
+        names = _product_names(product)
+        fallback = names.get(settings.LANGUAGE_CODE) or next(iter(names.values()), None)
+        for lang in languages:
+            name = names.get(lang) or fallback
+            if name is None:
+                with translation.override(lang):
+                    name = str(_("O'chirilgan mahsulot"))
+            names_by_language[lang].append(name)
+            parts[lang].append(f"{quantity}× {name}")
+
+    summary = {}
+    for lang, lang_parts in parts.items():
+        text = ", ".join(lang_parts)
+        if len(text) > ORDER_SUMMARY_MAX_LENGTH:
+            text = text[:ORDER_SUMMARY_MAX_LENGTH - 1].rstrip(", ") + "…"
+        summary[lang] = text
+    return {'item_count': item_count, 'contents_summary': summary, 'product_names': names_by_language}
+
+
+# Idempotency kaliti bilan birga saqlanadigan so'rov maydonlari (savat qatorlaridan tashqari)
+CHECKOUT_FINGERPRINT_FIELDS = ('delivery_type', 'address', 'latitude', 'longitude', 'payment_type', 'notes',
+                               'pickup_branch')
+
+
+def checkout_fingerprint(lines, validated_data: dict) -> str:
+    """lines: (product_id, quantity) ketma-ketligi. Savat tarkibi va checkout maydonlarining sha256 xeshi."""
+    payload = {'lines': sorted([product_id, quantity] for product_id, quantity in lines)}
+    for field in CHECKOUT_FINGERPRINT_FIELDS:
+        value = validated_data.get(field)
+        payload[field] = getattr(value, 'pk', value)
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _find_replay(user, idempotency_key, validated_data: dict, cart_lines):
+    """
+    Shu kalit bilan yaratilgan buyurtma (bo'lmasa None). Kalit boshqa so'rov bilan qayta ishlatilgan bo'lsa -
+    CheckoutError (422). cart_lines - joriy savat qatorlari; bo'sh bo'lsa, ularni asl buyurtma ishlatib bo'lgan
+    (haqiqiy qayta yuborish), shuning uchun taqqoslash buyurtma qatorlari bilan qilinadi.
+    """
+    if not idempotency_key:
+        return None
+    replay = Order.objects.filter(user=user, idempotency_key=idempotency_key).first()
+    if replay is None or not replay.idempotency_fingerprint:  # Izdan oldingi buyurtmalar tekshirilmaydi
+        return replay
+    lines = list(cart_lines) or list(replay.items.values_list('product_id', 'quantity'))
+    if checkout_fingerprint(lines, validated_data) != replay.idempotency_fingerprint:
+        logger.warning(f"Idempotency key {idempotency_key} of user {user.pk} reused with a different checkout "
+                       f"(order {replay.pk}).")
+        raise CheckoutError("Bu Idempotency-Key boshqa savat yoki checkout ma'lumotlari bilan ishlatilgan.",
+                            status_code=422)
+    return replay
+
+
+def place_order(user, validated_data: dict, idempotency_key: str | None = None) -> tuple[Order, bool]:
+    """
+    Savatdan buyurtma yaratadi. (order, created) qaytaradi.
+    Savat qatori qulflanadi, shuning uchun bir foydalanuvchining parallel checkout'lari navbat bilan bajariladi;
+    bir xil idempotency_key bilan qayta yuborilgan o'sha so'rov asl buyurtmani qaytaradi (created=False),
+    kalit boshqa savat/ma'lumotlar bilan kelsa - CheckoutError (422).
+    """
+    if idempotency_key:
+        current_lines = CartItem.objects.filter(cart__user=user).values_list('product_id', 'quantity')
+        replay = _find_replay(user, idempotency_key, validated_data, current_lines)
+        if replay is not None:
+            return replay, False
+
+    request_lines = []
+    try:
+        with transaction.atomic():
+            cart = Cart.objects.select_for_update().filter(user=user).first()
+            if cart is None:
+                raise CheckoutError("Savat topilmadi.")
+
+            # Savat qatorlari va mahsulotlar bitta so'rovda (faqat savat qatorlari qulflanadi)
+            cart_items = list(
+                CartItem.objects.select_for_update(of=('self',))
+                .filter(cart=cart)
+                .select_related('product')
+                .prefetch_related('product__translations')
+                .order_by('pk')
+            )
+            request_lines = [(item.product_id, item.quantity) for item in cart_items]
+
+            # Qulfni kutgan parallel so'rov: birinchisi allaqachon buyurtma yaratgan bo'lishi mumkin
+            replay = _find_replay(user, idempotency_key, validated_data, request_lines)
+            if replay is not None:
+                return replay, False
+
+            if not cart_items:
+                raise CheckoutError("Buyurtma berish uchun savat bo'sh.")
+
+            unavailable = [item.product for item in cart_items if not item.product.is_available]
+            if unavailable:
+                names = ", ".join(str(product) for product in unavailable)
+                raise CheckoutError(f"Mahsulot '{names}' buyurtma paytida mavjud emas.")
+
+            delivery_type = validated_data.get('delivery_type')
+            pickup_branch = validated_data.get('pickup_branch') if delivery_type == 'pickup' else None
+            delivery_branch = None
+            if delivery_type == 'delivery':
+                delivery_branch = choose_delivery_branch(validated_data.get('latitude'),
+                                                         validated_data.get('longitude'))
+            relevant_branch = pickup_branch if delivery_type == 'pickup' else delivery_branch
+            estimated_ready_at, estimated_delivery_at = estimate_times(relevant_branch, delivery_type)
+
+            order = Order.objects.create(
+                **build_order_summary((item.product, item.quantity) for item in cart_items),
+                user=user,
+                status='new',
+                total_price=sum(item.product.price * item.quantity for item in cart_items),
+                delivery_type=delivery_type,
+                address=validated_data.get('address'),
+                latitude=validated_data.get('latitude'),
+                longitude=validated_data.get('longitude'),
+                payment_type=validated_data.get('payment_type'),
+                notes=validated_data.get('notes'),
+                pickup_branch=pickup_branch,
+                delivery_branch=delivery_branch,
+                estimated_ready_at=estimated_ready_at,
+                estimated_delivery_at=estimated_delivery_at,
+                idempotency_key=idempotency_key or None,
+                idempotency_fingerprint=checkout_fingerprint(request_lines, validated_data) if idempotency_key else '',
+            )
+            order_items = OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product=item.product,
+                    quantity=item.quantity,
+                    price_per_unit=item.product.price,
+                    total_price=item.product.price * item.quantity
+                )
+                for item in cart_items
+            ])
+            # Faqat buyurtmaga kirgan qatorlarni o'chiramiz
+            CartItem.objects.filter(pk__in=[item.pk for item in cart_items]).delete()
+    except IntegrityError:
+        # Unikal (user, idempotency_key) cheklovi: boshqa so'rov shu kalit bilan ulgurib qolgan
+        replay = _find_replay(user, idempotency_key, validated_data, request_lines)
+        if replay is not None:
+            return replay, False
+        raise
+
+    # Javob uchun qo'shimcha so'rovlarsiz: bog'liq obyektlarni xotirada biriktiramiz
+    for order_item in order_items:
+        order_item.order = order
+    order._prefetched_objects_cache = {'items': order_items}
+    logger.info(f"Order {order.pk} created for user {user.pk} ({len(order_items)} items, key={idempotency_key}).")
+    return order, True
+
+
+def load_checkout_result(order: Order) -> Order:
+    """Qayta yuborilgan (replay) so'rov uchun: ixcham javobga kerakli ma'lumotlar bilan buyurtma."""
+    return (
+        Order.objects
+        .select_related('pickup_branch')
+        .prefetch_related(Prefetch('items', queryset=OrderItem.objects.select_related('product')
+                                   .prefetch_related('product__translations')))
+        .get(pk=order.pk)
+    )
@@ -1,3 +1,505 @@
-from django.test import TestCase
+# api/tests.py
+import os
+import random
+import datetime
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import gdrive_utils, search, services
+from .gdrive_jobs import _process_upload, enqueue_upload
+from .branch_routing import BranchIndex, haversine_m, linear_nearest
+from .catalog_cache import drop_local_versions
+from .eta import _order_samples
+from .models import (Branch, BranchEtaProfile, Cart, CartItem, Category, Order, OrderNotification, Product, Promotion,
+                     User, WorkingHours)
+from .schedule import WeeklySchedule, get_branch_schedule
+from .serializers import CheckoutSerializer
+from .notifications import NotificationDispatcher, SendResult
+from .services import CheckoutError, checkout_fingerprint, place_order
+
+
+def create_user(telegram_id: int, **extra) -> User:
+    return User.objects.create(username=f"user{telegram_id}", telegram_id=telegram_id,
+                               phone_number=f"+99890{telegram_id:07d}", is_active=True, **extra)
+
+
+# --- Filial tanlash ---
+class FakeBranch:
+    def __init__(self, pk, latitude, longitude):
+        self.pk, self.latitude, self.longitude = pk, latitude, longitude
+
+
+class BranchIndexTests(TestCase):
+    def setUp(self):
+        rng = random.Random(19)
+        self.rng = rng
+        self.branches = [FakeBranch(i, rng.uniform(-90, 90), rng.uniform(-180, 180)) for i in range(300)]
+        # Toshkent atrofida zich joylashgan filiallar va antimeridian/qutb yaqinidagilar
+        self.branches += [FakeBranch(300 + i, 41.3 + rng.uniform(-0.1, 0.1), 69.2 + rng.uniform(-0.1, 0.1))
+                          for i in range(50)]
+        self.branches += [FakeBranch(400, 0.0, 179.99), FakeBranch(401, 0.0, -179.99), FakeBranch(402, 89.99, 0.0)]
+        self.index = BranchIndex(self.branches)
+
+    def _queries(self):
+        yield from ((self.rng.uniform(-90, 90), self.rng.uniform(-180, 180)) for _ in range(200))
+        yield from ((41.3 + self.rng.uniform(-0.2, 0.2), 69.2 + self.rng.uniform(-0.2, 0.2)) for _ in range(100))
+        yield from ((0.0, -179.995), (0.0, 180.0), (90.0, 120.0))
+
+    def _distance(self, branch, latitude, longitude):
+        return haversine_m(latitude, longitude, branch.latitude, branch.longitude)
+
+    def test_matches_linear_scan(self):
+        for latitude, longitude in self._queries():
+            found = self.index.nearest(latitude, longitude)
+            expected = linear_nearest(self.branches, latitude, longitude)
+            self.assertAlmostEqual(self._distance(found, latitude, longitude),
+                                   self._distance(expected, latitude, longitude), places=3)
+
+    def test_matches_linear_scan_with_predicate(self):
+        def is_even(branch):
+            return branch.pk % 2 == 0
+
+        for latitude, longitude in self._queries():
+            found = self.index.nearest(latitude, longitude, predicate=is_even)
+            expected = linear_nearest(self.branches, latitude, longitude, predicate=is_even)
+            self.assertTrue(is_even(found))
+            self.assertAlmostEqual(self._distance(found, latitude, longitude),
+                                   self._distance(expected, latitude, longitude), places=3)
+
+    def test_antimeridian_neighbour(self):
+        self.assertEqual(self.index.nearest(0.0, -179.995).pk, 401)
+        self.assertEqual(self.index.nearest(0.0, 179.995).pk, 400)
+
+    def test_no_match(self):
+        self.assertIsNone(self.index.nearest(41.3, 69.2, predicate=lambda branch: False))
+        self.assertIsNone(BranchIndex([]).nearest(41.3, 69.2))
+
+
+# --- Filial ish jadvali ---
+class WeeklyScheduleTests(TestCase):
+    MONDAY = datetime.datetime(2026, 10, 12)  # Dushanba
+
+    def test_overnight_hours_merge_across_midnight(self):
+        # Dushanba 18:00-00:00 va seshanba 00:00-02:00 - bitta uzluksiz interval
+        schedule = WeeklySchedule.from_rows([
+            (0, datetime.time(18), datetime.time(0)),
+            (1, datetime.time(0), datetime.time(2)),
+        ])
+        self.assertEqual(len(schedule.starts), 1)
+        self.assertTrue(schedule.is_open_at(self.MONDAY.replace(hour=23, minute=59)))
+        self.assertTrue(schedule.is_open_at(self.MONDAY + datetime.timedelta(days=1, hours=1)))
+        self.assertFalse(schedule.is_open_at(self.MONDAY + datetime.timedelta(days=1, hours=2)))
+
+    def test_sunday_wraps_to_monday_for_next_opening(self):
+        schedule = WeeklySchedule.from_rows([(0, datetime.time(9), datetime.time(18))])
+        sunday_evening = self.MONDAY + datetime.timedelta(days=6, hours=20)
+        self.assertEqual(schedule.next_opening(sunday_evening), self.MONDAY + datetime.timedelta(days=7, hours=9))
+        self.assertIsNone(WeeklySchedule([]).next_opening(sunday_evening))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class BranchScheduleCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.branch = Branch.objects.create(name='Markaz', address='Toshkent', latitude=41.3, longitude=69.2)
+        self.hours = WorkingHours.objects.create(branch=self.branch, weekday=0, from_hour=datetime.time(9),
+                                                 to_hour=datetime.time(18))
+        self.monday_noon = datetime.datetime(2026, 10, 12, 12)
+
+    def _make_stale(self):
+        # Boshqa jarayondagi o'zgarish: bu jarayon keshidagi jadval tozalanmagan
+        get_branch_schedule(self.branch.pk)
+        WorkingHours.objects.filter(pk=self.hours.pk).update(from_hour=datetime.time(13))
+
+    def test_routing_version_change_drops_cached_schedule(self):
+        self._make_stale()
+        self.assertTrue(get_branch_schedule(self.branch.pk).is_open_at(self.monday_noon))
+        drop_local_versions('branches')
+        self.assertFalse(get_branch_schedule(self.branch.pk).is_open_at(self.monday_noon))
+
+    def test_checkout_reads_current_hours(self):
+        self._make_stale()
+        serializer = CheckoutSerializer(data={'delivery_type': 'pickup', 'payment_type': 'cash',
+                                              'pickup_branch_id': self.branch.pk})
+        with mock.patch('django.utils.timezone.now',
+                        return_value=timezone.make_aware(self.monday_noon)):
+            self.assertFalse(serializer.is_valid())
+        self.assertIn('pickup_branch_id', serializer.errors)
+
+
+# --- Taxminiy vaqt (ETA) ---
+class OrderSamplesTests(TestCase):
+    T0 = timezone.make_aware(datetime.datetime(2026, 10, 12, 12))
+
+    def _order(self, delivery_type='delivery', **minutes):
+        order = {'delivery_branch_id': 1 if delivery_type == 'delivery' else None,
+                 'pickup_branch_id': 1 if delivery_type == 'pickup' else None,
+                 'delivery_type': delivery_type, 'created_at': self.T0,
+                 'preparing_at': None, 'on_the_way_at': None, 'delivered_at': None, 'ready_at': None}
+        order.update({field: self.T0 + datetime.timedelta(minutes=value) for field, value in minutes.items()})
+        return order
+
+    def _kinds(self, order, stage):
+        return [(kind, round(value)) for _branch, kind, _hour, value in _order_samples(order, stage)]
+
+    def test_delivery_stages_are_recorded_once(self):
+        order = self._order(preparing_at=1, on_the_way_at=21, ready_at=21, delivered_at=41)
+        self.assertEqual(self._kinds(order, 'on_the_way'), [('prep', 20)])
+        self.assertEqual(self._kinds(order, 'delivered'), [('delivery', 20)])
+        self.assertEqual(self._kinds(order, None), [('prep', 20), ('delivery', 20)])
+
+    def test_pickup_learns_prep_on_delivered(self):
+        order = self._order('pickup', preparing_at=1, ready_at=16, delivered_at=16)
+        self.assertEqual(self._kinds(order, 'on_the_way'), [])
+        self.assertEqual(self._kinds(order, 'delivered'), [('prep', 15)])
+
+    def test_orders_without_ready_at_fall_back_to_status_times(self):
+        order = self._order(preparing_at=1, on_the_way_at=11, delivered_at=31)
+        self.assertEqual(self._kinds(order, None), [('prep', 10), ('delivery', 20)])
+        self.assertEqual(self._kinds(self._order('pickup', delivered_at=5), None), [('prep', 5)])
+
+    def test_out_of_range_and_branchless_orders_are_skipped(self):
+        self.assertEqual(self._kinds(self._order(preparing_at=10, on_the_way_at=10), None), [])
+        self.assertEqual(self._kinds({**self._order(on_the_way_at=10), 'delivery_branch_id': None}, None), [])
+
+
+class EtaProfileSignalTests(TestCase):
+    def test_transitions_record_each_stage_once(self):
+        branch = Branch.objects.create(name='Markaz', address='Toshkent', latitude=41.3, longitude=69.2)
+        user = create_user(1)
+        delivery = Order.objects.create(user=user, total_price=1, delivery_type='delivery', delivery_branch=branch)
+        pickup = Order.objects.create(user=user, total_price=1, delivery_type='pickup', pickup_branch=branch)
+        t0 = timezone.now()
+        steps = [(1, [delivery.pk, pickup.pk], 'preparing'), (21, [delivery.pk], 'on_the_way'),
+                 (16, [pickup.pk], 'delivered'), (41, [delivery.pk], 'delivered')]
+        for minute, order_ids, status in steps:
+            with mock.patch('django.utils.timezone.now', return_value=t0 + datetime.timedelta(minutes=minute)), \
+                    self.captureOnCommitCallbacks(execute=True):
+                Order.objects.transition(order_ids, status, Order.ALLOWED_TRANSITIONS[status])
+
+        profiles = BranchEtaProfile.objects.filter(branch=branch, hour=BranchEtaProfile.ALL_HOURS)
+        self.assertEqual(dict(profiles.values_list('kind', 'sample_count')), {'prep': 2, 'delivery': 1})
+
+
+# --- Checkout ---
+class PlaceOrderIdempotencyTests(TestCase):
+    def setUp(self):
+        self.user = create_user(1)
+        self.branch = Branch.objects.create(name='Markaz', address='Toshkent', latitude=41.3, longitude=69.2)
+        category = Category.objects.create(name='Shirinliklar', slug='shirinliklar')
+        self.cake = Product.objects.create(category=category, price=10, name='Tort')
+        self.tea = Product.objects.create(category=category, price=99, name='Choy')
+        self.cart = Cart.objects.create(user=self.user)
+        self.data = {'delivery_type': 'pickup', 'payment_type': 'cash', 'pickup_branch': self.branch}
+
+    def _add(self, product, quantity):
+        CartItem.objects.create(cart=self.cart, product=product, quantity=quantity)
+
+    def test_same_request_replays_original_order(self):
+        self._add(self.cake, 1)
+        order, created = place_order(self.user, self.data, 'K')
+        self.assertTrue(created)
+        replay, created = place_order(self.user, dict(self.data), 'K')
+        self.assertEqual((replay.pk, created), (order.pk, False))
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_reused_with_different_cart_is_rejected(self):
+        self._add(self.cake, 1)
+        place_order(self.user, self.data, 'K')
+        self._add(self.tea, 3)
+        with self.assertLogs('api.services', level='WARNING'), self.assertRaises(CheckoutError) as raised:
+            place_order(self.user, self.data, 'K')
+        self.assertEqual(raised.exception.status_code, 422)
+        self.assertTrue(CartItem.objects.filter(cart=self.cart, product=self.tea).exists())
+        # Yangi kalit bilan - yangi buyurtma
+        order, created = place_order(self.user, self.data, 'K2')
+        self.assertTrue(created)
+        self.assertEqual(order.total_price, 297)
+
+    def test_key_reused_with_different_checkout_fields_is_rejected(self):
+        self._add(self.cake, 1)
+        place_order(self.user, self.data, 'K')
+        with self.assertLogs('api.services', level='WARNING'), self.assertRaises(CheckoutError):
+            place_order(self.user, {**self.data, 'payment_type': 'card'}, 'K')
+
+    def test_concurrent_insert_with_same_key_returns_winner(self):
+        self._add(self.cake, 2)
+        # Parallel so'rov kalitni birinchi bo'lib yozgan, lekin bu so'rov uni tekshiruvlarda ko'rmagan
+        winner = Order.objects.create(user=self.user, total_price=20, delivery_type='pickup', idempotency_key='K',
+                                      idempotency_fingerprint=checkout_fingerprint([(self.cake.pk, 2)], self.data))
+        real_find_replay = services._find_replay
+        calls = []
+
+        def find_replay(*args):
+            calls.append(args)
+            return None if len(calls) <= 2 else real_find_replay(*args)
+
+        with mock.patch.object(services, '_find_replay', side_effect=find_replay):
+            order, created = place_order(self.user, self.data, 'K')
+        self.assertEqual((order.pk, created), (winner.pk, False))
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertTrue(CartItem.objects.filter(cart=self.cart).exists())
+
+
+# --- Buyurtmalar tarixi ---
+class OrderHistoryCursorPaginationTests(TestCase):
+    def setUp(self):
+        self.user = create_user(1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        base = timezone.now()
+        # 23 ta buyurtma, ularning ko'pchiligi bir xil created_at bilan (sahifa chegarasida ham)
+        for i in range(23):
+            order = Order.objects.create(user=self.user, total_price=i, delivery_type='pickup')
+            Order.objects.filter(pk=order.pk).update(created_at=base - datetime.timedelta(minutes=i // 8))
+        Order.objects.create(user=create_user(2), total_price=1, delivery_type='pickup')
+        self.expected = list(Order.objects.filter(user=self.user).order_by('-created_at', '-pk')
+                             .values_list('pk', flat=True))
+
+    def _page(self, cursor=None):
+        params = {'cursor': cursor} if cursor else {}
+        response = self.client.get(reverse('order-history'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_walks_all_pages_and_back(self):
+        pages, cursor = [], None
+        while True:
+            page = self._page(cursor)
+            pages.append(page)
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual([len(p['results']) for p in pages], [10, 10, 3])
+        self.assertEqual([o['id'] for p in pages for o in p['results']], self.expected)
+        self.assertIsNone(pages[0]['previous_cursor'])
+
+        # Oxirgi sahifadan orqaga
+        previous = self._page(pages[-1]['previous_cursor'])
+        self.assertEqual([o['id'] for o in previous['results']], self.expected[10:20])
+        first = self._page(previous['previous_cursor'])
+        self.assertEqual([o['id'] for o in first['results']], self.expected[:10])
+        self.assertIsNone(first['previous_cursor'])
+        self.assertEqual(first['next_cursor'], pages[0]['next_cursor'])
+
+    def test_malformed_cursor_is_not_found(self):
+        for cursor in ('url_http://example.com', 'AAAA', '2'):
+            response = self.client.get(reverse('order-history'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, cursor)
+
+
+# --- Bildirishnomalar ---
+class NotificationDispatcherTests(TestCase):
+    def setUp(self):
+        self.sender = mock.Mock()
+        self.dispatcher = NotificationDispatcher(self.sender, global_rate=1000, per_chat_interval=0, workers=1)
+        self.addCleanup(self.dispatcher.close)
+
+    def _queue(self, telegram_id: int) -> OrderNotification:
+        user = create_user(telegram_id)
+        order = Order.objects.create(user=user, total_price=1, delivery_type='pickup')
+        return OrderNotification.objects.create(order=order, user=user, order_status='preparing')
+
+    def test_unexpected_error_does_not_lose_sent_rows(self):
+        sent, broken = self._queue(1), self._queue(2)
+
+        def send(chat_id, text):
+            if chat_id == 2:
+                raise RuntimeError('boom')
+            return SendResult(True, False, None, '')
+
+        self.sender.send.side_effect = send
+        with self.assertLogs('api.notifications', level='ERROR'):
+            self.assertEqual(self.dispatcher.dispatch_batch(), 2)
+
+        sent.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertEqual((sent.state, sent.locked_at), ('sent', None))
+        self.assertIsNotNone(sent.sent_at)
+        self.assertEqual((broken.state, broken.attempts, broken.locked_at), ('pending', 1, None))
+        self.assertIn('boom', broken.last_error)
+
+
+# --- Google Drive vazifalari ---
+class GDriveUploadJobTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    @mock.patch('api.gdrive_jobs.publish_cache_invalidation')
+    @mock.patch('api.gdrive_jobs.upload_to_drive', return_value=('new-id', 'https://drive.example/new-id'))
+    def test_promotion_upload_invalidates_bot_promotions(self, upload, publish):
+        promotion = Promotion.objects.create(title='Aksiya', image=SimpleUploadedFile('promo.jpg', b'jpeg'))
+        job = enqueue_upload(promotion, image_field_name='image')
+        self.assertEqual(job.image_field, 'image')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(_process_upload(job), 'Uploaded as new-id')
+
+        promotion.refresh_from_db()
+        self.assertEqual(promotion.image_gdrive_url, 'https://drive.example/new-id')
+        self.assertFalse(promotion.image)
+        publish.assert_called_once_with('promotions')
+
+
+# --- Google Drive klienti ---
+class DriveClientTests(TestCase):
+    def setUp(self):
+        fake_root = tempfile.TemporaryDirectory()
+        self.addCleanup(fake_root.cleanup)
+        self.fake_root = fake_root.name
+        gdrive_utils.reset_drive_client()
+        self.addCleanup(gdrive_utils.reset_drive_client)
+
+    def test_client_is_created_once(self):
+        with override_settings(GDRIVE_BACKEND='fake', GDRIVE_FAKE_ROOT=self.fake_root):
+            client = gdrive_utils.get_drive_client()
+            self.assertIsInstance(client, gdrive_utils.LocalFakeDriveBackend)
+            self.assertIs(gdrive_utils.get_drive_client(), client)
+            gdrive_utils.reset_drive_client()
+            self.assertIsNot(gdrive_utils.get_drive_client(), client)
+
+    def test_fake_backend_upload_and_delete(self):
+        local_path = os.path.join(self.fake_root, 'source.jpg')
+        with open(local_path, 'wb') as f:
+            f.write(b'jpeg')
+        with override_settings(GDRIVE_BACKEND='fake', GDRIVE_FAKE_ROOT=os.path.join(self.fake_root, 'drive')):
+            file_id, url = gdrive_utils.upload_to_drive(local_path, 'product_1_source.jpg')
+            self.assertTrue(gdrive_utils.get_drive_client().exists(file_id))
+            self.assertTrue(url.startswith('file://'))
+            self.assertTrue(gdrive_utils.delete_from_drive(file_id))
+            self.assertFalse(gdrive_utils.get_drive_client().exists(file_id))
+            # Allaqachon o'chirilgan fayl xatolik emas
+            with self.assertLogs('api.gdrive_utils', level='WARNING'):
+                self.assertTrue(gdrive_utils.delete_from_drive(file_id))
+
+
+class PyDrive2BackendTests(TestCase):
+    def setUp(self):
+        auth_patcher = mock.patch.object(gdrive_utils, 'GoogleAuth')
+        self.google_auth = auth_patcher.start()
+        self.addCleanup(auth_patcher.stop)
+        drive_patcher = mock.patch.object(gdrive_utils, 'GoogleDrive')
+        drive_patcher.start()
+        self.addCleanup(drive_patcher.stop)
+        self.gauth = self.google_auth.return_value
+        self.gauth.access_token_expired = False
+        self.gauth.Get_Http_Object.side_effect = lambda: object()
+        self.backend = gdrive_utils.PyDrive2Backend('credentials.json', 'service@example.com')
+
+    def test_authenticates_once(self):
+        drive = self.backend._get_drive()
+        self.assertIs(self.backend._get_drive(), drive)
+        self.google_auth.assert_called_once()
+        self.gauth.ServiceAuth.assert_called_once()
+
+    def test_expired_token_is_refreshed_without_reauth(self):
+        self.backend._get_drive()
+        self.gauth.access_token_expired = True
+        self.backend._get_drive()
+        self.gauth.Refresh.assert_called_once()
+        self.google_auth.assert_called_once()
+
+    def test_failed_refresh_reauthenticates_and_drops_thread_http(self):
+        self.backend._get_drive()
+        http = self.backend._http()
+        self.gauth.access_token_expired = True
+        self.gauth.Refresh.side_effect = RuntimeError('invalid_grant')
+        with self.assertLogs('api.gdrive_utils', level='WARNING'):
+            self.backend._get_drive()
+        self.assertEqual(self.google_auth.call_count, 2)
+        self.assertIsNot(self.backend._http(), http)
+
+    def test_http_object_is_per_thread(self):
+        self.backend._get_drive()
+        main_http = self.backend._http()
+        self.assertIs(self.backend._http(), main_http)
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.backend._http()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], main_http)
+        self.assertEqual(self.gauth.Get_Http_Object.call_count, 2)
+
+
+# --- Mahsulot qidiruvi ---
+class SearchNormalizationTests(TestCase):
+    def test_cyrillic_and_latin_spellings_match(self):
+        self.assertEqual(search.normalize_text("Шоколадный торт"), search.normalize_text("shokoladniy TORT"))
+        self.assertEqual(search.normalize_text("Хачапури"), search.normalize_text("khachapuri"))
+        self.assertEqual(search.normalize_text("Ўрик қоқи"), search.normalize_text("O‘rik qoqi"))
+        self.assertEqual(search.normalize_text(None), '')
+
+
+class InMemorySearchIndexTests(TestCase):
+    def setUp(self):
+        self.index = search.InMemorySearchIndex([
+            (1, 'shokolad tort', 'qulupnay bilan'),
+            (2, 'qulupnay tort', 'shokolad bilan'),
+            (3, 'shokoladli muzqaymoq', ''),
+        ])
+
+    def test_name_match_ranks_above_description(self):
+        self.assertEqual(self.index.search('shokolad tort'), [1, 2])
+
+    def test_exact_token_ranks_above_prefix(self):
+        index = search.InMemorySearchIndex([(1, 'shokoladli muzqaymoq', ''), (2, 'shokolad', '')])
+        self.assertEqual(index.search('shokolad'), [2, 1])
+
+    def test_all_tokens_must_match(self):
+        self.assertEqual(self.index.search('muzqaymoq tort'), [])
+        self.assertEqual(self.index.search('shok', limit=1), [1])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SearchProductIdsTests(TestCase):
+    def setUp(self):
+        search._memory_index = None
+        self.addCleanup(setattr, search, '_memory_index', None)
+        category = Category.objects.create(name='Shirinliklar', slug='shirinliklar')
+        self.cake = Product.objects.create(category=category, price=1, name='Шоколадный торт')
+        self.tea = Product.objects.create(category=category, price=1, name='Choy', description='Limonli')
+
+    def test_auto_backend_follows_database_vendor(self):
+        with mock.patch.object(search, 'PRODUCT_SEARCH_BACKEND', 'auto'):
+            with mock.patch.object(search.connection, 'vendor', 'sqlite'):
+                self.assertFalse(search.use_postgres())
+            with mock.patch.object(search.connection, 'vendor', 'postgresql'):
+                self.assertTrue(search.use_postgres())
+
+    def test_memory_index_search(self):
+        with mock.patch.object(search, 'PRODUCT_SEARCH_BACKEND', 'memory'), \
+                mock.patch.object(search, '_postgres_search') as postgres_search:
+            self.assertEqual(search.search_product_ids('shokolad'), [self.cake.pk])
+            self.assertEqual(search.search_product_ids('limon'), [self.tea.pk])
+            self.assertEqual(search.search_product_ids('  '), [])
+        postgres_search.assert_not_called()
+
+    def test_product_list_filters_snapshot(self):
+        other = Category.objects.create(name='Ichimliklar', slug='ichimliklar')
+        juice = Product.objects.create(category=other, price=1, name='Shokoladli kokteyl')
+        client = APIClient()
+        with mock.patch.object(search, 'PRODUCT_SEARCH_BACKEND', 'memory'):
+            found = client.get(reverse('product-list'), {'search': 'shokolad'}).json()
+            by_category = client.get(reverse('product-list'),
+                                     {'search': 'shokolad', 'category_id': other.pk}).json()
+        self.assertEqual(sorted(item['id'] for item in found['results']), sorted([self.cake.pk, juice.pk]))
+        self.assertEqual([item['id'] for item in by_category['results']], [juice.pk])
+
+    def test_postgres_backend_setting_is_respected(self):
+        with mock.patch.object(search, 'PRODUCT_SEARCH_BACKEND', 'postgres'), \
+                mock.patch.object(search, '_postgres_search', return_value=[self.tea.pk]) as postgres_search:
+            self.assertEqual(search.search_product_ids('Чой'), [self.tea.pk])
+        postgres_search.assert_called_once_with(['choy'], search.SEARCH_RESULT_LIMIT)
@@ -1,5 +1,7 @@
 # api/utils.py
+import threading
 import requests  # <-- requests kutubxonasini ishlatamiz
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 import logging
 
@@ -7,6 +9,24 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+_telegram_session = None
+_telegram_session_lock = threading.Lock()
+
+
+def get_telegram_session() -> requests.Session:
+    """Telegram Bot API uchun umumiy (keep-alive, connection pool'li) requests.Session."""
+    global _telegram_session
+    if _telegram_session is None:
+        with _telegram_session_lock:
+            if _telegram_session is None:
+                session = requests.Session()
+                pool_size = getattr(settings, 'NOTIFICATION_WORKERS', 8)
+                # Qayta urinishlarni o'zimiz boshqaramiz (429 retry_after va h.k.)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+                session.mount('https://', adapter)
+                _telegram_session = session
+    return _telegram_session
+
 
 def send_direct_telegram_notification(telegram_id: int, message_text: str) -> bool:
     """
@@ -26,7 +46,7 @@ def send_direct_telegram_notification(telegram_id: int, message_text: str) -> bo
     }
 
     try:
-        response = requests.post(send_url, json=payload, timeout=10)  # 10 soniya timeout
+        response = get_telegram_session().post(send_url, json=payload, timeout=10)  # 10 soniya timeout
         response.raise_for_status()  # HTTP xatolik bo'lsa (4xx, 5xx) exception ko'taradi
         response_data = response.json()
 
@@ -1,12 +1,14 @@
 # api/views.py
 
 from rest_framework import viewsets, permissions, generics, status
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.permissions import AllowAny
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.db.models import Q, Prefetch
 from django.db import IntegrityError
 from .utils import logger
 from django.utils import timezone
@@ -16,6 +18,10 @@ from django.db import transaction  # <-- Ma'lumotlar bazasi tranzaksiyalari uchu
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal  # <-- Narxlar bilan ishlash uchun
+import base64
+import binascii
+import datetime
+import struct
 
 # Modellarni import qilamiz
 from .models import (
@@ -27,61 +33,63 @@ from .serializers import (
     UserSerializer, CategorySerializer, ProductSerializer,
     RegistrationSerializer, OTPVerificationSerializer,
     CartSerializer, CartItemSerializer,
-    OrderSerializer, OrderItemSerializer, CheckoutSerializer, BranchSerializer, UserAddressSerializer,
-    PromotionSerializer
+    OrderSerializer, OrderListSerializer, OrderItemSerializer, CheckoutSerializer, BranchSerializer, UserAddressSerializer,
+    PromotionSerializer, CheckoutResultSerializer
 )
+from .catalog_cache import CatalogSnapshotMixin
+from .search import search_product_ids
+from .services import load_cart, load_cart_for_user, place_order, load_checkout_result, CheckoutError
 
 
 # --- Category ViewSet ---
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(CatalogSnapshotMixin, viewsets.ReadOnlyModelViewSet):
     """
     Barcha aktiv kategoriyalarni ko'rish uchun API endpoint.
     ReadOnlyModelViewSet faqat list() va retrieve() action'larini taqdim etadi.
+    Javoblar keshdagi katalog snapshotidan beriladi (ETag/Last-Modified bilan).
     """
     queryset = Category.objects.filter(is_active=True).prefetch_related('translations')  # Aktiv kategoriyalar
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]  # Hamma ko'rishi mumkin
+    snapshot_kind = 'categories'
 
     # Tilni header orqali avtomatik aniqlaydi (parler-rest yordamida)
 
 
 # --- Product ViewSet ---
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(CatalogSnapshotMixin, viewsets.ReadOnlyModelViewSet):
     """
     Barcha mavjud mahsulotlarni ko'rish uchun API endpoint.
-    Kategoriya bo'yicha filtrlash mumkin (?category_id=...).
+    Kategoriya bo'yicha filtrlash (?category_id=...) va qidiruv (?search=...) mumkin.
+    Javoblar keshdagi katalog snapshotidan beriladi; qidiruv faqat mos ID'larni (reyting tartibida) topadi.
     """
     serializer_class = ProductSerializer
     permission_classes = [permissions.AllowAny]  # Hamma ko'rishi mumkin
+    snapshot_kind = 'products'
 
-    def get_queryset(self):
-        """
-        Mavjud mahsulotlarni qaytaradi, agar 'category_id' parametri
-        bo'lsa, faqat shu kategoriyadagi mahsulotlarni qaytaradi.
-        """
-        queryset = Product.objects.filter(is_available=True).prefetch_related('translations',
-                                                                              'category__translations')  # Mavjud mahsulotlar
+    def get_snapshot_queryset(self):
+        # Snapshot filtrsiz, barcha mavjud mahsulotlardan tuziladi
+        return Product.objects.filter(is_available=True).prefetch_related('translations',
+                                                                          'category__translations')
 
-        category_id = self.request.query_params.get('category_id')
-        if category_id is not None:
-            try:
-                # category_id raqam ekanligini tekshirish
-                category_id = int(category_id)
-                queryset = queryset.filter(category_id=category_id)
-            except ValueError:
-                # Agar category_id raqam bo'lmasa, e'tibor bermaymiz yoki xatolik qaytarish mumkin
-                pass  # Yoki: return Product.objects.none()
-
-        # Qidiruv (?search=...) qo'shish mumkin
+    def filter_snapshot_items(self, items):
         search_query = self.request.query_params.get('search')
         if search_query:
-            # Nom yoki tavsifda qidirish (har ikkala tilda)
-            queryset = queryset.filter(
-                Q(translations__name__icontains=search_query) |
-                Q(translations__description__icontains=search_query)
-            ).distinct()  # distinct() dublikatlarni oldini olish uchun
+            items_by_id = {item['id']: item for item in items}
+            items = [items_by_id[pk] for pk in search_product_ids(search_query) if pk in items_by_id]
 
-        return queryset
+        category_id = self.request.query_params.get('category_id')
+        if category_id is None:
+            return items
+        try:
+            category_id = int(category_id)
+        except ValueError:
+            return items  # Noto'g'ri qiymatga e'tibor bermaymiz
+        return [item for item in items if item['category'] and item['category']['id'] == category_id]
+
+    def get_queryset(self):
+        # list/retrieve snapshotdan beriladi; qidiruv va kategoriya filtri faqat filter_snapshot_items'da
+        return self.get_snapshot_queryset()
 
     # Tilni header orqali avtomatik aniqlaydi (parler-rest yordamida)
 
@@ -208,38 +216,26 @@ class CartView(APIView):
         cart, created = Cart.objects.get_or_create(user=user)
         return cart
 
+    def cart_response(self, request, cart_id, response_status=status.HTTP_200_OK):
+        """Savatni bitta umumiy, optimallashtirilgan loader orqali olib serializatsiya qiladi."""
+        try:
+            cart_to_serialize = load_cart(cart_id)
+        except Cart.DoesNotExist:  # Agar savat qandaydir tarzda o'chib ketgan bo'lsa
+            return Response({"error": "Savat topilmadi."}, status=status.HTTP_404_NOT_FOUND)
+        serializer = CartSerializer(cart_to_serialize, context={'request': request})
+        return Response(serializer.data, status=response_status)
+
     # --- GET Method: Savatni ko'rish ---
     def get(self, request):
         user = request.user
-        # --- Savatni olamiz (yoki yaratamiz) VA OPTIMALLASHTIRAMIZ ---
         try:
-            # Avval get_or_create bilan savatni olamiz yoki yaratamiz
-            cart, created = Cart.objects.get_or_create(user=user)
-            if created:
-                # Agar yangi yaratilgan bo'lsa, logga yozamiz
-                logger.info(f"Created new cart (ID: {cart.pk}) for user {user.pk}")
-
-            # Endi shu savatni (yoki topilganini) optimallashtirilgan holda qayta olamiz
-            # Bu serializer ishlashi uchun kerakli barcha ma'lumotlarni oldindan yuklaydi
-            cart_to_serialize = Cart.objects.select_related(
-                'user'  # Foydalanuvchi ma'lumotini ham birga olish uchun
-            ).prefetch_related(
-                'items',  # Barcha CartItem'lar
-                'items__product',  # Ularning Product'lari
-                'items__product__translations',  # Product tarjimalari
-                'items__product__category',  # Product kategoriyalari
-                'items__product__category__translations'  # Kategoriya tarjimalari
-            ).get(pk=cart.pk)  # pk orqali aynan shu savatni olamiz
-
-        except Cart.DoesNotExist:  # get_or_create dan keyin bu bo'lmasligi kerak, lekin ehtiyot shart
-            logger.error(f"Cart somehow not found or created for user {user.pk}")
-            return Response({"error": "Savat topilmadi."}, status=status.HTTP_404_NOT_FOUND)
+            # Savat, itemlar, mahsulotlar va summalar oldindan yuklanadi (yo'q bo'lsa yaratiladi)
+            cart_to_serialize = load_cart_for_user(user)
         except Exception as e:
-            # Boshqa kutilmagan xatoliklar
-            logger.error(f"Error getting/creating/prefetching cart for user {user.pk}: {e}", exc_info=True)
+            # Kutilmagan xatoliklar
+            logger.error(f"Error getting/creating cart for user {user.pk}: {e}", exc_info=True)
             return Response({"error": "Savatni olishda xatolik."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # Optimallashtirilgan savatni serializerga beramiz
         serializer = CartSerializer(cart_to_serialize, context={'request': request})
         return Response(serializer.data)
 
@@ -274,9 +270,8 @@ class CartView(APIView):
             cart_item.quantity += quantity
             cart_item.save()
 
-        serializer = CartSerializer(cart, context={'request': request})
         # Yaratilgan bo'lsa 201, yangilangan bo'lsa 200 qaytarish mumkin, lekin 200 ham OK
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.cart_response(request, cart.pk)
 
     # --- PATCH Method: Savatdagi mahsulot sonini o'zgartirish ---
     @transaction.atomic
@@ -299,23 +294,7 @@ class CartView(APIView):
             cart_item.save(update_fields=['quantity'])
             logger.info(f"CartItem {item_id} quantity updated to {new_quantity}.")
 
-        # --- JAVOB QAYTARISHDAN OLDIN OPTIMALLASHTIRISH ---
-        # Savatning yangilangan holatini optimallashtirilgan so'rov bilan olamiz
-        try:
-            cart_to_serialize = Cart.objects.select_related(  # ForeignKey uchun
-                'user'
-            ).prefetch_related(  # ManyToMany yoki teskari ForeignKey uchun
-                'items',  # Savatdagi itemlar
-                'items__product',  # Har bir item uchun mahsulot
-                'items__product__translations',  # Mahsulot tarjimalari
-                'items__product__category',  # Mahsulot kategoriyasi
-                'items__product__category__translations'  # Kategoriya tarjimalari
-            ).get(pk=cart.pk)  # Aynan shu savatni olamiz
-        except Cart.DoesNotExist:  # Agar savat qandaydir tarzda o'chib ketgan bo'lsa
-            return Response({"error": "Savat topilmadi."}, status=status.HTTP_404_NOT_FOUND)
-
-        serializer = CartSerializer(cart_to_serialize, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.cart_response(request, cart.pk)
 
     # --- DELETE Method: Savatdagi mahsulotni o'chirish ---
     @transaction.atomic
@@ -332,188 +311,165 @@ class CartView(APIView):
         cart_item.delete()
         logger.info(f"CartItem {item_pk_for_log} deleted by user {user.id}.")
 
-        # --- JAVOB QAYTARISHDAN OLDIN OPTIMALLASHTIRISH ---
-        try:
-            cart_to_serialize = Cart.objects.select_related(
-                'user'
-            ).prefetch_related(
-                'items',
-                'items__product__translations',
-                'items__product__category__translations'
-            ).get(pk=cart.pk)
-        except Cart.DoesNotExist:
-            return Response({"error": "Savat topilmadi (o'chirishdan keyin)."}, status=status.HTTP_404_NOT_FOUND)
-
-        serializer = CartSerializer(cart_to_serialize, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.cart_response(request, cart.pk)
 
 
 class CheckoutView(APIView):
+    """
+    Savatdan buyurtma yaratadi.
+    Mijoz 'Idempotency-Key' sarlavhasi (yoki 'idempotency_key' maydoni) yuborsa, shu kalit bilan
+    qayta yuborilgan so'rov yangi buyurtma yaratmaydi: asl buyurtma 200 status bilan qaytariladi.
+    Kalit boshqa savat yoki checkout ma'lumotlari bilan qayta ishlatilsa - 422.
+    """
     permission_classes = [permissions.IsAuthenticated]
+    IDEMPOTENCY_KEY_MAX_LENGTH = 64
+
+    def get_idempotency_key(self, request):
+        key = request.headers.get('Idempotency-Key') or request.data.get('idempotency_key')
+        return str(key).strip() if key else None
 
-    @transaction.atomic
     def post(self, request):
-        user = request.user
-        try:
-            cart = user.cart
-            cart_items = cart.items.all()
-            if not cart_items.exists():
-                return Response({"error": "Buyurtma berish uchun savat bo'sh."}, status=status.HTTP_400_BAD_REQUEST)
-        except Cart.DoesNotExist:
-            return Response({"error": "Savat topilmadi."}, status=status.HTTP_400_BAD_REQUEST)
+        idempotency_key = self.get_idempotency_key(request)
+        if idempotency_key and len(idempotency_key) > self.IDEMPOTENCY_KEY_MAX_LENGTH:
+            return Response({"error": f"Idempotency-Key {self.IDEMPOTENCY_KEY_MAX_LENGTH} belgidan oshmasligi kerak."},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         # --- Kiruvchi ma'lumotlarni validatsiya qilamiz (pickup_branch ham tekshiriladi) ---
-        checkout_serializer = CheckoutSerializer(data=request.data,
-                                                 context={'request': request})  # Context qo'shish mumkin
+        checkout_serializer = CheckoutSerializer(data=request.data, context={'request': request})
         if not checkout_serializer.is_valid():
             return Response(checkout_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        validated_data = checkout_serializer.validated_data
-        delivery_type = validated_data.get('delivery_type')
-        pickup_branch = validated_data.get('pickup_branch')  # Bu yerda Branch obyekti keladi
-
-        # --- Order uchun ma'lumotlarni tayyorlaymiz ---
-        order_data = {
-            'user': user,
-            'status': 'new',
-            'total_price': cart.total_price,
-            'delivery_type': delivery_type,
-            'address': validated_data.get('address'),
-            'latitude': validated_data.get('latitude'),
-            'longitude': validated_data.get('longitude'),
-            'payment_type': validated_data.get('payment_type'),
-            'notes': validated_data.get('notes')
-        }
-        # Agar pickup bo'lsa, filialni qo'shamiz
-        if delivery_type == 'pickup' and pickup_branch:
-            order_data['pickup_branch'] = pickup_branch
-
-        # --- Order yaratamiz ---
         try:
-            order = Order.objects.create(**order_data)
-        except Exception as e:
-            return Response({"error": f"Buyurtma yaratishda xatolik: {e}"},
-                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        # --- OrderItem'larni yaratamiz ---
-        order_items_to_create = []
-        for cart_item in cart_items:
-            if not cart_item.product or not cart_item.product.is_available:
-                return Response(
-                    {
-                        "error": f"Mahsulot '{cart_item.product.name if cart_item.product else 'Nomalum'}' buyurtma paytida mavjud emas."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            item_total_price = cart_item.product.price * cart_item.quantity
-            order_items_to_create.append(
-                OrderItem(
-                    order=order,
-                    product=cart_item.product,
-                    quantity=cart_item.quantity,
-                    price_per_unit=cart_item.product.price,
-                    total_price=item_total_price
-                )
-            )
+            order, created = place_order(request.user, checkout_serializer.validated_data, idempotency_key)
+        except CheckoutError as e:
+            return Response({"error": e.message}, status=e.status_code)
+
+        if not created:
+            logger.info(f"Checkout replay for user {request.user.pk} (key={idempotency_key}), order {order.pk}.")
+            order = load_checkout_result(order)
+
+        result_serializer = CheckoutResultSerializer(order, context={'request': request})
+        return Response(result_serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+class OrderHistoryCursorPagination(BasePagination):
+    """
+    (created_at, id) bo'yicha keyset paginatsiya: COUNT va OFFSET yo'q, har bir sahifa
+    (user, -created_at, -id) indeksidan to'g'ridan-to'g'ri o'qiladi.
+    Kursor - 17 baytli (yo'nalish, created_at mikrosekund, id) qiymatning base64url ko'rinishi (23 belgi),
+    Telegram callback_data (64 bayt) ichiga bemalol sig'adi.
+    Javob: {'next', 'previous' (URL), 'next_cursor', 'previous_cursor', 'results'}.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 10
+    _CURSOR_FORMAT = struct.Struct('>BqQ')
+    _EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+    @classmethod
+    def encode_cursor(cls, reverse: bool, created_at, pk: int) -> str:
+        micros = (created_at - cls._EPOCH) // timedelta(microseconds=1)  # float'siz, aniq mikrosekund
+        raw = cls._CURSOR_FORMAT.pack(1 if reverse else 0, micros, pk)
+        return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+    @classmethod
+    def decode_cursor(cls, token: str):
+        """(reverse, created_at, pk). Noto'g'ri kursor uchun NotFound."""
         try:
-            OrderItem.objects.bulk_create(order_items_to_create)
-        except Exception as e:
-            return Response({"error": f"Buyurtma mahsulotlarini yaratishda xatolik: {e}"},
-                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        # --- Taxminiy vaqtni hisoblaymiz va saqlaymiz ---
-        relevant_branch = None
-        if delivery_type == 'pickup' and pickup_branch:  # pickup_branch bu Branch obyekt
-            relevant_branch = pickup_branch
-        elif delivery_type == 'delivery':
-            logger.info(f"Delivery order {order.id}. Finding a relevant branch for time estimation.")
-            # Avval aktiv filiallarni olamiz. Ish vaqtlarini ham oldindan olamiz, chunki is_open_now() ularni ishlatadi.
-            active_branches = Branch.objects.filter(is_active=True).prefetch_related('working_hours')
-
-            # --- OCHIQ FILIALNI TOPISH LOGIKASI ---
-            found_open_branch = False
-            for branch_candidate in active_branches:
-                if branch_candidate.is_open_now():  # Model metodini chaqiramiz
-                    relevant_branch = branch_candidate
-                    logger.info(
-                        f"Delivery order {order.id} assigned to OPEN branch {relevant_branch.name} (ID: {relevant_branch.id}) for time estimation.")
-                    found_open_branch = True
-                    break  # Ochiq filial topildi, qidirishni to'xtatamiz
-
-            if not found_open_branch and active_branches.exists():
-                # Agar ochiq filial topilmasa, lekin aktiv filiallar bo'lsa, birinchisini olamiz
-                relevant_branch = active_branches.first()
-                logger.warning(
-                    f"No OPEN branches found for delivery order {order.id}. "
-                    f"Using first ACTIVE branch {relevant_branch.name} (ID: {relevant_branch.id}) for estimation (this branch might be closed)."
-                )
-            elif not active_branches.exists():  # Agar umuman aktiv filial bo'lmasa
-                logger.warning(
-                    f"No active branches available AT ALL to handle delivery order {order.id} for time estimation.")
-            # -----------------------------------------
-
-        # Buyurtma obyektida bu maydonlar borligiga ishonch hosil qilamiz (null=True bo'lsa ham)
-        order.estimated_ready_at = None
-        order.estimated_delivery_at = None
-        fields_to_update_for_estimates = []
-
-        if relevant_branch:
-            # ... (taxminiy vaqtlarni hisoblash va saqlash logikasi #237-javobdagidek qoladi) ...
-            # Bu qism o'zgarishsiz:
-            try:
-                now = timezone.now()
-                prep_minutes = relevant_branch.avg_preparation_minutes
-                if prep_minutes is None: prep_minutes = 30
-                prep_time = timedelta(minutes=prep_minutes)
-                order.estimated_ready_at = now + prep_time
-                fields_to_update_for_estimates.append('estimated_ready_at')
-
-                if delivery_type == 'delivery':
-                    delivery_extra_minutes = relevant_branch.avg_delivery_extra_minutes
-                    if delivery_extra_minutes is None: delivery_extra_minutes = 20
-                    delivery_time = timedelta(minutes=delivery_extra_minutes)
-                    order.estimated_delivery_at = order.estimated_ready_at + delivery_time
-                    fields_to_update_for_estimates.append('estimated_delivery_at')
-
-                if fields_to_update_for_estimates:
-                    order.save(update_fields=fields_to_update_for_estimates)
-                    logger.info(
-                        f"Estimated times saved for order {order.id}: Ready at {order.estimated_ready_at}, Delivery at {order.estimated_delivery_at}")
-            except Exception as e:
-                logger.error(f"Error calculating or saving estimated time for order {order.id}: {e}", exc_info=True)
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            direction, micros, pk = cls._CURSOR_FORMAT.unpack(raw)
+            created_at = cls._EPOCH + timedelta(microseconds=micros)
+        except (ValueError, TypeError, struct.error, OverflowError, binascii.Error):
+            raise NotFound("Noto'g'ri kursor.")
+        if direction not in (0, 1):
+            raise NotFound("Noto'g'ri kursor.")
+        return direction == 1, created_at, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        token = request.query_params.get(self.cursor_query_param)
+        reverse, created_at, pk = self.decode_cursor(token) if token else (False, None, None)
+
+        if created_at is None:
+            queryset = queryset.order_by('-created_at', '-pk')
+        elif not reverse:
+            # (created_at, id) < (kursor): birinchi shart indeks oralig'ini cheklaydi
+            queryset = (queryset.filter(created_at__lte=created_at)
+                        .exclude(created_at=created_at, pk__gte=pk).order_by('-created_at', '-pk'))
         else:
-            logger.warning(f"No relevant branch determined for order {order.id}, cannot calculate estimated times.")
+            queryset = (queryset.filter(created_at__gte=created_at)
+                        .exclude(created_at=created_at, pk__lte=pk).order_by('created_at', 'pk'))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = token is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, token is not None
+        self.page = rows
+        return rows
+
+    def _cursors(self):
+        next_cursor = previous_cursor = None
+        if self.page and self.has_next:
+            last = self.page[-1]
+            next_cursor = self.encode_cursor(False, last.created_at, last.pk)
+        if self.page and self.has_previous:
+            first = self.page[0]
+            previous_cursor = self.encode_cursor(True, first.created_at, first.pk)
+        return next_cursor, previous_cursor
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        next_cursor, previous_cursor = self._cursors()
+        return Response({
+            'next': self._link(next_cursor),
+            'previous': self._link(previous_cursor),
+            'next_cursor': next_cursor,
+            'previous_cursor': previous_cursor,
+            'results': data,
+        })
+
 
-        # --- Savatni tozalaymiz ---
-        cart_items.delete()
+ORDER_DETAIL_RELATIONS = ('items', 'user', 'pickup_branch')
 
-        # --- Yaratilgan buyurtmani qaytaramiz ---
-        order_serializer = OrderSerializer(order, context={'request': request})
-        return Response(order_serializer.data, status=status.HTTP_201_CREATED)
+
+def with_order_relations(queryset, relations):
+    """Serializer chiqaradigan bog'liq obyektlargina oldindan yuklanadi (filial ish vaqtlari kerak emas)."""
+    joins = [name for name in ('user', 'pickup_branch', 'delivery_branch') if name in relations]
+    if joins:
+        queryset = queryset.select_related(*joins)
+    if 'items' in relations:
+        queryset = queryset.prefetch_related(Prefetch(
+            'items', queryset=OrderItem.objects.select_related('product').prefetch_related('product__translations')
+        ))
+    return queryset
 
 
 class OrderHistoryView(generics.ListAPIView):
     """
     Autentifikatsiyadan o'tgan foydalanuvchining buyurtmalar tarixini
-    ro'yxat ko'rinishida qaytaradi (paginatsiya bilan).
+    ro'yxat ko'rinishida qaytaradi (kursor bilan sahifalash, ?cursor=...).
+    Standart holatda yengil ko'rinish (OrderListSerializer); ?fields= va ?expand= qo'llab-quvvatlanadi.
     """
-    serializer_class = OrderSerializer
+    serializer_class = OrderListSerializer
     permission_classes = [permissions.IsAuthenticated]  # Faqat login qilganlar ko'ra oladi
-    # Paginatsiyani sozlash mumkin (agar settings.py da global belgilanmagan bo'lsa)
-    pagination_class = PageNumberPagination  # yoki boshqa turdagi pagination
+    pagination_class = OrderHistoryCursorPagination
 
     def get_queryset(self):
         """
         Faqat joriy foydalanuvchiga tegishli buyurtmalarni,
-        yangi yaratilganlari birinchi bo'lib qaytaradi.
+        yangi yaratilganlari birinchi bo'lib qaytaradi (tartibni paginatsiya belgilaydi).
         Optimalizatsiya uchun bog'liq ma'lumotlarni oldindan oladi.
         """
         user = self.request.user
-        return Order.objects.filter(user=user).order_by('-created_at').prefetch_related(
-            'items',  # OrderItem'larni olish uchun
-            'items__product__translations',  # Mahsulot tarjimalarini olish uchun
-            'items__product__category__translations',  # Kategoriya tarjimalarini olish uchun
-            'pickup_branch__working_hours'  # Filial ish vaqtlarini olish uchun (agar kerak bo'lsa)
-        )
+        relations = OrderListSerializer.requested_relations(self.request)
+        return with_order_relations(Order.objects.filter(user=user), relations)
 
 
 class OrderDetailView(generics.RetrieveAPIView):
@@ -532,13 +488,8 @@ class OrderDetailView(generics.RetrieveAPIView):
         ID sini topib ko'rishning oldini oladi.
         """
         user = self.request.user
-        # History'dagiga o'xshash prefetch qo'shamiz
-        return Order.objects.filter(user=user).prefetch_related(
-            'items',
-            'items__product__translations',
-            'items__product__category__translations',
-            'pickup_branch__working_hours'
-        )
+        relations = OrderSerializer.requested_relations(self.request, default=ORDER_DETAIL_RELATIONS)
+        return with_order_relations(Order.objects.filter(user=user), relations)
 
 
 class OrderCancelView(APIView):
@@ -575,13 +526,25 @@ class OrderCancelView(APIView):
             )
 
 
+class InMemoryPageNumberPagination(PageNumberPagination):
+    """
+    Kichik ro'yxatlar (masalan, filiallar) uchun: queryset bir marta yuklanadi va
+    sahifalash xotirada qilinadi, alohida COUNT so'rovi bo'lmaydi.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return super().paginate_queryset(list(queryset), request, view)
+
+
 class BranchViewSet(viewsets.ReadOnlyModelViewSet):  # <-- ListAPIView o'rniga
     """
     Barcha aktiv filiallar ro'yxatini va bitta filialni ID bo'yicha olish uchun.
+    Ro'yxat ikki so'rovda olinadi: filiallar va ularning ish vaqtlari (is_open ham shulardan hisoblanadi).
     """
     queryset = Branch.objects.filter(is_active=True).prefetch_related('working_hours')
     serializer_class = BranchSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = InMemoryPageNumberPagination
     # lookup_field = 'pk' # Bu standart, shart emas
 
 
@@ -20,6 +20,11 @@ from django.utils.translation import gettext_lazy as _
 BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(os.path.join(BASE_DIR, '.env'))
 GOOGLE_DRIVE_CREDENTIALS_JSON_PATH = os.path.join(BASE_DIR, 'credentials.json')
+GDRIVE_SERVICE_ACCOUNT_EMAIL = os.getenv('GDRIVE_SERVICE_ACCOUNT_EMAIL',
+                                         'chocoberry@chocoberryimage.iam.gserviceaccount.com')
+# 'pydrive2' - haqiqiy Google Drive, 'fake' - lokal papka (tarmoqsiz test uchun)
+GDRIVE_BACKEND = os.getenv('GDRIVE_BACKEND', 'pydrive2')
+GDRIVE_FAKE_ROOT = os.getenv('GDRIVE_FAKE_ROOT', os.path.join(BASE_DIR, 'gdrive_fake'))
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
 
@@ -40,6 +45,8 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    # Qidiruvdagi trigram lookup'lari (name_document__trigram_word_similar) uchun
+    'django.contrib.postgres',
     'corsheaders',
     # Qo'shilgan kutubxonalar
     'debug_toolbar',
@@ -105,6 +112,29 @@ DATABASES = {
     }
 }
 
+# Kesh (katalog snapshoti uchun). Standart: lokal xotira.
+# Bir nechta jarayon (gunicorn worker) bo'lsa, umumiy backend (Redis/Memcached) ishlatish tavsiya etiladi,
+# aks holda admin'dagi o'zgarish boshqa jarayonlarda CATALOG_CACHE_TIMEOUT o'tguncha ko'rinmaydi.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'telegrambot-api'),
+    }
+}
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', 60 * 5))  # Snapshot yashash muddati (sekund)
+# Mahsulot qidiruvi: 'auto' (PostgreSQL bo'lsa tsvector/trigram, aks holda xotiradagi indeks), 'postgres', 'memory'
+PRODUCT_SEARCH_BACKEND = os.getenv('PRODUCT_SEARCH_BACKEND', 'auto')
+# Yetkazib berish filialini tanlash indeksi (api/branch_routing.py) qayta qurilishigacha maksimal muddat (sekund)
+BRANCH_ROUTING_INDEX_TTL = int(os.getenv('BRANCH_ROUTING_INDEX_TTL', 60 * 5))
+# Taxminiy vaqt (api/eta.py): va'da qilinadigan kvantil ('p50', 'p80', 'p90'), profil ishlatilishi uchun
+# minimal namunalar soni va oshxonada bir vaqtda tayyorlanadigan buyurtmalar soni
+ETA_PROMISE_QUANTILE = os.getenv('ETA_PROMISE_QUANTILE', 'p80')
+ETA_MIN_SAMPLES = int(os.getenv('ETA_MIN_SAMPLES', 10))
+ETA_KITCHEN_PARALLELISM = int(os.getenv('ETA_KITCHEN_PARALLELISM', 4))
+# Admin oshxona navbati (api/admin.py): sahifa avtomatik yangilanish oralig'i (sekund) va ko'rsatiladigan buyurtmalar soni
+ADMIN_ORDER_QUEUE_REFRESH = int(os.getenv('ADMIN_ORDER_QUEUE_REFRESH', 15))
+ADMIN_ORDER_QUEUE_LIMIT = int(os.getenv('ADMIN_ORDER_QUEUE_LIMIT', 200))
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -195,6 +225,17 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 
+# Buyurtma bildirishnomalari (manage.py notification_dispatcher) sozlamalari
+NOTIFICATION_GLOBAL_RATE = float(os.getenv('NOTIFICATION_GLOBAL_RATE', 25))  # xabar/sekund (Telegram limiti ~30)
+NOTIFICATION_PER_CHAT_INTERVAL = float(os.getenv('NOTIFICATION_PER_CHAT_INTERVAL', 1.0))  # sekund
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', 5))
+NOTIFICATION_WORKERS = int(os.getenv('NOTIFICATION_WORKERS', 8))
+
+# Google Drive fon vazifalari (manage.py gdrive_worker) sozlamalari
+GDRIVE_JOB_MAX_ATTEMPTS = int(os.getenv('GDRIVE_JOB_MAX_ATTEMPTS', 8))
+GDRIVE_JOB_BACKOFF_BASE = int(os.getenv('GDRIVE_JOB_BACKOFF_BASE', 30))  # sekund
+GDRIVE_JOB_BACKOFF_MAX = int(os.getenv('GDRIVE_JOB_BACKOFF_MAX', 60 * 60))  # sekund
+
 INTERNAL_IPS = [
     "127.0.0.1",
 ]
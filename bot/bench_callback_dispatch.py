@@ -0,0 +1,111 @@
+# bot/bench_callback_dispatch.py
+"""
+Inline tugma (callback) marshrutlash narxini o'lchaydi: avvalgi usul (har bir tugma turi uchun alohida
+regex CallbackQueryHandler, tartib bilan tekshiriladi + handler ichida split('_')) va CallbackRouter
+(kod bo'yicha lug'at, keshlangan dekodlash). Tarmoq/API ishtirok etmaydi, faqat check_update va argumentlarni olish.
+Misol: python -m bot.bench_callback_dispatch --updates 200000 --extra 0 16 48
+"""
+import time
+import random
+import argparse
+import statistics
+
+from telegram import Update
+from telegram.ext import CallbackQueryHandler
+
+from .utils.callback_data import CallbackRouter, ROUTES, decode_callback, encode_callback
+
+# bot.py'dagi avvalgi global handlerlar (o'sha tartibda) va ularga mos eski callback_data namunalari
+LEGACY_HANDLERS = (
+    ('^cat_', 'cat_12'),
+    ('^prod_', 'prod_345'),
+    ('^pdetail_(incr|decr)_', 'pdetail_incr_345'),
+    ('^pdetail_qtyinfo_', 'pdetail_qtyinfo_345'),
+    ('^pdetail_add_', 'pdetail_add_345'),
+    ('^back_to_history$', 'back_to_history'),
+    ('^back_to_', 'back_to_prod_list_12'),
+    ('^cart_(incr|decr)_', 'cart_decr_678'),
+    ('^cart_del_', 'cart_del_678'),
+    ('^cart_info_', 'cart_info_678'),
+    ('^cart_refresh$', 'cart_refresh'),
+    ('^order_', 'order_9012'),
+    ('^hist_page_', 'hist_page_AAAAAGZ0c3RhbXAAAAAAAB'),
+    ('^cancel_order_', 'cancel_order_9012'),
+    ('^branch_loc_', 'branch_loc_3'),
+)
+SAMPLE_ARGS = {'category': (12,), 'product': (345,), 'product_qty': ('incr', 345), 'product_qty_info': (345,),
+               'product_add': (345,), 'back_to_products': (12,), 'cart_qty': ('decr', 678), 'cart_delete': (678,),
+               'cart_info': (678,), 'order_detail': (9012,), 'order_cancel': (9012,),
+               'history_page': ('AAAAAGZ0c3RhbXAAAAAAAB',), 'branch_location': (3,)}
+
+
+async def _noop(update, context):
+    return None
+
+
+def make_update(update_id: int, data: str) -> Update:
+    user = {'id': 1, 'is_bot': False, 'first_name': 'Bench'}
+    return Update.de_json({
+        'update_id': update_id,
+        'callback_query': {'id': str(update_id), 'from': user, 'chat_instance': '1', 'data': data},
+    }, None)
+
+
+def legacy_dispatch(handlers, update):
+    # Application bir guruhdagi handlerlarni tartib bilan tekshiradi; birinchi mos kelgani ishlaydi
+    for handler in handlers:
+        if handler.check_update(update):
+            update.callback_query.data.split('_')  # Handler ichidagi argumentlarni ajratish
+            return handler
+    return None
+
+
+def measure(label, func, updates, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for update in updates:
+            func(update)
+        samples.append((time.perf_counter() - started) / len(updates) * 1_000_000)
+    print(f"  {label:<22} {statistics.median(samples):.2f}us/update (min {min(samples):.2f})")
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Callback marshrutlash narxi (regex zanjiri va CallbackRouter)")
+    parser.add_argument('--updates', type=int, default=100_000, help="Har bir o'lchashdagi update'lar soni")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--extra', type=int, nargs='+', default=[0, 16, 48],
+                        help="Eski usulda qo'shimcha tugma turlari (mos kelmaydigan regex handlerlar) soni")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    router = CallbackRouter({route.name: _noop for route in ROUTES})
+    new_data = [encode_callback(route.name, *SAMPLE_ARGS.get(route.name, ())) for route in ROUTES]
+    legacy_data = [data for _pattern, data in LEGACY_HANDLERS]
+    new_updates = [make_update(i, rng.choice(new_data)) for i in range(args.updates)]
+    legacy_updates = [make_update(i, rng.choice(legacy_data)) for i in range(args.updates)]
+
+    unrouted = [data for data in new_data + legacy_data if decode_callback(data) is None]
+    if unrouted:
+        raise SystemExit(f"Router did not recognise: {unrouted}")
+    print(f"routes={len(ROUTES)} updates={args.updates} "
+          f"max callback_data: new={max(map(len, new_data))}B legacy={max(map(len, legacy_data))}B")
+
+    for extra in args.extra:
+        # Yangi tugma turlari odatda umumiy prefikslardan (masalan '^back_to_') oldinga qo'yiladi
+        handlers = [CallbackQueryHandler(_noop, pattern=f'^extra{i}_') for i in range(extra)]
+        handlers += [CallbackQueryHandler(_noop, pattern=pattern) for pattern, _data in LEGACY_HANDLERS]
+        print(f"button types={len(handlers)}")
+        legacy = measure('regex chain', lambda u: legacy_dispatch(handlers, u), legacy_updates, args.repeat)
+        decode_callback.cache_clear()
+        cold = measure('router (cold cache)', lambda u: (decode_callback.cache_clear(), router.check_update(u)),
+                       new_updates, 1)
+        warm = measure('router', router.check_update, new_updates, args.repeat)
+        legacy_router = measure('router (legacy data)', router.check_update, legacy_updates, args.repeat)
+        print(f"  speedup={legacy / warm:.1f}x (cold {legacy / cold:.1f}x, legacy data {legacy / legacy_router:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
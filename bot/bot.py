@@ -3,7 +3,13 @@ import logging
 import os
 import sys  # <-- sys import qilindi
 import django  # <-- django import qilindi
-from .utils.db_utils import init_db
+from .utils.session_store import start_session_store, close_session_store
+from .utils.api_cache import start_api_cache_listener, stop_api_cache_listener
+from .utils.photo_cache import start_photo_cache_warmup
+from .utils.persistence import build_persistence
+from .utils.api_client import close_api_client
+from .utils.geocode import close_reverse_geocoder
+from .utils.callback_data import CallbackRouter
 
 print(f"DEBUG: Running script from: {__file__}")
 
@@ -31,12 +37,12 @@ except Exception as e:
 
 from telegram.ext import (
     Application, CommandHandler, MessageHandler,
-    CallbackQueryHandler, ConversationHandler, PicklePersistence, filters, ContextTypes
+    CallbackQueryHandler, ConversationHandler, filters, ContextTypes
 )
 from telegram import Update  # <-- Update telegram'dan import qilinadi
 # Loyihamizning modullaridan import qilamiz
 from .config import (
-    BOT_TOKEN, SELECTING_LANG, AUTH_CHECK, WAITING_PHONE, MAIN_MENU,
+    BOT_TOKEN, BOT_MODE, BOT_DROP_PENDING_UPDATES, SELECTING_LANG, AUTH_CHECK, WAITING_PHONE, MAIN_MENU,
     ASKING_DELIVERY_TYPE, ASKING_BRANCH, ASKING_LOCATION, ASKING_PAYMENT, ASKING_NOTES, CHOOSING_PHONE_METHOD,
     WAITING_MANUAL_PHONE, CONFIRMING_LOCATION, SELECTING_ADDRESS_OR_NEW, ASKING_SAVE_NEW_ADDRESS, ENTERING_ADDRESS_NAME,
 )
@@ -67,16 +73,32 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def main() -> None:
-    """Botni ishga tushuradi va handlerlarni qo'shadi."""
+async def on_startup(application: Application) -> None:
+    await start_session_store(application)  # Sessiya ombori (tokenlar, til) ochiladi
+    await start_api_cache_listener(application)  # API kesh invalidatsiyasi (PostgreSQL NOTIFY)
+    await start_photo_cache_warmup(application)  # Rasmlar file_id'larini fonda oldindan olish
+
+
+async def on_shutdown(application: Application) -> None:
+    await stop_api_cache_listener(application)
+    await close_session_store(application)  # Yozilmagan sessiyalar saqlanadi
+    await close_reverse_geocoder(application)  # Geocode keshi yopiladi
+    await close_api_client(application)  # HTTP ulanishlari yopiladi
+
+
+def build_application() -> Application:
+    """Application yaratadi va handlerlarni qo'shadi (polling va webhook rejimlari uchun umumiy)."""
     # Persistence
-    init_db()
-    persistence = PicklePersistence(filepath="bot_storage.pickle")  # Asl fayl nomi
+    persistence = build_persistence()  # Har bir foydalanuvchi/suhbat alohida qatorda (BOT_PERSISTENCE_BACKEND)
 
+    builder = Application.builder().token(BOT_TOKEN)
+    if BOT_MODE == 'webhook':
+        builder = builder.updater(None)  # Update'lar ASGI ilova orqali keladi
     application = (
-        Application.builder()
-        .token(BOT_TOKEN)
+        builder
         .persistence(persistence)  # Persistence yoqilgan
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
         .build()
     )
 
@@ -85,27 +107,26 @@ def main() -> None:
     # 1. Global logger (agar kerak bo'lsa, debug uchun)
     # application.add_handler(TypeHandler(Update, log_all_updates), group=-1) # Hozircha o'chirib turamiz
 
-    # 2. Global CallbackQuery Handlerlar (ConversationHandler'dan oldin, block=False bilan)
-    application.add_handler(CallbackQueryHandler(category_selected_callback, pattern='^cat_', block=False))
-    application.add_handler(CallbackQueryHandler(product_selected_callback, pattern='^prod_', block=False))
-    application.add_handler(
-        CallbackQueryHandler(product_detail_qty_change_callback, pattern='^pdetail_(incr|decr)_', block=False))
-    application.add_handler(
-        CallbackQueryHandler(product_detail_qty_info_callback, pattern='^pdetail_qtyinfo_', block=False))
-    application.add_handler(
-        CallbackQueryHandler(product_detail_add_to_cart_callback, pattern='^pdetail_add_', block=False))
-    application.add_handler(CallbackQueryHandler(back_to_history_callback, pattern='^back_to_history$', block=False))
-    application.add_handler(CallbackQueryHandler(back_button_callback, pattern='^back_to_', block=False))
-    # application.add_handler(CallbackQueryHandler(start_checkout_callback, pattern='^start_checkout$', block=False))
-    application.add_handler(
-        CallbackQueryHandler(cart_quantity_change_callback, pattern='^cart_(incr|decr)_', block=False))
-    application.add_handler(CallbackQueryHandler(cart_item_delete_callback, pattern='^cart_del_', block=False))
-    application.add_handler(CallbackQueryHandler(cart_info_noop_callback, pattern='^cart_info_', block=False))
-    application.add_handler(CallbackQueryHandler(cart_refresh_callback, pattern='^cart_refresh$', block=False))
-    application.add_handler(CallbackQueryHandler(order_detail_callback, pattern='^order_', block=False))
-    application.add_handler(CallbackQueryHandler(history_page_callback, pattern='^hist_page_', block=False))
-    application.add_handler(CallbackQueryHandler(cancel_order_callback, pattern='^cancel_order_', block=False))
-    application.add_handler(CallbackQueryHandler(branch_location_callback, pattern='^branch_loc_', block=False))
+    # 2. Global inline tugmalar: bitta CallbackRouter (callback_data kodi bo'yicha lug'atdan topiladi,
+    # ConversationHandler'dan oldin, block=False bilan). Yangi tugma turi - utils/callback_data.py ROUTES'ga qo'shiladi
+    application.add_handler(CallbackRouter({
+        'category': category_selected_callback,
+        'product': product_selected_callback,
+        'product_qty': product_detail_qty_change_callback,
+        'product_qty_info': product_detail_qty_info_callback,
+        'product_add': product_detail_add_to_cart_callback,
+        'back_to_history': back_to_history_callback,
+        'back_to_categories': back_button_callback,
+        'back_to_products': back_button_callback,
+        'cart_qty': cart_quantity_change_callback,
+        'cart_delete': cart_item_delete_callback,
+        'cart_info': cart_info_noop_callback,
+        'cart_refresh': cart_refresh_callback,
+        'order_detail': order_detail_callback,
+        'order_cancel': cancel_order_callback,
+        'history_page': history_page_callback,
+        'branch_location': branch_location_callback,
+    }, block=False))
 
     # 3. Asosiy ConversationHandler (persistent=True va per_message=False bilan)
     conv_handler = ConversationHandler(
@@ -190,8 +211,18 @@ def main() -> None:
 
     # 4. Boshqa global Command/Message Handlerlar (hozircha yo'q)
 
-    logger.info("Starting bot...")
-    application.run_polling(drop_pending_updates=True)  # Eskirgan update'larni o'tkazib yuborish
+    return application
+
+
+def main() -> None:
+    """Botni BOT_MODE bo'yicha (polling yoki webhook) ishga tushiradi."""
+    application = build_application()
+    if BOT_MODE == 'webhook':
+        from .webhook import run_webhook
+        run_webhook(application)
+        return
+    logger.info("Starting bot (polling)...")
+    application.run_polling(drop_pending_updates=BOT_DROP_PENDING_UPDATES)
 
 
 if __name__ == "__main__":
@@ -13,6 +13,62 @@ if not BOT_TOKEN:
     raise ValueError("Iltimos, .env faylida TELEGRAM_BOT_TOKEN ni o'rnating.")
 
 API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000/api/v1/")
+# 'http' - API alohida serverda; 'inprocess' - bot API view'larini o'z jarayonida chaqiradi (HTTP'siz)
+BOT_API_TRANSPORT = os.getenv("BOT_API_TRANSPORT", "http")
+BOT_INPROCESS_WORKERS = int(os.getenv("BOT_INPROCESS_WORKERS", 8))  # In-process so'rovlar uchun thread'lar (DB ulanishlari)
+
+# --- HTTP klientlari (ulanishlar pool'i) ---
+BOT_HTTP_MAX_CONNECTIONS = int(os.getenv("BOT_HTTP_MAX_CONNECTIONS", 100))
+BOT_HTTP_MAX_KEEPALIVE = int(os.getenv("BOT_HTTP_MAX_KEEPALIVE", 20))  # Ochiq qoldiriladigan ulanishlar
+BOT_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("BOT_HTTP_KEEPALIVE_EXPIRY", 30))
+BOT_HTTP2 = os.getenv("BOT_HTTP2", "false").lower() in ('1', 'true', 'yes')  # 'h2' paketi kerak
+BOT_HTTP_POOL_TIMEOUT = float(os.getenv("BOT_HTTP_POOL_TIMEOUT", 5))  # Bo'sh ulanishni kutish (sekund)
+BOT_HTTP_RETRIES = int(os.getenv("BOT_HTTP_RETRIES", 2))  # GET so'rovlar uchun qo'shimcha urinishlar
+BOT_HTTP_RETRY_BACKOFF = float(os.getenv("BOT_HTTP_RETRY_BACKOFF", 0.2))  # Birinchi kutish (sekund), har safar x2
+
+# --- Reverse geocoding (lokatsiya -> manzil) ---
+BOT_GEOCODER = os.getenv("BOT_GEOCODER", "nominatim")  # 'nominatim' yoki 'stub' (tarmoqsiz, test uchun)
+BOT_GEOCODE_PRECISION = int(os.getenv("BOT_GEOCODE_PRECISION", 8))  # Geohash uzunligi: 8 ~ 38m x 19m katak
+BOT_GEOCODE_CACHE_SIZE = int(os.getenv("BOT_GEOCODE_CACHE_SIZE", 50000))  # Diskdagi kesh (LRU)
+BOT_GEOCODE_MEMORY_SIZE = int(os.getenv("BOT_GEOCODE_MEMORY_SIZE", 5000))  # Xotiradagi kesh (LRU)
+BOT_GEOCODE_TTL_DAYS = float(os.getenv("BOT_GEOCODE_TTL_DAYS", 30))
+BOT_GEOCODE_RATE = float(os.getenv("BOT_GEOCODE_RATE", 1.0))  # Upstream'ga so'rov/sekund (Nominatim: 1)
+BOT_GEOCODE_MAX_WAIT = float(os.getenv("BOT_GEOCODE_MAX_WAIT", 5))  # Limiter navbatida maksimal kutish (sekund)
+BOT_GEOCODE_SNAP_METERS = float(os.getenv("BOT_GEOCODE_SNAP_METERS", 50))  # Shu radiusdagi saqlangan manzil ishlatiladi
+
+# --- Update'larni qabul qilish rejimi ---
+BOT_MODE = os.getenv("BOT_MODE", "polling")  # 'polling' yoki 'webhook'
+# Qayta ishga tushganda Telegram'da navbatda turgan update'larni tashlab yuborish (buyurtmalar yo'qolmasligi uchun - yo'q)
+BOT_DROP_PENDING_UPDATES = os.getenv("BOT_DROP_PENDING_UPDATES", "false").lower() in ('1', 'true', 'yes')
+BOT_WEBHOOK_URL = os.getenv("BOT_WEBHOOK_URL")  # Tashqi HTTPS manzil, masalan https://bot.example.com
+BOT_WEBHOOK_PATH = os.getenv("BOT_WEBHOOK_PATH", "/telegram/webhook")
+BOT_WEBHOOK_SECRET = os.getenv("BOT_WEBHOOK_SECRET", "")  # X-Telegram-Bot-Api-Secret-Token (A-Z, a-z, 0-9, _ va -)
+BOT_WEBHOOK_LISTEN = os.getenv("BOT_WEBHOOK_LISTEN", "0.0.0.0")
+BOT_WEBHOOK_PORT = int(os.getenv("BOT_WEBHOOK_PORT", 8443))
+BOT_WEBHOOK_MAX_CONNECTIONS = int(os.getenv("BOT_WEBHOOK_MAX_CONNECTIONS", 40))  # Telegram: 1-100
+
+# --- Sessiya ombori (tokenlar va til) ---
+BOT_SESSION_BACKEND = os.getenv("BOT_SESSION_BACKEND", "sqlite")  # 'sqlite', 'redis' yoki 'postgres'
+BOT_SESSION_URL = os.getenv("BOT_SESSION_URL")  # SQLite fayli, redis:// URL yoki Postgres DSN
+BOT_SESSION_CACHE_SIZE = int(os.getenv("BOT_SESSION_CACHE_SIZE", 10000))  # Xotirada saqlanadigan sessiyalar
+BOT_SESSION_FLUSH_DELAY = float(os.getenv("BOT_SESSION_FLUSH_DELAY", 0.2))  # Yozuvlarni to'plash (sekund)
+# --- PTB persistence (user_data, suhbat holatlari) ---
+BOT_PERSISTENCE_BACKEND = os.getenv("BOT_PERSISTENCE_BACKEND", "sqlite")  # 'sqlite', 'postgres' yoki 'pickle'
+BOT_PERSISTENCE_URL = os.getenv("BOT_PERSISTENCE_URL")  # SQLite fayli yoki Postgres DSN
+BOT_PERSISTENCE_UPDATE_INTERVAL = float(os.getenv("BOT_PERSISTENCE_UPDATE_INTERVAL", 10))  # O'zgarishlarni yozish (sekund)
+BOT_PERSISTENCE_COMPACT_INTERVAL = float(os.getenv("BOT_PERSISTENCE_COMPACT_INTERVAL", 3600))  # Fonda siqish (sekund)
+# Access token muddati tugashiga shuncha sekund qolganda oldindan yangilanadi
+BOT_TOKEN_REFRESH_MARGIN = int(os.getenv("BOT_TOKEN_REFRESH_MARGIN", 60))
+
+# --- Ommaviy API javoblari keshi (kategoriyalar, mahsulotlar, filiallar, aksiyalar) ---
+BOT_API_CACHE_TTL = float(os.getenv("BOT_API_CACHE_TTL", 300))  # Shu vaqt ichida API'ga so'rov yuborilmaydi
+BOT_API_CACHE_STALE = float(os.getenv("BOT_API_CACHE_STALE", 3600))  # TTL'dan keyin eski javob + fonda yangilash
+BOT_API_CACHE_SIZE = int(os.getenv("BOT_API_CACHE_SIZE", 1000))  # Maksimal yozuvlar soni (LRU)
+BOT_BRANCH_CACHE_TTL = float(os.getenv("BOT_BRANCH_CACHE_TTL", 30))  # Filiallar: is_open vaqtga bog'liq
+
+# --- Rasmlar (Telegram file_id keshi) ---
+# Xizmat chati: ishga tushganda katalog rasmlari shu yerga yuklanib, file_id'lari oldindan olinadi (ixtiyoriy)
+BOT_PHOTO_CACHE_CHAT_ID = int(os.getenv("BOT_PHOTO_CACHE_CHAT_ID", 0)) or None
 
 # --- Holatlar (States) ---
 (SELECTING_LANG, AUTH_CHECK,
@@ -5,7 +5,8 @@ from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 
 from ..utils.helpers import get_user_lang
-from ..utils.api_client import make_api_request
+from ..utils.api_cache import cached_api_get
+from ..utils.callback_data import encode_callback
 
 logger = logging.getLogger(__name__)
 
@@ -34,7 +35,7 @@ async def show_branch_list_menu(update: Update, context: ContextTypes.DEFAULT_TY
         sent_message = await message.reply_text(loading_text)
 
     # Filiallar ro'yxatini API dan olamiz (bu endpoint token talab qilmasligi mumkin)
-    branches_response = await make_api_request(context, 'GET', 'branches/', user_id)
+    branches_response = await cached_api_get(context, 'branches/', user_id)
 
     final_text = ""
     final_markup = None
@@ -59,7 +60,7 @@ async def show_branch_list_menu(update: Update, context: ContextTypes.DEFAULT_TY
                 map_button_text = "🗺️ Xaritada" if lang_code == 'uz' else "🗺️ На карте"
                 keyboard.append([
                     InlineKeyboardButton(f"{map_button_text} ({branch_name[:15]}...)",
-                                         callback_data=f"branch_loc_{branch_id}")
+                                         callback_data=encode_callback('branch_location', branch_id))
                 ])
                 final_text += "--------------------\n"
             final_markup = InlineKeyboardMarkup(keyboard)
@@ -1,25 +1,29 @@
 # bot/handlers/callbacks.py
+import re
+import uuid
 import logging
-from urllib.parse import urlparse, parse_qs
 
-import datetime
-from django.utils import timezone
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 from .cart import show_cart
-from .order import show_order_history, show_order_detail
+from .order import show_order_history, show_order_detail, build_order_history_view, HISTORY_FIELDS
 from ..keyboards import get_product_detail_keyboard
 
 # Loyihadagi boshqa modullardan importlar
 from ..utils.helpers import get_user_lang
 from ..utils.api_client import make_api_request
+from ..utils.api_cache import cached_api_get
+from ..utils.photo_cache import send_cached_photo
 # Menyuni ko'rsatish funksiyalarini import qilamiz
 from .menu_browse import show_category_list, show_product_list
 from ..config import ASKING_DELIVERY_TYPE, SELECTING_LANG
 
 logger = logging.getLogger(__name__)
 
+# API kursori: 17 baytning base64url ko'rinishi (api.views.OrderHistoryCursorPagination)
+HISTORY_CURSOR_RE = re.compile(r'[A-Za-z0-9_-]{23}')
+
 
 async def cart_quantity_change_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Savatdagi mahsulot sonini o'zgartirish uchun +/- tugmalarini boshqaradi."""
@@ -27,14 +31,7 @@ async def cart_quantity_change_callback(update: Update, context: ContextTypes.DE
     user_id = query.from_user.id
     lang_code = get_user_lang(context)
 
-    try:
-        parts = query.data.split('_')  # Masalan: ['cart', 'incr', 'item_id']
-        action_type = parts[1]  # 'incr' yoki 'decr'
-        item_id = int(parts[2])
-    except (IndexError, ValueError, TypeError):
-        logger.warning(f"Invalid cart quantity callback data: {query.data} for user {user_id}")
-        await query.answer("Xatolik: Noto'g'ri so'rov.", show_alert=True)
-        return
+    action_type, item_id = context.args  # CallbackRouter: ('incr' yoki 'decr', item_id)
 
     # Foydalanuvchiga darhol javob (loading state)
     processing_text = "Bajarilmoqda..." if lang_code == 'uz' else "Обработка..."
@@ -68,13 +65,7 @@ async def cart_item_delete_callback(update: Update, context: ContextTypes.DEFAUL
     user_id = query.from_user.id
     lang_code = get_user_lang(context)
 
-    try:
-        parts = query.data.split('_')  # Masalan: ['cart', 'del', 'item_id']
-        item_id = int(parts[2])
-    except (IndexError, ValueError, TypeError):
-        logger.warning(f"Invalid cart delete callback data: {query.data} for user {user_id}")
-        await query.answer("Xatolik: Noto'g'ri so'rov.", show_alert=True)
-        return
+    item_id = context.args[0]  # CallbackRouter: savat qatori IDsi
 
     deleting_text = "O'chirilmoqda..." if lang_code == 'uz' else "Удаление..."
     await query.answer(deleting_text)  # Darhol javob
@@ -139,16 +130,7 @@ async def category_selected_callback(update: Update, context: ContextTypes.DEFAU
     user_id = query.from_user.id
     # lang_code = get_user_lang(context) # Agar show_product_list ichida ishlatilmasa, bu yerda shart emas
 
-    try:
-        # Callback datadan kategoriya ID sini ajratib olamiz ('cat_<ID>')
-        if not query.data or not query.data.startswith('cat_'):
-            raise ValueError("Invalid callback data for category selection")
-        category_id = int(query.data.split('_')[1])
-    except (IndexError, ValueError, TypeError) as e:
-        logger.warning(f"Invalid category callback data: {query.data} - Error: {e}")
-        # Xatolik haqida qisqa javob beramiz, xabarni tahrirlamaymiz
-        await query.answer("Xatolik: Noto'g'ri kategoriya tanlandi.", show_alert=True)
-        return
+    category_id = context.args[0]  # CallbackRouter: kategoriya IDsi
 
     logger.info(f"User {user_id} selected category ID: {category_id} to view products.")
 
@@ -176,16 +158,7 @@ async def product_selected_callback(update: Update, context: ContextTypes.DEFAUL
     chat_id = update.effective_chat.id  # Chat ID ni olamiz
     lang_code = get_user_lang(context)
 
-    product_id_to_fetch = -1  # Standart noto'g'ri qiymat
-    try:
-        if not query.data or not query.data.startswith('prod_'):
-            raise ValueError("Invalid callback data for product selection")
-        product_id_to_fetch = int(query.data.split('_')[1])
-    except (IndexError, ValueError, TypeError) as e:
-        logger.warning(f"Invalid product callback data: {query.data} - Error: {e}")
-        # Xatolik haqida yangi xabar yuboramiz, chunki avvalgi xabar qanday ekanligi noma'lum
-        await context.bot.send_message(chat_id=chat_id, text="Xatolik: Noto'g'ri mahsulot tanlandi.")
-        return
+    product_id_to_fetch = context.args[0]  # CallbackRouter: mahsulot IDsi
 
     logger.info(f"User {user_id} selected product ID: {product_id_to_fetch} for detail view.")
 
@@ -207,7 +180,7 @@ async def product_selected_callback(update: Update, context: ContextTypes.DEFAUL
         return  # Agar bu xabarni ham yubora olmasak, davom etmaymiz
 
     # 3. API dan mahsulot detallarini olamiz
-    product_response = await make_api_request(context, 'GET', f'products/{product_id_to_fetch}/', user_id)
+    product_response = await cached_api_get(context, f'products/{product_id_to_fetch}/', user_id)
 
     # 4. Yuborilgan "Yuklanmoqda..." xabarini o'chiramiz
     if sent_loading_msg:
@@ -243,8 +216,8 @@ async def product_selected_callback(update: Update, context: ContextTypes.DEFAUL
         photo_url = product.get('image_url')
         if photo_url:
             try:
-                await context.bot.send_photo(chat_id=chat_id, photo=photo_url, caption=caption,
-                                             reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+                await send_cached_photo(context, chat_id, photo_url, caption=caption,
+                                        reply_markup=reply_markup, parse_mode=ParseMode.HTML)
             except Exception as e_photo:
                 logger.error(f"Failed to send product photo {photo_url}: {e_photo}")
                 # Rasm bilan yuborib bo'lmasa, matn bilan yuboramiz
@@ -275,7 +248,7 @@ async def product_detail_qty_change_callback(update: Update, context: ContextTyp
     current_quantity = interaction_data['quantity']
     category_id_for_back = interaction_data.get('category_id')
 
-    action = query.data.split('_')[1]  # pdetail_ACTION_productid
+    action = context.args[0]  # CallbackRouter: ('incr' yoki 'decr', product_id)
 
     if action == 'incr':
         current_quantity += 1
@@ -321,15 +294,9 @@ async def product_detail_add_to_cart_callback(update: Update, context: ContextTy
     product_id_from_context = interaction_data['product_id']
     category_id_for_back = interaction_data.get('category_id')  # Ortga qaytish uchun kategoriya IDsi
 
-    try:  # Callback datadan product_id ni olamiz, solishtirish uchun
-        product_id_from_callback = int(query.data.split('_')[-1])
-        if product_id_from_context != product_id_from_callback:
-            logger.error(f"Mismatch product ID in context vs callback for user {user_id}")
-            await query.answer("Ichki tizim xatoligi!", show_alert=True)
-            return
-    except (IndexError, ValueError, TypeError):
-        logger.error(f"Invalid product_id in callback data for pdetail_add: {query.data}")
-        await query.answer("Ichki xatolik (mahsulot IDsi)!", show_alert=True)
+    if product_id_from_context != context.args[0]:  # Callback'dagi product_id bilan solishtiramiz
+        logger.error(f"Mismatch product ID in context vs callback for user {user_id}")
+        await query.answer("Ichki tizim xatoligi!", show_alert=True)
         return
 
     quantity_to_add = interaction_data['quantity']
@@ -382,15 +349,10 @@ async def back_button_callback(update: Update, context: ContextTypes.DEFAULT_TYP
     except Exception as e:
         logger.warning(f"Could not delete message on back press: {e}")
 
-    if callback_data == 'back_to_categories':
+    if context.args:  # back_to_products: kategoriya IDsi
+        await show_product_list(update, context, context.args[0])
+    else:  # back_to_categories
         await show_category_list(update, context)
-    elif callback_data.startswith('back_to_prod_list_'):
-        try:
-            category_id = int(callback_data.split('_')[-1])
-            await show_product_list(update, context, category_id)
-        except (IndexError, ValueError, TypeError):
-            logger.warning(f"Invalid back_to_prod_list callback: {callback_data}")
-            await show_category_list(update, context)  # Kategoriyalarga qaytaramiz
 
 
 async def start_checkout_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:  # Endi state qaytaradi
@@ -400,6 +362,8 @@ async def start_checkout_callback(update: Update, context: ContextTypes.DEFAULT_
     user_id = query.from_user.id
     lang_code = get_user_lang(context)
     logger.info(f"User {user_id} initiated checkout.")
+    # Har bir checkout o'z idempotency kaliti bilan: faqat shu oqim ichidagi takroriy so'rovlar bitta buyurtma bo'ladi
+    context.user_data['checkout_idempotency_key'] = uuid.uuid4().hex
 
     # Yetkazib berish turini tanlash tugmalarini yaratamiz
     del_type_text = "Yetkazib berish" if lang_code == 'uz' else "Доставка"
@@ -450,61 +414,15 @@ async def back_to_history_callback(update: Update, context: ContextTypes.DEFAULT
     loading_text = "Buyurtmalar tarixi yuklanmoqda..." if lang_code == 'uz' else "Загрузка истории заказов..."
     sent_loading_message = await context.bot.send_message(chat_id=chat_id, text=loading_text)
 
-    history_response = await make_api_request(context, 'GET', 'orders/history/', user_id, params={'page': 1})
-
-    final_text = ""
-    final_markup = None
+    history_response = await make_api_request(context, 'GET', 'orders/history/', user_id,
+                                              params={'fields': HISTORY_FIELDS})
 
     if history_response and not history_response.get('error'):
-        orders = history_response.get('results', [])
-        count = history_response.get('count', 0)
-        next_page_url = history_response.get('next')
-        previous_page_url = history_response.get('previous')
-
-        if count == 0:
-            final_text = "Sizda hali buyurtmalar mavjud emas." if lang_code == 'uz' else "У вас пока нет заказов."
-        else:
-            page_title = " (1-sahifa)" if lang_code == 'uz' else " (Страница 1)"
-            final_text = f"📋 <b>Buyurtmalar Tarixi{page_title}:</b>\n\n" if lang_code == 'uz' else f"📋 <b>История Заказов{page_title}:</b>\n\n"
-            keyboard_list = []
-            for order in orders:
-                order_id_str = str(order.get('id', 'N/A'))
-                status = order.get('status', '')
-                status_display = status.replace('_', ' ').capitalize()
-                created_at = order.get('created_at', '')
-                try:
-                    dt_obj = datetime.datetime.fromisoformat(str(created_at).replace('Z', '+00:00'))
-                    formatted_date = timezone.localtime(dt_obj).strftime('%Y-%m-%d %H:%M')
-                except:
-                    formatted_date = str(created_at)[:10]
-                total = order.get('total_price', 'N/A')
-
-                final_text += f"🆔 {order_id_str} | {formatted_date} | <i>{status_display}</i> | {total} so'm\n---\n"
-                detail_button_text = "Batafsil" if lang_code == 'uz' else "Подробнее"
-                keyboard_list.append([InlineKeyboardButton(f"{detail_button_text} (#{order_id_str})",
-                                                           callback_data=f"order_{order_id_str}")])
-
-            pagination_row = []
-            if previous_page_url:
-                try:
-                    query_params_prev = parse_qs(urlparse(previous_page_url).query)
-                    prev_page = query_params_prev.get('page', [None])[0] or '1'
-                    pagination_row.append(InlineKeyboardButton("⬅️ Oldingi", callback_data=f"hist_page_{prev_page}"))
-                except:
-                    pass  # Xatolik bo'lsa tugma qo'shilmaydi
-            if next_page_url:
-                try:
-                    query_params_next = parse_qs(urlparse(next_page_url).query)
-                    next_page = query_params_next.get('page', [None])[0]
-                    if next_page: pagination_row.append(
-                        InlineKeyboardButton("Keyingi ➡️", callback_data=f"hist_page_{next_page}"))
-                except:
-                    pass
-            if pagination_row: keyboard_list.append(pagination_row)
-            if keyboard_list: final_markup = InlineKeyboardMarkup(keyboard_list)
+        final_text, final_markup = build_order_history_view(history_response, lang_code)
     else:
         error_detail = history_response.get('detail', 'API Xatoligi') if history_response else 'Network Xatoligi'
         final_text = f"Tarixni yuklashda xatolik: {error_detail}" if lang_code == 'uz' else f"Ошибка загрузки истории: {error_detail}"
+        final_markup = None
         logger.error(f"Failed to fetch/process history for back_button: {final_text}")
 
     # "Yuklanmoqda..." xabarini tahrirlaymiz
@@ -528,8 +446,7 @@ async def order_detail_callback(update: Update, context: ContextTypes.DEFAULT_TY
     lang_code = get_user_lang(context)
 
     try:
-        if not query.data or not query.data.startswith('order_'): raise ValueError("Invalid callback")
-        order_id = int(query.data.split('_')[1])
+        order_id = context.args[0]  # CallbackRouter: buyurtma IDsi
         logger.info(f"User {user_id} requested details for order {order_id}")
 
         loading_text = "Buyurtma detallari yuklanmoqda..." if lang_code == 'uz' else "Загрузка деталей заказа..."
@@ -560,35 +477,17 @@ async def history_page_callback(update: Update, context: ContextTypes.DEFAULT_TY
     await query.answer()  # Javob beramiz
     user_id = query.from_user.id
     lang_code = get_user_lang(context)
-    callback_data = query.data  # 'hist_page_{page_num}' yoki 'hist_page_url_{url}'
-
-    logger.info(f"User {user_id} requested history page: {callback_data}")
-
-    endpoint = 'orders/history/'  # Standart endpoint
-    params = {}
-    page_num_to_log = 'N/A'
-
-    if callback_data.startswith('hist_page_url_'):  # Agar to'liq URL bo'lsa (fallback)
-        full_url = callback_data[len('hist_page_url_'):]
-        parsed_url = urlparse(full_url)
-        endpoint = parsed_url.path.replace('/api/v1/', '', 1)  # API base URL ni olib tashlaymiz
-        params = parse_qs(parsed_url.query)
-        params = {k: v[0] for k, v in params.items() if len(v) == 1}  # list ni string ga o'giramiz
-        page_num_to_log = params.get('page', 'URL')
-    elif callback_data.startswith('hist_page_'):  # Agar faqat sahifa raqami bo'lsa
-        try:
-            page_num = int(callback_data.split('_')[-1])
-            params = {'page': page_num}
-            page_num_to_log = page_num
-        except (ValueError, IndexError, TypeError):
-            logger.warning(f"Invalid history page callback data: {callback_data}")
-            await query.edit_message_text("Xatolik: Sahifa raqami noto'g'ri.")
-            return
+    cursor = context.args[0]  # CallbackRouter: API kursori
+
+    logger.info(f"User {user_id} requested history page: {cursor}")
 
-    logger.info(f"Fetching history page: {page_num_to_log}")
+    # Eski xabarlardagi 'hist_page_2' yoki 'hist_page_url_http...' kabi tugmalar: birinchi sahifa ko'rsatiladi
+    params = {'fields': HISTORY_FIELDS}
+    if cursor and HISTORY_CURSOR_RE.fullmatch(cursor):
+        params['cursor'] = cursor
 
     # API ga yangi sahifa uchun so'rov yuboramiz
-    history_response = await make_api_request(context, 'GET', endpoint, user_id, params=params)
+    history_response = await make_api_request(context, 'GET', 'orders/history/', user_id, params=params)
 
     if history_response and not history_response.get('error'):
         # show_order_history xabarni tahrirlaydi
@@ -608,8 +507,7 @@ async def cancel_order_callback(update: Update, context: ContextTypes.DEFAULT_TY
     lang_code = get_user_lang(context)
 
     try:
-        if not query.data or not query.data.startswith('cancel_order_'): raise ValueError("Invalid callback")
-        order_id = int(query.data.split('_')[-1])
+        order_id = context.args[0]  # CallbackRouter: buyurtma IDsi
         logger.info(f"User {user_id} requested cancel for order {order_id}")
 
         # API ga bekor qilish so'rovini yuboramiz
@@ -645,8 +543,7 @@ async def branch_location_callback(update: Update, context: ContextTypes.DEFAULT
     lang_code = get_user_lang(context)
 
     try:
-        if not query.data or not query.data.startswith('branch_loc_'): raise ValueError("Invalid callback")
-        branch_id = int(query.data.split('_')[-1])
+        branch_id = context.args[0]  # CallbackRouter: filial IDsi
         logger.info(f"User {user_id} requested location for branch ID: {branch_id}")
 
         # API dan filial detallarini (ayniqsa lat/lon) olamiz
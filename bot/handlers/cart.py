@@ -7,6 +7,7 @@ from telegram.error import BadRequest  # <-- BadRequest import qilindi
 
 from ..utils.helpers import get_user_lang
 from ..utils.api_client import make_api_request
+from ..utils.callback_data import encode_callback, callback_route
 
 logger = logging.getLogger(__name__)
 
@@ -59,10 +60,10 @@ async def show_cart(update: Update, context: ContextTypes.DEFAULT_TYPE, cart_dat
         message_text += f"🔹 <b>{product_name}</b>\n"
         message_text += f"   {quantity} x {product.get('price', 'N/A')} so'm = {item_total} so'm\n"
         keyboard.append([
-            InlineKeyboardButton("➖", callback_data=f"cart_decr_{item_id}"),
-            InlineKeyboardButton(f" {quantity} ", callback_data=f"cart_info_{item_id}"),
-            InlineKeyboardButton("➕", callback_data=f"cart_incr_{item_id}"),
-            InlineKeyboardButton("🗑️", callback_data=f"cart_del_{item_id}")
+            InlineKeyboardButton("➖", callback_data=encode_callback('cart_qty', 'decr', item_id)),
+            InlineKeyboardButton(f" {quantity} ", callback_data=encode_callback('cart_info', item_id)),
+            InlineKeyboardButton("➕", callback_data=encode_callback('cart_qty', 'incr', item_id)),
+            InlineKeyboardButton("🗑️", callback_data=encode_callback('cart_delete', item_id))
         ])
         message_text += "--------------------\n"
     total_text = f"\n Jami: <b>{total_price}</b> so'm" if lang_code == 'uz' else f"\n Итого: <b>{total_price}</b> сум"
@@ -70,7 +71,7 @@ async def show_cart(update: Update, context: ContextTypes.DEFAULT_TYPE, cart_dat
     checkout_button_text = "➡️ Rasmiylashtirish" if lang_code == 'uz' else "➡️ Оформить заказ"
     refresh_button_text = "🔄 Yangilash" if lang_code == 'uz' else "🔄 Обновить"
     keyboard.append([InlineKeyboardButton(checkout_button_text, callback_data="start_checkout")])
-    keyboard.append([InlineKeyboardButton(refresh_button_text, callback_data="cart_refresh")])
+    keyboard.append([InlineKeyboardButton(refresh_button_text, callback_data=encode_callback('cart_refresh'))])
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     # Xabarni yuboramiz yoki tahrirlaymiz
@@ -83,7 +84,7 @@ async def show_cart(update: Update, context: ContextTypes.DEFAULT_TYPE, cart_dat
                 parse_mode=ParseMode.HTML
             )
             # Agar refresh tugmasi bosilgan bo'lsa, alohida javob beramiz
-            if update.callback_query.data == 'cart_refresh':
+            if callback_route(update.callback_query.data) == 'cart_refresh':
                 await update.callback_query.answer("Savat yangilandi" if lang_code == 'uz' else "Корзина обновлена")
             # Boshqa callbacklar (masalan +/-/del) o'z answer'ini berishi kerak
         elif update.message:  # Agar "Savat" menyu tugmasi bosilgan bo'lsa
@@ -97,7 +98,7 @@ async def show_cart(update: Update, context: ContextTypes.DEFAULT_TYPE, cart_dat
         if "Message is not modified" in str(e):
             logger.info("Cart content hasn't changed. Edit skipped by Telegram.")
             # Foydalanuvchiga o'zgarish yo'qligini bildiramiz (faqat refresh tugmasi uchun)
-            if update.callback_query and update.callback_query.data == 'cart_refresh':
+            if update.callback_query and callback_route(update.callback_query.data) == 'cart_refresh':
                 try:
                     await update.callback_query.answer(
                         "Savatda o'zgarish yo'q." if lang_code == 'uz' else "Нет изменений в корзине.")
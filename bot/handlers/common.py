@@ -20,7 +20,7 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     keys_to_clear = ['registration_phone_number', 'current_category_id',
                      'checkout_delivery_type', 'checkout_pickup_branch_id',
                      'checkout_latitude', 'checkout_longitude',
-                     'checkout_payment_type', 'checkout_notes']
+                     'checkout_payment_type', 'checkout_notes', 'checkout_address', 'checkout_idempotency_key']
     for key in keys_to_clear:
         if key in context.user_data:
             try:
@@ -4,7 +4,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
 from .branch import show_branch_list_menu
-from .order import show_order_history
+from .order import show_order_history, HISTORY_FIELDS
 from .profile import show_user_profile
 from .promotions import show_promotions_list
 from ..config import MAIN_MENU, SELECTING_LANG
@@ -60,7 +60,8 @@ async def main_menu_dispatch(update: Update, context: ContextTypes.DEFAULT_TYPE)
     elif message_text in ["📋 Buyurtmalarim", "📋 Мои заказы"]:
         loading_text = "Buyurtmalar tarixi yuklanmoqda..." if lang_code == 'uz' else "Загрузка истории заказов..."
         await update.message.reply_text(loading_text)
-        history_response = await make_api_request(context, 'GET', 'orders/history/', user_id)
+        history_response = await make_api_request(context, 'GET', 'orders/history/', user_id,
+                                                  params={'fields': HISTORY_FIELDS})
         if history_response and not history_response.get('error'):
             await show_order_history(update, context, history_response)  # <-- Yangi funksiyani chaqiramiz
         elif history_response and history_response.get('status_code') == 401:
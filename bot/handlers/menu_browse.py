@@ -6,7 +6,9 @@ from telegram.constants import ParseMode
 
 # Loyihadagi boshqa modullardan importlar
 from ..utils.helpers import get_user_lang
-from ..utils.api_client import make_api_request
+from ..utils.api_cache import cached_api_get
+from ..utils.photo_cache import send_cached_photo
+from ..utils.callback_data import encode_callback
 
 # Holatlar kerak bo'lishi mumkin (agar menyudan chiqilsa)
 # from ..config import MAIN_MENU
@@ -23,7 +25,7 @@ async def show_category_list(update: Update, context: ContextTypes.DEFAULT_TYPE)
     loading_text = "Kategoriyalar yuklanmoqda..." if lang_code == 'uz' else "Загрузка категорий..."
     sent_message = await context.bot.send_message(chat_id=chat_id, text=loading_text)
 
-    categories_response = await make_api_request(context, 'GET', 'categories/', user_id)  # Token shart emas bunga
+    categories_response = await cached_api_get(context, 'categories/', user_id)  # Token shart emas, keshdan
     final_text = ""
     final_markup = None
 
@@ -36,7 +38,7 @@ async def show_category_list(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 button_text = category.get('name', 'N/A')
                 # Agar nom juda uzun bo'lsa qisqartirish mumkin
                 # if len(button_text) > 20: button_text = button_text[:18] + "..."
-                button = InlineKeyboardButton(button_text, callback_data=f"cat_{category.get('id')}")
+                button = InlineKeyboardButton(button_text, callback_data=encode_callback('category', category.get('id')))
                 row.append(button)
                 # Agar qatorda 2 ta tugma bo'lsa YOKI bu oxirgi element bo'lsa
                 if len(row) == 2 or (i + 1) == len(categories):
@@ -75,8 +77,8 @@ async def show_product_list(update: Update, context: ContextTypes.DEFAULT_TYPE,
     loading_text = "Mahsulotlar ro'yxati yuklanmoqda..." if lang_code == 'uz' else "Загрузка списка продуктов..."
     sent_message = await context.bot.send_message(chat_id=chat_id, text=loading_text)
 
-    products_response = await make_api_request(context, 'GET', f'products/?category_id={category_id}',
-                                               user_id)  # Token shart emas
+    products_response = await cached_api_get(context, 'products/', user_id,
+                                             params={'category_id': category_id})  # Token shart emas, keshdan
 
     try:
         await context.bot.delete_message(chat_id=chat_id, message_id=sent_message.message_id)
@@ -96,7 +98,7 @@ async def show_product_list(update: Update, context: ContextTypes.DEFAULT_TYPE,
             for i, product in enumerate(products):
                 button_text = product.get('name', 'Nomsiz')
                 if len(button_text) > 25: button_text = button_text[:22] + "..."  # Uzun nomlarni qisqartirish
-                button = InlineKeyboardButton(button_text, callback_data=f"prod_{product.get('id')}")
+                button = InlineKeyboardButton(button_text, callback_data=encode_callback('product', product.get('id')))
                 product_buttons_row.append(button)
                 if len(product_buttons_row) == 2 or (i + 1) == len(products):
                     keyboard_list.append(product_buttons_row)
@@ -105,15 +107,15 @@ async def show_product_list(update: Update, context: ContextTypes.DEFAULT_TYPE,
             caption = "Bu kategoriyada mahsulotlar topilmadi." if lang_code == 'uz' else "В этой категории товары не найдены."
 
         back_button_text = "< Ortga" if lang_code == 'uz' else "< Назад"
-        keyboard_list.append([InlineKeyboardButton(back_button_text, callback_data="back_to_categories")])
+        keyboard_list.append([InlineKeyboardButton(back_button_text, callback_data=encode_callback('back_to_categories'))])
 
         reply_markup = InlineKeyboardMarkup(keyboard_list) if keyboard_list else None
         photo_url = category_image_url
 
         if photo_url:
             try:
-                await context.bot.send_photo(chat_id=chat_id, photo=photo_url, caption=caption,
-                                             reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+                await send_cached_photo(context, chat_id, photo_url, caption=caption,
+                                        reply_markup=reply_markup, parse_mode=ParseMode.HTML)
             except Exception as e:
                 logger.error(f"Failed to send category photo {photo_url}: {e}")
                 await context.bot.send_message(chat_id=chat_id, text=caption, reply_markup=reply_markup,
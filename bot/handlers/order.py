@@ -1,7 +1,8 @@
 # bot/handlers/order.py
+import html
 import logging
+import uuid
 import datetime  # <-- Sanani formatlash uchun (agar show_order_history'dan ko'chirsak)
-from urllib.parse import urlparse, parse_qs  # <-- URL parse uchun (agar show_order_history'dan ko'chirsak)
 
 from django.utils import timezone
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton, \
@@ -17,6 +18,7 @@ from ..config import ASKING_BRANCH, ASKING_LOCATION, MAIN_MENU, ASKING_DELIVERY_
 from ..keyboards import get_main_menu_markup
 from ..utils.helpers import get_user_lang
 from ..utils.api_client import make_api_request, reverse_geocode
+from ..utils.callback_data import encode_callback
 
 # Klaviaturani import qilish kerak bo'lishi mumkin (masalan, cancel tugmasi uchun)
 # from ..keyboards import ...
@@ -345,6 +347,10 @@ async def finalize_checkout(update: Update, context: ContextTypes.DEFAULT_TYPE)
         checkout_data['pickup_branch_id'] = branch_id
     # ------------------------------------------------------------
 
+    # Kalit start_checkout_callback'da yaratiladi: shu tasdiqlash qadami ikki marta bosilsa yoki so'rov takrorlansa
+    # server yangi buyurtma yaratmay, asl buyurtmani qaytaradi. Keyingi checkout yangi kalit oladi.
+    checkout_data['idempotency_key'] = context.user_data.setdefault('checkout_idempotency_key', uuid.uuid4().hex)
+
     logger.info(f"Final checkout data for user {user_id}: {checkout_data}")
     api_response = await make_api_request(context, 'POST', 'orders/checkout/', user_id, data=checkout_data)
 
@@ -359,7 +365,8 @@ async def finalize_checkout(update: Update, context: ContextTypes.DEFAULT_TYPE)
         except Exception:
             pass
 
-    if api_response and api_response.get('status_code') == 201 and not api_response.get('error'):
+    # 201 - yangi buyurtma, 200 - shu idempotency kaliti bilan avval yaratilgan buyurtma
+    if api_response and api_response.get('status_code') in (200, 201) and not api_response.get('error'):
         order_data = api_response  # Endi bu to'liq buyurtma ma'lumoti
         print(f"\n\n{order_data}\n\n")
         order_id = order_data.get('id')
@@ -383,7 +390,7 @@ async def finalize_checkout(update: Update, context: ContextTypes.DEFAULT_TYPE)
             if items:
                 final_message += "\nTarkibi:\n"
                 for item in items:
-                    prod_name = item.get('product', {}).get('name', '?')
+                    prod_name = item.get('product_name') or '?'
                     qty = item.get('quantity')
                     price = item.get('total_price')
                     final_message += f"- {prod_name} x {qty} ({price} so'm)\n"
@@ -428,7 +435,7 @@ async def finalize_checkout(update: Update, context: ContextTypes.DEFAULT_TYPE)
             if items:
                 final_message += "\nСостав:\n"
                 for item in items:
-                    prod_name = item.get('product', {}).get('name', '?')
+                    prod_name = item.get('product_name') or '?'
                     qty = item.get('quantity')
                     price = item.get('total_price')
                     final_message += f"- {prod_name} x {qty} ({price} сум)\n"
@@ -491,8 +498,10 @@ async def finalize_checkout(update: Update, context: ContextTypes.DEFAULT_TYPE)
     # -----------------------------
 
     # Checkout kontekstini tozalaymiz
+    # Kalit ham tozalanadi: suhbat tugadi, keyingi checkout boshqa savat bilan bo'ladi. Javobi yo'qolgan buyurtma
+    # yaratilgan bo'lsa, savat bo'shagan - yangi checkout takroriy buyurtma yarata olmaydi.
     keys_to_clear = ['checkout_delivery_type', 'checkout_pickup_branch_id', 'checkout_latitude', 'checkout_longitude',
-                     'checkout_payment_type', 'checkout_notes', 'checkout_address']
+                     'checkout_payment_type', 'checkout_notes', 'checkout_address', 'checkout_idempotency_key']
     for key in keys_to_clear:
         if key in context.user_data:
             try:
@@ -546,7 +555,7 @@ async def handle_location(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         logger.info(f"User {user_id} sent location: Lat {lat}, Lon {lon}")
 
         # --- REVERSE GEOCODING ---
-        address_text = await reverse_geocode(lat, lon)
+        address_text = await reverse_geocode(lat, lon, telegram_id=user_id)
         # -------------------------
 
         if address_text:
@@ -778,92 +787,63 @@ async def save_newly_confirmed_address(update: Update, context: ContextTypes.DEF
     return await prompt_for_payment(update, context)
 
 
-async def show_order_history(update: Update, context: ContextTypes.DEFAULT_TYPE, history_data: dict):
-    """API dan kelgan buyurtmalar tarixi ma'lumotlarini formatlab ko'rsatadi."""
-    user_id = update.effective_user.id
-    chat_id = update.effective_chat.id
-    lang_code = get_user_lang(context)
+HISTORY_FIELDS = 'id,status,total_price,summary,created_at'  # Tarix ro'yxati faqat shularni ko'rsatadi (?fields=)
 
-    orders = history_data.get('results', [])
-    count = history_data.get('count', 0)
-    next_page_url = history_data.get('next')
-    previous_page_url = history_data.get('previous')
 
-    message_to_edit = update.callback_query.message if update.callback_query else None
-
-    if count == 0:
-        history_empty_text = "Sizda hali buyurtmalar mavjud emas." if lang_code == 'uz' else "У вас пока нет заказов."
-        try:
-            if message_to_edit:
-                await update.callback_query.edit_message_text(history_empty_text, reply_markup=None)
-            elif update.message:
-                await update.message.reply_text(history_empty_text)
-        except Exception as e:
-            logger.warning(f"Could not edit/send empty history message: {e}")
-        return
+def build_order_history_view(history_data: dict, lang_code: str):
+    """Tarix sahifasi uchun (matn, klaviatura). Buyurtma bo'lmasa - (bo'sh tarix matni, None)."""
+    orders = history_data.get('results', [])
+    if not orders:
+        empty_text = "Sizda hali buyurtmalar mavjud emas." if lang_code == 'uz' else "У вас пока нет заказов."
+        return empty_text, None
 
-    message_text = "📋 **Buyurtmalar Tarixi:**\n\n" if lang_code == 'uz' else "📋 **История Заказов:**\n\n"
+    message_text = "📋 <b>Buyurtmalar Tarixi:</b>\n\n" if lang_code == 'uz' else "📋 <b>История Заказов:</b>\n\n"
     keyboard = []  # Inline tugmalar uchun
+    detail_button_text = "Batafsil" if lang_code == 'uz' else "Подробнее"
 
     for order in orders:
         order_id = order.get('id')
-        status = order.get('status', '')
-        # Statusni chiroyliroq chiqarish (agar kerak bo'lsa, alohida funksiya qilish mumkin)
-        status_display = status  # Hozircha kodini o'zini chiqaramiz
+        status_display = order.get('status', '').replace('_', ' ').capitalize()
         created_at = order.get('created_at', '')
-        # Sanani formatlash (agar kerak bo'lsa)
         try:  # Vaqtni formatlashga harakat qilamiz
-            dt_obj = datetime.datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-            formatted_date = dt_obj.strftime('%Y-%m-%d %H:%M')
-        except:
-            formatted_date = created_at[:10]  # Agar formatlash xato bo'lsa, faqat sanani olamiz
-
+            dt_obj = datetime.datetime.fromisoformat(str(created_at).replace('Z', '+00:00'))
+            formatted_date = timezone.localtime(dt_obj).strftime('%Y-%m-%d %H:%M')
+        except (TypeError, ValueError):
+            formatted_date = str(created_at)[:10]  # Agar formatlash xato bo'lsa, faqat sanani olamiz
         total = order.get('total_price', 'N/A')
 
-        message_text += f"🆔 {order_id} | {formatted_date} | {status_display} | {total} so'm\n"
-        # Har bir buyurtma uchun "Batafsil" tugmasi
-        detail_button_text = "Batafsil" if lang_code == 'uz' else "Подробнее"
-        keyboard.append([InlineKeyboardButton(f"{detail_button_text} ({order_id})", callback_data=f"order_{order_id}")])
+        message_text += f"🆔 {order_id} | {formatted_date} | <i>{status_display}</i> | {total} so'm\n"
+        if order.get('summary'):  # Eski (to'ldirilmagan) buyurtmalarda bo'sh bo'lishi mumkin
+            message_text += f"🧾 {html.escape(order['summary'])}\n"
         message_text += "---\n"
+        # Har bir buyurtma uchun "Batafsil" tugmasi
+        keyboard.append([InlineKeyboardButton(f"{detail_button_text} (#{order_id})", callback_data=encode_callback('order_detail', order_id))])
 
-    # Paginatsiya tugmalari
+    # Paginatsiya tugmalari: API qaytargan ixcham kursorlar to'g'ridan-to'g'ri callback_data'ga yoziladi
     pagination_row = []
-    if previous_page_url:
-        # URL dan page raqamini olishga harakat qilamiz (agar ?page=X bo'lsa)
-        try:
-            query_params = parse_qs(urlparse(previous_page_url).query)
-            prev_page = query_params.get('page', [None])[0]
-            if prev_page:
-                pagination_row.append(InlineKeyboardButton("⬅️ Oldingi", callback_data=f"hist_page_{prev_page}"))
-            else:  # Agar page topilmasa, to'liq URL ishlatamiz (xavfliroq)
-                pagination_row.append(
-                    InlineKeyboardButton("⬅️ Oldingi", callback_data=f"hist_page_url_{previous_page_url}"))
-        except:  # Agar URL parse qilishda xato bo'lsa
-            pagination_row.append(
-                InlineKeyboardButton("⬅️ Oldingi", callback_data=f"hist_page_url_{previous_page_url}"))
-
-    if next_page_url:
-        try:
-            query_params = parse_qs(urlparse(next_page_url).query)
-            next_page = query_params.get('page', [None])[0]
-            if next_page:
-                pagination_row.append(InlineKeyboardButton("Keyingi ➡️", callback_data=f"hist_page_{next_page}"))
-            else:
-                pagination_row.append(
-                    InlineKeyboardButton("Keyingi ➡️", callback_data=f"hist_page_url_{next_page_url}"))
-        except:
-            pagination_row.append(InlineKeyboardButton("Keyingi ➡️", callback_data=f"hist_page_url_{next_page_url}"))
-
+    if history_data.get('previous_cursor'):
+        pagination_row.append(InlineKeyboardButton(
+            "⬅️ Oldingi", callback_data=encode_callback('history_page', history_data['previous_cursor'])))
+    if history_data.get('next_cursor'):
+        pagination_row.append(InlineKeyboardButton(
+            "Keyingi ➡️", callback_data=encode_callback('history_page', history_data['next_cursor'])))
     if pagination_row:
         keyboard.append(pagination_row)
 
-    reply_markup = InlineKeyboardMarkup(keyboard) if keyboard else None
+    return message_text, InlineKeyboardMarkup(keyboard)
+
+
+async def show_order_history(update: Update, context: ContextTypes.DEFAULT_TYPE, history_data: dict):
+    """API dan kelgan buyurtmalar tarixi ma'lumotlarini formatlab ko'rsatadi."""
+    chat_id = update.effective_chat.id
+    lang_code = get_user_lang(context)
+    message_text, reply_markup = build_order_history_view(history_data, lang_code)
 
     # Xabarni yuborish yoki tahrirlash
     try:
-        if message_to_edit:
+        if update.callback_query:
             await update.callback_query.edit_message_text(text=message_text, reply_markup=reply_markup,
-                                                          parse_mode=ParseMode.HTML)  # Yoki MarkdownV2
+                                                          parse_mode=ParseMode.HTML)
         elif update.message:
             await update.message.reply_text(text=message_text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
     except Exception as e:
@@ -952,11 +932,11 @@ async def show_order_detail(update: Update, context: ContextTypes.DEFAULT_TYPE,
     # Agar status 'new' bo'lsa, bekor qilish tugmasini qo'shamiz
     if status == 'new':
         cancel_btn_text = "❌ Bekor qilish" if lang_code == 'uz' else "❌ Отменить заказ"
-        keyboard.append([InlineKeyboardButton(cancel_btn_text, callback_data=f"cancel_order_{order_id}")])
+        keyboard.append([InlineKeyboardButton(cancel_btn_text, callback_data=encode_callback('order_cancel', order_id))])
 
     # Ortga qaytish tugmasi
     back_btn_text = "< Ortga (Tarix)" if lang_code == 'uz' else "< Назад (История)"
-    keyboard.append([InlineKeyboardButton(back_btn_text, callback_data="back_to_history")])
+    keyboard.append([InlineKeyboardButton(back_btn_text, callback_data=encode_callback('back_to_history'))])
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     # Xabarni tahrirlaymiz
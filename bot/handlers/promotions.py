@@ -5,7 +5,8 @@ from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 
 from ..utils.helpers import get_user_lang
-from ..utils.api_client import make_api_request
+from ..utils.api_cache import cached_api_get
+from ..utils.photo_cache import send_cached_photo
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +23,7 @@ async def show_promotions_list(update: Update, context: ContextTypes.DEFAULT_TYP
     loading_text = "Aksiyalar yuklanmoqda..." if lang_code == 'uz' else "Загрузка акций..."
     await message.reply_text(loading_text)  # Foydalanuvchiga javob beramiz
 
-    promotions_response = await make_api_request(context, 'GET', 'promotions/', user_id)  # Token shart emas bunga
+    promotions_response = await cached_api_get(context, 'promotions/', user_id)  # Token shart emas, keshdan
 
     if promotions_response and not promotions_response.get('error'):
         promotions = promotions_response.get('results', [])
@@ -45,9 +46,10 @@ async def show_promotions_list(update: Update, context: ContextTypes.DEFAULT_TYP
 
                 if image_url:
                     try:
-                        await context.bot.send_photo(
-                            chat_id=chat_id,
-                            photo=image_url,
+                        await send_cached_photo(
+                            context,
+                            chat_id,
+                            image_url,
                             caption=message_text,
                             parse_mode=ParseMode.HTML
                             # TODO: Aksiya bilan bog'liq tugma qo'shish mumkin (masalan, "Batafsil" yoki "Mahsulotlarga o'tish")
@@ -10,7 +10,7 @@ from telegram.constants import ParseMode
 from ..config import SELECTING_LANG, AUTH_CHECK, WAITING_PHONE, MAIN_MENU, ASKING_DELIVERY_TYPE, \
     CHOOSING_PHONE_METHOD, WAITING_MANUAL_PHONE
 from ..keyboards import get_language_keyboard, get_registration_keyboard, get_phone_keyboard, get_main_menu_markup
-from ..utils.db_utils import get_user_session_data
+from ..utils.session_store import get_session_store
 from ..utils.helpers import get_user_lang, get_user_token_data, store_user_token_data, clear_user_token_data, \
     save_user_language_preference
 from ..utils.api_client import make_api_request, update_language_in_db_api
@@ -28,7 +28,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
 
     if not lang_code:
         logger.info(f"Language not in session for user {user_id}. Checking bot's DB.")
-        session_data_from_db = get_user_session_data(user_id)  # Bu sinxron SQLite chaqiruvi
+        session_data_from_db = await get_session_store().get(user_id)  # Keshdan yoki fon thread'ida DB dan
         if session_data_from_db and session_data_from_db.get('lang'):
             lang_code = session_data_from_db['lang']
             context.user_data['language_code'] = lang_code
@@ -1,6 +1,7 @@
 # bot/keyboards.py
 from telegram import ReplyKeyboardMarkup, InlineKeyboardMarkup, InlineKeyboardButton, KeyboardButton
 import logging
+from .utils.callback_data import encode_callback
 
 logger = logging.getLogger(__name__)
 
@@ -68,17 +69,18 @@ def get_phone_keyboard(lang_code: str) -> ReplyKeyboardMarkup:
 def get_product_detail_keyboard(product_id: int, category_id: int | None, quantity: int,
                                 lang_code: str) -> InlineKeyboardMarkup:
     """Mahsulot detallari sahifasi uchun inline klaviatura yaratadi."""
-    minus_button = InlineKeyboardButton("➖", callback_data=f"pdetail_decr_{product_id}")
+    minus_button = InlineKeyboardButton("➖", callback_data=encode_callback('product_qty', 'decr', product_id))
     # Miqdor tugmasi hozircha bosilmaydi, shunchaki ko'rsatadi
-    qty_button = InlineKeyboardButton(str(quantity), callback_data=f"pdetail_qty_{product_id}")
-    plus_button = InlineKeyboardButton("➕", callback_data=f"pdetail_incr_{product_id}")
+    qty_button = InlineKeyboardButton(str(quantity), callback_data=encode_callback('product_qty_info', product_id))
+    plus_button = InlineKeyboardButton("➕", callback_data=encode_callback('product_qty', 'incr', product_id))
 
     add_cart_button_text = "🛒 Savatga" if lang_code == 'uz' else "🛒 В корзину"
     # product_id ni add callbackiga ham qo'shamiz
-    add_cart_button = InlineKeyboardButton(add_cart_button_text, callback_data=f"pdetail_add_{product_id}")
+    add_cart_button = InlineKeyboardButton(add_cart_button_text, callback_data=encode_callback('product_add', product_id))
 
     back_button_text = "< Ortga" if lang_code == 'uz' else "< Назад"
-    back_button_callback = f"back_to_prod_list_{category_id}" if category_id else "back_to_categories"
+    back_button_callback = (encode_callback('back_to_products', category_id) if category_id
+                            else encode_callback('back_to_categories'))
     back_button = InlineKeyboardButton(back_button_text, callback_data=back_button_callback)
 
     keyboard = [
@@ -0,0 +1,139 @@
+# bot/tests.py
+import os
+import time
+import asyncio
+import tempfile
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+# bot.config tokensiz import qilinmaydi; testlar Telegram'ga so'rov yubormaydi
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', 'test-token')
+
+from .bench_callback_dispatch import LEGACY_HANDLERS, SAMPLE_ARGS  # noqa: E402
+from .utils.callback_data import (ROUTES, MAX_CALLBACK_DATA_BYTES, callback_route, decode_callback,  # noqa: E402
+                                  encode_callback)
+from .utils.geocode import GeocodeCacheStorage, ReverseGeocoder, StubGeocoder, TokenBucket, geohash  # noqa: E402
+
+
+# --- Inline tugmalar callback_data ---
+class CallbackDataTests(TestCase):
+    def test_compact_form_round_trips(self):
+        for route in ROUTES:
+            args = SAMPLE_ARGS.get(route.name, ())
+            self.assertEqual(decode_callback(encode_callback(route.name, *args)), (route.name, args))
+
+    def test_legacy_data_decodes_like_compact_form(self):
+        for _pattern, legacy_data in LEGACY_HANDLERS:
+            decoded = decode_callback(legacy_data)
+            self.assertIsNotNone(decoded, legacy_data)
+            compact = encode_callback(decoded.route, *SAMPLE_ARGS.get(decoded.route, ()))
+            self.assertEqual(decoded, decode_callback(compact), legacy_data)
+        self.assertEqual(decode_callback('pdetail_qty_7'), ('product_qty_info', (7,)))
+        self.assertEqual(decode_callback('back_to_prod_list_12'), ('back_to_products', (12,)))
+        self.assertEqual(decode_callback('hist_page_url_http://x'), ('history_page', ('url_http://x',)))
+
+    def test_bad_args_are_rejected(self):
+        for data in ('c:abc', 'c:', 'c', 'c:1:2', 'bh:1', 'pq:up:5', 'cq:incr', 'cat_x', 'zz:1', '', 'cart_refresh_1'):
+            self.assertIsNone(decode_callback(data), data)
+        self.assertIsNone(callback_route(None))
+        self.assertEqual(callback_route('cr'), 'cart_refresh')
+
+    def test_encode_validates_arity_and_size(self):
+        with self.assertRaises(ValueError):
+            encode_callback('category')
+        with self.assertRaises(ValueError):
+            encode_callback('history_page', 'x' * MAX_CALLBACK_DATA_BYTES)
+        fits = encode_callback('history_page', 'x' * (MAX_CALLBACK_DATA_BYTES - len('h:')))
+        self.assertEqual(len(fits.encode()), MAX_CALLBACK_DATA_BYTES)
+
+
+# --- Limiter ---
+class TokenBucketTests(IsolatedAsyncioTestCase):
+    async def test_burst_then_refuses_when_wait_exceeds_limit(self):
+        bucket = TokenBucket(rate=1.0)
+        self.assertTrue(await bucket.acquire(max_wait=0))
+        self.assertFalse(await bucket.acquire(max_wait=0.5))
+
+    async def test_waits_for_next_token(self):
+        bucket = TokenBucket(rate=20.0)
+        self.assertTrue(await bucket.acquire(max_wait=0))
+        started = time.monotonic()
+        self.assertTrue(await bucket.acquire(max_wait=1))
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+
+
+# --- Doimiy kesh ---
+class GeocodeCacheStorageTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'geocode.sqlite')
+
+    def _storage(self, **kwargs) -> GeocodeCacheStorage:
+        storage = GeocodeCacheStorage(self.path, **kwargs)
+        storage.init()
+        self.addCleanup(storage.close)
+        return storage
+
+    def test_expired_entries_are_misses(self):
+        storage = self._storage(ttl=60)
+        storage.put('cell', 'Manzil')
+        self.assertEqual(storage.get('cell'), 'Manzil')
+        storage.conn.execute("UPDATE geocode_cache SET created_at = created_at - 120")
+        self.assertIsNone(storage.get('cell'))
+
+    def test_evict_keeps_recently_used(self):
+        storage = self._storage(max_entries=2)
+        for cell in ('a', 'b', 'c'):
+            storage.put(cell, cell.upper())
+        storage.conn.execute("UPDATE geocode_cache SET last_used = 1 WHERE cell = 'b'")
+        storage.evict()
+        self.assertEqual((storage.get('a'), storage.get('b'), storage.get('c')), ('A', None, 'C'))
+
+
+# --- ReverseGeocoder ---
+class ReverseGeocoderTests(IsolatedAsyncioTestCase):
+    LAT, LON = 41.311081, 69.240562
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'geocode.sqlite')
+
+    async def _geocoder(self, upstream, **kwargs) -> ReverseGeocoder:
+        kwargs.setdefault('rate', 1000.0)
+        geocoder = ReverseGeocoder(upstream, storage=GeocodeCacheStorage(self.path), snap_meters=0, **kwargs)
+        self.addAsyncCleanup(geocoder.close)
+        return geocoder
+
+    async def test_same_cell_is_served_from_memory(self):
+        upstream = StubGeocoder()
+        geocoder = await self._geocoder(upstream)
+        first = await geocoder.reverse(self.LAT, self.LON)
+        # Shu katak ichidagi boshqa nuqta
+        self.assertEqual(geohash(self.LAT + 0.00001, self.LON), geohash(self.LAT, self.LON))
+        self.assertEqual(await geocoder.reverse(self.LAT + 0.00001, self.LON), first)
+        self.assertEqual(upstream.calls, 1)
+        self.assertEqual((geocoder.stats['upstream'], geocoder.stats['memory']), (1, 1))
+
+    async def test_disk_cache_survives_restart(self):
+        first = await (await self._geocoder(StubGeocoder())).reverse(self.LAT, self.LON)
+        upstream = StubGeocoder()
+        geocoder = await self._geocoder(upstream)
+        self.assertEqual(await geocoder.reverse(self.LAT, self.LON), first)
+        self.assertEqual(upstream.calls, 0)
+        self.assertEqual(geocoder.stats['disk'], 1)
+
+    async def test_concurrent_requests_for_one_cell_share_upstream_call(self):
+        upstream = StubGeocoder(delay=0.05)
+        geocoder = await self._geocoder(upstream)
+        results = await asyncio.gather(*(geocoder.reverse(self.LAT, self.LON) for _ in range(5)))
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(upstream.calls, 1)
+
+    async def test_rate_limited_lookup_returns_none(self):
+        upstream = StubGeocoder()
+        geocoder = await self._geocoder(upstream, rate=0.01, max_wait=0)
+        self.assertIsNotNone(await geocoder.reverse(self.LAT, self.LON))
+        with self.assertLogs('bot.utils.geocode', level='WARNING'):
+            self.assertIsNone(await geocoder.reverse(self.LAT + 1, self.LON + 1))
+        self.assertEqual((upstream.calls, geocoder.stats['rate_limited']), (1, 1))
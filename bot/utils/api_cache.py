@@ -0,0 +1,236 @@
+# bot/utils/api_cache.py
+import time
+import select
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+import httpx
+from telegram.ext import ContextTypes
+
+from ..config import BOT_API_CACHE_TTL, BOT_API_CACHE_STALE, BOT_API_CACHE_SIZE, BOT_BRANCH_CACHE_TTL, \
+    BOT_API_TRANSPORT
+from . import api_client as api_module
+from .helpers import get_user_lang
+
+logger = logging.getLogger(__name__)
+
+BOT_CACHE_CHANNEL = 'bot_cache_invalidate'  # api/catalog_cache.py dagi kanal bilan bir xil
+
+
+class CacheEntry:
+    __slots__ = ('data', 'etag', 'fetched_at', 'ttl')
+
+    def __init__(self, data: dict, etag: str | None, ttl: float):
+        self.data = data
+        self.etag = etag
+        self.fetched_at = time.monotonic()
+        self.ttl = ttl
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+
+class PublicApiCache:
+    """
+    Hamma foydalanuvchi uchun bir xil bo'lgan (faqat tilga bog'liq) GET javoblari uchun kesh.
+    - TTL ichida: javob xotiradan, API'ga so'rov yo'q.
+    - TTL o'tgan, lekin 'stale' oynasi ichida: eski javob darhol qaytariladi, fonda yangilanadi.
+    - Undan eski yoki yo'q: API'dan olinadi; bir vaqtdagi bir xil so'rovlar bitta chaqiruvni kutadi.
+    Yangilashda ETag (If-None-Match) yuboriladi: o'zgarmagan bo'lsa API 304 qaytaradi.
+    """
+
+    def __init__(self, max_entries: int = BOT_API_CACHE_SIZE, stale: float = BOT_API_CACHE_STALE):
+        self.max_entries = max_entries
+        self.stale = stale
+        self._entries = OrderedDict()  # (scope, endpoint, lang) -> CacheEntry
+        self._inflight = {}  # key -> asyncio.Task
+        self.hits = self.misses = self.stale_hits = 0
+
+    # --- Invalidatsiya ---
+    def invalidate(self, scope: str | None = None) -> int:
+        """scope=None - hammasi. Yozuvlar o'chiriladi, keyingi so'rov API'dan oladi."""
+        keys = [key for key in self._entries if scope is None or key[0] == scope]
+        for key in keys:
+            del self._entries[key]
+        if keys:
+            logger.info(f"Bot API cache: invalidated {len(keys)} entries (scope={scope or 'all'}).")
+        return len(keys)
+
+    # --- O'qish ---
+    async def get(self, scope: str, endpoint: str, lang: str, ttl: float) -> dict:
+        key = (scope, endpoint, lang)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            age = entry.age()
+            if age < entry.ttl:
+                self.hits += 1
+                return dict(entry.data)
+            if age < entry.ttl + self.stale:
+                self.stale_hits += 1
+                self._start_fetch(key, ttl)  # Fonda yangilaymiz
+                return dict(entry.data)
+
+        self.misses += 1
+        return dict(await asyncio.shield(self._start_fetch(key, ttl)))
+
+    def _start_fetch(self, key, ttl: float) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, ttl))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        return task
+
+    async def _fetch(self, key, ttl: float) -> dict:
+        scope, endpoint, lang = key
+        entry = self._entries.get(key)
+        headers = {"Accept": "application/json", "Accept-Language": lang}
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        try:
+            response = await api_module.api_client.get(endpoint, headers=headers)
+        except httpx.RequestError as e:
+            logger.error(f"Bot API cache: network error for {endpoint}: {e}")
+            if entry is not None:
+                return entry.data  # Server javob bermasa, eskirgan bo'lsa ham bor ma'lumotni beramiz
+            return {"error": "Network Error", "detail": "Server bilan bog'lanib bo'lmadi.", "status_code": 503}
+
+        if response.status_code == 304 and entry is not None:
+            entry.fetched_at = time.monotonic()  # O'zgarmagan: faqat muddatni yangilaymiz
+            return entry.data
+
+        if response.status_code != 200:
+            logger.error(f"Bot API cache: {endpoint} returned {response.status_code}")
+            if entry is not None and response.status_code >= 500:
+                return entry.data
+            try:
+                error_data = response.json()
+            except ValueError:
+                error_data = {"detail": response.text}
+            return {"error": f"API Error {response.status_code}",
+                    "detail": error_data.get('detail', error_data.get('error', response.text)),
+                    "status_code": response.status_code}
+
+        data = response.json()
+        data['status_code'] = response.status_code
+        self._entries[key] = CacheEntry(data, response.headers.get('ETag'), ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return data
+
+
+# --- PostgreSQL NOTIFY orqali invalidatsiya ---
+class CacheInvalidationListener:
+    """
+    Backend katalog/filial/aksiya o'zgarganda pg_notify yuboradi; bu listener alohida thread'da
+    LISTEN qiladi va bot event loop'ida keshni tozalaydi. Faqat PostgreSQL'da ishlaydi.
+    """
+
+    def __init__(self, api_cache: PublicApiCache, loop: asyncio.AbstractEventLoop):
+        self.api_cache = api_cache
+        self.loop = loop
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> bool:
+        from django.db import connection
+        if connection.vendor != 'postgresql':
+            logger.info("Bot API cache: database is not PostgreSQL, push invalidation disabled (TTL only).")
+            return False
+        self._thread = threading.Thread(target=self._run, name='bot-cache-listener', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _connect(self):
+        import psycopg2
+        from django.conf import settings
+        db = settings.DATABASES['default']
+        conn = psycopg2.connect(dbname=db['NAME'], user=db['USER'], password=db['PASSWORD'],
+                                host=db['HOST'], port=db['PORT'])
+        conn.set_session(autocommit=True)
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {BOT_CACHE_CHANNEL}")
+        return conn
+
+    def _invalidate(self, scope: str | None) -> None:
+        if BOT_API_TRANSPORT == 'inprocess':
+            # Qayta so'rov shu jarayondagi view'ga boradi: uning (lokal) Django keshidagi versiyalar ham eskiradi,
+            # aks holda bot keshi tozalansa ham view eski snapshotni qaytaradi
+            from api.catalog_cache import drop_local_versions
+            drop_local_versions(scope)
+        self.loop.call_soon_threadsafe(self.api_cache.invalidate, scope)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                # Ulanish uzilgan paytdagi o'zgarishlarni o'tkazib yubormaslik uchun hammasini tozalaymiz
+                self._invalidate(None)
+                logger.info(f"Bot API cache: listening on '{BOT_CACHE_CHANNEL}'.")
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 5.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._invalidate(conn.notifies.pop(0).payload or None)
+            except Exception as e:
+                logger.error(f"Bot API cache listener error: {e}. Reconnecting in 5s.")
+                self._stop.wait(5.0)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+
+# --- Jarayon bo'yicha yagona kesh ---
+public_api_cache = PublicApiCache()
+_listener = None
+
+# endpoint prefiksi -> (scope, TTL)
+CACHEABLE_ENDPOINTS = (
+    ('categories/', 'catalog', BOT_API_CACHE_TTL),
+    ('products/', 'catalog', BOT_API_CACHE_TTL),
+    ('promotions/', 'promotions', BOT_API_CACHE_TTL),
+    ('branches/', 'branches', BOT_BRANCH_CACHE_TTL),  # is_open vaqtga bog'liq: qisqa TTL
+)
+
+
+async def cached_api_get(context: ContextTypes.DEFAULT_TYPE, endpoint: str, user_id: int,
+                         params: dict = None) -> dict | None:
+    """
+    Ommaviy (token talab qilmaydigan) GET so'rovlar uchun make_api_request o'rniga.
+    Javob formati make_api_request bilan bir xil. Keshlanmaydigan endpoint to'g'ridan-to'g'ri API'ga ketadi.
+    """
+    for prefix, scope, ttl in CACHEABLE_ENDPOINTS:
+        if endpoint.startswith(prefix):
+            break
+    else:
+        return await api_module.make_api_request(context, 'GET', endpoint, user_id, params=params)
+
+    if params:
+        endpoint = f"{endpoint}{'&' if '?' in endpoint else '?'}{urlencode(sorted(params.items()))}"
+    return await public_api_cache.get(scope, endpoint, get_user_lang(context), ttl)
+
+
+async def start_api_cache_listener(application=None) -> None:
+    """Application.post_init uchun."""
+    global _listener
+    if _listener is None:
+        _listener = CacheInvalidationListener(public_api_cache, asyncio.get_running_loop())
+        if not _listener.start():
+            _listener = None
+
+
+async def stop_api_cache_listener(application=None) -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
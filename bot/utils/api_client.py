@@ -1,17 +1,106 @@
 # bot/utils/api_client.py
 import httpx
 import time
+import base64
+import asyncio
 import logging
 import json
+from collections import namedtuple
+from functools import lru_cache
 from telegram.ext import ContextTypes
-from ..config import API_BASE_URL  # Konfiguratsiyadan URL ni olamiz
+from ..config import BOT_TOKEN_REFRESH_MARGIN
 from .helpers import get_user_lang, get_user_token_data, clear_user_token_data, \
     store_user_token_data  # Yordamchilarni import qilamiz
+from .transports import build_api_transport
+from .http_clients import close_all_clients
+from .geocode import get_reverse_geocoder
 
 logger = logging.getLogger(__name__)
 
-# API Klienti (global yoki class ichida bo'lishi mumkin)
-api_client = httpx.AsyncClient(base_url=API_BASE_URL, timeout=20.0)
+# API Klienti: httpx (alohida API server) yoki in-process transport (BOT_API_TRANSPORT)
+api_client = build_api_transport()
+
+# --- Token yangilash (single-flight) ---
+# tokens - {'access', 'refresh'} yoki None; permanent - refresh token yaroqsiz (qayta login kerak)
+RefreshOutcome = namedtuple('RefreshOutcome', ['tokens', 'permanent'])
+_refresh_inflight = {}  # user_id -> asyncio.Task (bir foydalanuvchi uchun bir vaqtda bitta refresh)
+
+
+@lru_cache(maxsize=4096)
+def get_token_expiry(access_token: str) -> float | None:
+    """JWT 'exp' qiymati (imzoni tekshirmasdan, faqat yangilash vaqtini bilish uchun)."""
+    try:
+        payload = access_token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def token_expires_soon(access_token: str, margin: float = BOT_TOKEN_REFRESH_MARGIN) -> bool:
+    expiry = get_token_expiry(access_token)
+    return expiry is not None and expiry - time.time() < margin
+
+
+async def _refresh_tokens(context: ContextTypes.DEFAULT_TYPE, user_id: int, refresh_token: str) -> RefreshOutcome:
+    logger.info(f"Requesting new access token for user {user_id} using refresh token.")
+    try:
+        # Token refresh uchun alohida, autentifikatsiyasiz so'rov
+        token_refresh_response = await api_client.post(
+            "auth/token/refresh/",  # API_BASE_URL ga nisbatan
+            json={'refresh': refresh_token},
+            headers={"Content-Type": "application/json", "Accept": "application/json"}
+        )
+    except httpx.RequestError as e:
+        logger.error(f"Network error during token refresh for user {user_id}: {e}")
+        return RefreshOutcome(None, False)
+
+    if token_refresh_response.status_code in (400, 401):
+        # Refresh token muddati tugagan yoki bekor qilingan: qayta login kerak
+        logger.error(f"Refresh token rejected for user {user_id}. Status: {token_refresh_response.status_code}. "
+                     f"Response: {token_refresh_response.text}")
+        await clear_user_token_data(context, user_id)
+        return RefreshOutcome(None, True)
+    if token_refresh_response.status_code != 200:
+        logger.error(f"Token refresh failed for user {user_id}. Status: {token_refresh_response.status_code}.")
+        return RefreshOutcome(None, False)
+
+    try:
+        new_token_data = token_refresh_response.json()
+    except json.JSONDecodeError:
+        new_token_data = {}
+    new_access_token = new_token_data.get('access')
+    if not new_access_token:
+        logger.warning(f"Token refresh response did not contain new access token for user {user_id}.")
+        return RefreshOutcome(None, False)
+
+    # Server yangi refresh token bersa (ROTATE_REFRESH_TOKENS), uni saqlaymiz
+    new_refresh_token = new_token_data.get('refresh', refresh_token)
+    await store_user_token_data(context, user_id, new_access_token, new_refresh_token)
+    logger.info(f"Token refreshed successfully for user {user_id}.")
+    return RefreshOutcome({'access': new_access_token, 'refresh': new_refresh_token}, False)
+
+
+async def refresh_user_tokens(context: ContextTypes.DEFAULT_TYPE, user_id: int, stale_access: str) -> RefreshOutcome:
+    """
+    Foydalanuvchi tokenini yangilaydi. Bir vaqtda kelgan so'rovlar bitta refresh natijasini kutadi;
+    token allaqachon boshqa so'rov tomonidan yangilangan bo'lsa, API'ga umuman murojaat qilinmaydi.
+    """
+    task = _refresh_inflight.get(user_id)
+    if task is None:
+        token_data = await get_user_token_data(context, user_id)
+        if not token_data or not token_data.get('refresh'):
+            logger.warning(f"No refresh token found for user {user_id} to attempt refresh.")
+            return RefreshOutcome(None, True)
+        if token_data['access'] != stale_access and not token_expires_soon(token_data['access']):
+            return RefreshOutcome(token_data, False)  # Parallel so'rov allaqachon yangilagan
+        task = _refresh_inflight.get(user_id)  # get_user_token_data kutilayotganda boshlangan bo'lishi mumkin
+        if task is None:
+            task = asyncio.create_task(_refresh_tokens(context, user_id, token_data['refresh']))
+            _refresh_inflight[user_id] = task
+            task.add_done_callback(lambda _t: _refresh_inflight.pop(user_id, None))
+    # shield: kutayotgan handler bekor qilinsa ham umumiy refresh to'xtamaydi
+    return await asyncio.shield(task)
 
 
 async def make_api_request(
@@ -33,6 +122,11 @@ async def make_api_request(
 
     current_access_token = None
     if token_data and token_data.get('access'):
+        if not is_retry and token_expires_soon(token_data['access']):
+            # 401 -> refresh -> qayta so'rov aylanishining oldini olamiz: muddati tugashidan oldin yangilaymiz
+            outcome = await refresh_user_tokens(context, user_id, token_data['access'])
+            if outcome.tokens:
+                token_data = outcome.tokens
         current_access_token = token_data['access']
         headers["Authorization"] = f"Bearer {current_access_token}"
 
@@ -68,45 +162,17 @@ async def make_api_request(
         # --- TOKEN YANGILASH LOGIKASI ---
         if status_code == 401 and current_access_token and not is_retry:
             logger.info(f"Access token for user {user_id} likely expired. Attempting refresh.")
-            refresh_token = token_data.get('refresh')
-            if refresh_token:
-                try:
-                    refresh_payload = {'refresh': refresh_token}
-                    logger.info(f"Requesting new access token for user {user_id} using refresh token.")
-                    # Token refresh uchun alohida, autentifikatsiyasiz so'rov
-                    # api_client.base_url to'g'ri sozlangani muhim (http://127.0.0.1:8000/api/v1/)
-                    refresh_api_endpoint = "auth/token/refresh/"  # API_BASE_URL ga nisbatan
-                    token_refresh_response = await api_client.post(
-                        refresh_api_endpoint,
-                        json=refresh_payload,
-                        headers={"Content-Type": "application/json", "Accept": "application/json"}
-                    )
-                    token_refresh_response.raise_for_status()  # Refresh xatosini ushlaymiz
-                    new_token_data = token_refresh_response.json()
-                    new_access_token = new_token_data.get('access')
-
-                    if new_access_token:
-                        logger.info(f"Token refreshed successfully for user {user_id}.")
-                        # Yangi access token va eski refresh tokenni saqlaymiz
-                        # (simplejwt odatda refreshni o'zgartirmaydi, lekin yangisini bersa uni ham saqlash kerak)
-                        new_refresh_token = new_token_data.get('refresh', refresh_token)  # Agar yangi refresh kelsa
-                        await store_user_token_data(context, user_id, new_access_token, new_refresh_token)
-
-                        logger.info(f"Retrying original request to {endpoint} for user {user_id} with new token.")
-                        # Asl so'rovni YANGI token bilan va is_retry=True qilib qayta chaqiramiz
-                        return await make_api_request(context, method, endpoint, user_id, data, params, is_retry=True)
-                    else:
-                        logger.warning(f"Token refresh response did not contain new access token for user {user_id}.")
-                except httpx.HTTPStatusError as refresh_err:
-                    logger.error(
-                        f"Failed to refresh token for user {user_id}. Status: {refresh_err.response.status_code}. Response: {refresh_err.response.text}")
-                except Exception as refresh_e:
-                    logger.error(f"Exception during token refresh for user {user_id}: {refresh_e}", exc_info=True)
-            else:
-                logger.warning(f"No refresh token found for user {user_id} to attempt refresh.")
-
-            # Agar refresh muvaffaqiyatsiz bo'lsa yoki refresh token bo'lmasa, tokenni tozalab, xato qaytaramiz
-            await clear_user_token_data(context, user_id)
+            outcome = await refresh_user_tokens(context, user_id, current_access_token)
+            if outcome.tokens:
+                logger.info(f"Retrying original request to {endpoint} for user {user_id} with new token.")
+                # Asl so'rovni YANGI token bilan va is_retry=True qilib qayta chaqiramiz
+                return await make_api_request(context, method, endpoint, user_id, data, params, is_retry=True)
+            if not outcome.permanent:
+                # Vaqtinchalik xato (tarmoq/server): tokenlarni o'chirmaymiz, keyingi so'rov qayta urinadi
+                return {"error": "Token Refresh Unavailable", "detail": "Server bilan bog'lanib bo'lmadi.",
+                        "status_code": 503}
+
+            # Refresh token yaroqsiz (tokenlar refresh ichida bir marta tozalangan) - qayta login kerak
             error_message = "Sessiya muddati tugadi. Iltimos, /start bosing." if lang_code == 'uz' else "Сессия истекла. Пожалуйста, нажмите /start."
             return {"error": "Unauthorized - Refresh Failed", "detail": error_message, "status_code": status_code}
         # --- TOKEN YANGILASH LOGIKASI TUGADI ---
@@ -149,66 +215,18 @@ async def update_language_in_db_api(context: ContextTypes.DEFAULT_TYPE, user_id:
         return False
 
 
-async def close_api_client():
-    """HTTPX klientni yopadi."""
+async def close_api_client(application=None):
+    """Application.post_shutdown uchun: API transporti va barcha HTTP klientlar yopiladi."""
     await api_client.aclose()
-
-
-async def reverse_geocode(latitude: float, longitude: float) -> str | None:
-    """Berilgan koordinatalar uchun Nominatim orqali manzilni olishga harakat qiladi."""
-    # Nominatim API endpoint
-    nominatim_url = "https://nominatim.openstreetmap.org/reverse"
-    params = {
-        'format': 'json',
-        'lat': str(latitude),
-        'lon': str(longitude),
-        'accept-language': 'uz,ru',  # Qaysi tillarda natija kerakligi
-        'addressdetails': '1'  # Batafsilroq ma'lumot olish uchun
-    }
-    headers = {
-        'User-Agent': 'TelegramFoodOrderBot/1.0 (dev)'  # Nominatim siyosati uchun
-    }
-    try:
-        # httpx.AsyncClient() ni har safar yaratmasdan, global api_client'ni ishlatamiz
-        # Lekin Nominatim uchun alohida klient yoki oddiy requests ham ishlatish mumkin.
-        # Hozircha yangi vaqtinchalik klient yaratamiz, chunki base_url boshqacha.
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(nominatim_url, params=params, headers=headers)
-        response.raise_for_status()  # HTTP xatolik bo'lsa
-        data = response.json()
-
-        # display_name odatda to'liq manzilni beradi
-        address_text = data.get('display_name')
-        if address_text:
-            logger.info(f"Reverse geocoded for ({latitude},{longitude}): {address_text}")
-            return address_text
-        else:
-            # Agar display_name bo'lmasa, address obyektidan yig'ishga harakat qilamiz
-            # Bu qism Nominatim javobiga qarab moslashtirilishi kerak
-            addr_parts = data.get('address', {})
-            road = addr_parts.get('road', '')
-            house_number = addr_parts.get('house_number', '')
-            suburb = addr_parts.get('suburb', addr_parts.get('borough', addr_parts.get('neighbourhood', '')))
-            city_district = addr_parts.get('city_district', '')
-            city = addr_parts.get('city', addr_parts.get('town', addr_parts.get('village', '')))
-
-            parts_list = [p for p in [house_number, road, suburb, city_district, city] if p]
-            if parts_list:
-                address_text = ", ".join(parts_list)
-                logger.info(f"Reverse geocoded (parts) for ({latitude},{longitude}): {address_text}")
-                return address_text
-            else:
-                logger.warning(
-                    f"Could not extract meaningful address from Nominatim for ({latitude},{longitude}). Response: {data}")
-                return None
-
-    except httpx.HTTPStatusError as e:
-        logger.error(
-            f"Nominatim API HTTP error for ({latitude},{longitude}): {e.response.status_code} - {e.response.text}")
-        return None
-    except httpx.RequestError as e:
-        logger.error(f"Nominatim API Request error for ({latitude},{longitude}): {e}")
-        return None
-    except Exception as e:
-        logger.error(f"Unexpected error during reverse_geocode for ({latitude},{longitude}): {e}", exc_info=True)
-        return None
+    await close_all_clients()
+
+
+async def reverse_geocode(latitude: float, longitude: float, telegram_id: int | None = None) -> str | None:
+    """
+    Koordinatalar uchun matnli manzil: foydalanuvchining yaqin saqlangan manzili, geohash kesh
+    yoki (limiter orqali) Nominatim. Batafsil: utils/geocode.py
+    """
+    address_text = await get_reverse_geocoder().reverse(latitude, longitude, telegram_id)
+    if address_text:
+        logger.info(f"Reverse geocoded for ({latitude},{longitude}): {address_text}")
+    return address_text
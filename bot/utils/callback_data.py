@@ -0,0 +1,133 @@
+# bot/utils/callback_data.py
+"""
+Inline tugmalar uchun ixcham callback_data va yagona marshrutlovchi (CallbackRouter).
+
+Format: "<kod>:<arg1>:<arg2>", masalan "c:12" (kategoriya 12), "cq:incr:5" (savatdagi 5-qator +1).
+Marshrut kod bo'yicha lug'atdan topiladi va argumentlar turlariga o'giriladi: har bir callback uchun
+narx tugma turlari soniga bog'liq emas. Natija handlerga context.args orqali beriladi (CommandHandler kabi).
+Eski xabarlardagi "cat_12" kabi tugmalar bitta oldindan kompilyatsiya qilingan regex bilan taniladi.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from telegram import Update
+from telegram.ext import BaseHandler
+
+SEPARATOR = ':'
+# Telegram callback_data chegarasi (bayt)
+MAX_CALLBACK_DATA_BYTES = 64
+
+# name - handler bilan bog'lash uchun nom, code - callback_data'dagi qisqa kod,
+# arg_types - argumentlarni o'giruvchi funksiyalar, legacy - eski formatdagi tugmalar uchun regex (guruhlar = argumentlar)
+CallbackRoute = namedtuple('CallbackRoute', ['name', 'code', 'arg_types', 'legacy'])
+DecodedCallback = namedtuple('DecodedCallback', ['route', 'args'])
+
+
+def _action(value: str) -> str:
+    if value not in ('incr', 'decr'):
+        raise ValueError(f"Unknown quantity action: {value}")
+    return value
+
+
+ROUTES = (
+    CallbackRoute('category', 'c', (int,), r'cat_(\d+)'),
+    CallbackRoute('product', 'p', (int,), r'prod_(\d+)'),
+    CallbackRoute('product_qty', 'pq', (_action, int), r'pdetail_(incr|decr)_(\d+)'),
+    CallbackRoute('product_qty_info', 'pn', (int,), r'pdetail_(?:qtyinfo|qty)_(\d+)'),
+    CallbackRoute('product_add', 'pa', (int,), r'pdetail_add_(\d+)'),
+    CallbackRoute('back_to_history', 'bh', (), r'back_to_history'),
+    CallbackRoute('back_to_categories', 'bc', (), r'back_to_categories'),
+    CallbackRoute('back_to_products', 'bp', (int,), r'back_to_prod_list_(\d+)'),
+    CallbackRoute('cart_qty', 'cq', (_action, int), r'cart_(incr|decr)_(\d+)'),
+    CallbackRoute('cart_delete', 'cd', (int,), r'cart_del_(\d+)'),
+    CallbackRoute('cart_info', 'ci', (int,), r'cart_info_(\d+)'),
+    CallbackRoute('cart_refresh', 'cr', (), r'cart_refresh'),
+    CallbackRoute('order_detail', 'o', (int,), r'order_(\d+)'),
+    CallbackRoute('order_cancel', 'oc', (int,), r'cancel_order_(\d+)'),
+    CallbackRoute('history_page', 'h', (str,), r'hist_page_(.*)'),
+    CallbackRoute('branch_location', 'bl', (int,), r'branch_loc_(\d+)'),
+)
+_ROUTES_BY_NAME = {route.name: route for route in ROUTES}
+_ROUTES_BY_CODE = {route.code: route for route in ROUTES}
+# Eski formatlar uchun bitta regex: qaysi marshrut ekanligi tashqi nomlangan guruhdan (lastgroup) aniqlanadi
+_LEGACY_PATTERN = re.compile('|'.join(f"(?P<r{i}>{route.legacy})" for i, route in enumerate(ROUTES)))
+_LEGACY_ROUTES = {f"r{i}": (route, re.compile(route.legacy)) for i, route in enumerate(ROUTES)}
+
+
+def encode_callback(name: str, *args) -> str:
+    """Marshrut nomi va argumentlardan callback_data (masalan encode_callback('category', 12) -> 'c:12')."""
+    route = _ROUTES_BY_NAME[name]
+    if len(args) != len(route.arg_types):
+        raise ValueError(f"Callback '{name}' expects {len(route.arg_types)} args, got {len(args)}")
+    data = SEPARATOR.join((route.code, *map(str, args)))
+    if len(data.encode()) > MAX_CALLBACK_DATA_BYTES:
+        raise ValueError(f"Callback data too long for '{name}': {data}")
+    return data
+
+
+def _convert(route: CallbackRoute, raw_args) -> DecodedCallback | None:
+    try:
+        return DecodedCallback(route.name, tuple(convert(value) for convert, value in zip(route.arg_types, raw_args)))
+    except (TypeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=4096)
+def decode_callback(data: str) -> DecodedCallback | None:
+    """callback_data -> (marshrut nomi, turlangan argumentlar). Tanilmasa yoki argumentlar noto'g'ri bo'lsa None."""
+    code, separator, payload = data.partition(SEPARATOR)
+    route = _ROUTES_BY_CODE.get(code) if separator or data in _ROUTES_BY_CODE else None
+    if route is not None:
+        raw_args = payload.split(SEPARATOR, max(len(route.arg_types) - 1, 0)) if separator else []
+        if len(raw_args) == len(route.arg_types):
+            return _convert(route, raw_args)
+        return None
+
+    match = _LEGACY_PATTERN.fullmatch(data)
+    if match is None:
+        return None
+    route, legacy_pattern = _LEGACY_ROUTES[match.lastgroup]
+    return _convert(route, legacy_pattern.fullmatch(data).groups())
+
+
+def callback_route(data: str | None) -> str | None:
+    """callback_data qaysi marshrutga tegishli (masalan 'cart_refresh'); tanilmasa None."""
+    decoded = decode_callback(data) if isinstance(data, str) else None
+    return decoded.route if decoded else None
+
+
+class CallbackRouter(BaseHandler):
+    """
+    Barcha global inline tugmalar uchun bitta handler: callback_data bir marta dekodlanadi (keshlanadi),
+    marshrut lug'atdan topiladi. Handlerlar argumentlarni context.args'dan oladi.
+    """
+
+    def __init__(self, routes: dict, block: bool = True):
+        unknown = set(routes) - set(_ROUTES_BY_NAME)
+        if unknown:
+            raise ValueError(f"Unknown callback routes: {', '.join(sorted(unknown))}")
+        super().__init__(self._dispatch, block=block)
+        self.routes = routes  # marshrut nomi -> handler funksiyasi
+
+    def check_update(self, update: object) -> DecodedCallback | None:
+        if not isinstance(update, Update) or update.callback_query is None:
+            return None
+        data = update.callback_query.data
+        if not isinstance(data, str):
+            return None
+        decoded = decode_callback(data)
+        if decoded is None or decoded.route not in self.routes:
+            return None
+        return decoded
+
+    def collect_additional_context(self, context, update, application, check_result: DecodedCallback) -> None:
+        context.args = list(check_result.args)
+
+    async def handle_update(self, update, application, check_result: DecodedCallback, context):
+        self.collect_additional_context(context, update, application, check_result)
+        return await self.routes[check_result.route](update, context)
+
+    async def _dispatch(self, update, context):
+        # BaseHandler callback talab qiladi; haqiqiy chaqiruv handle_update ichida
+        raise RuntimeError("CallbackRouter dispatches through handle_update")
@@ -0,0 +1,352 @@
+# bot/utils/geocode.py
+"""
+Reverse geocoding (koordinata -> matnli manzil) qatlami. Tartib:
+1. Foydalanuvchining yaqin atrofdagi saqlangan manzili (UserAddress.address_text) - API'siz.
+2. Geohash katak bo'yicha kesh: xotiradagi LRU + SQLite fayl (qayta ishga tushganda ham saqlanadi).
+3. Upstream (Nominatim, ~1 so'rov/sekund): token-bucket limiter orqali; bir katak uchun bir vaqtda bitta so'rov.
+BOT_GEOCODER=stub - tarmoqsiz, deterministik manzil qaytaradi (lokal test uchun).
+"""
+import os
+import math
+import time
+import sqlite3
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from asgiref.sync import sync_to_async
+
+from ..config import (
+    BOT_GEOCODER, BOT_GEOCODE_PRECISION, BOT_GEOCODE_CACHE_SIZE, BOT_GEOCODE_MEMORY_SIZE, BOT_GEOCODE_TTL_DAYS,
+    BOT_GEOCODE_RATE, BOT_GEOCODE_MAX_WAIT, BOT_GEOCODE_SNAP_METERS,
+)
+from .http_clients import get_client
+from .session_backends import PROJECT_ROOT
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.path.join(PROJECT_ROOT, "bot_geocode_cache.sqlite")
+EARTH_RADIUS_M = 6371000.0
+
+# --- Geohash ---
+_GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash(latitude: float, longitude: float, precision: int = BOT_GEOCODE_PRECISION) -> str:
+    """Standart geohash. 8 belgi ~ 38m x 19m katak, 7 belgi ~ 153m x 153m."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, char, bit, even = [], 0, 0, True
+    while len(chars) < precision:
+        value, value_range = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value > mid:
+            char |= 16 >> bit
+            value_range[0] = mid
+        else:
+            value_range[1] = mid
+        even = not even
+        if bit < 4:
+            bit += 1
+        else:
+            chars.append(_GEOHASH_BASE32[char])
+            char, bit = 0, 0
+    return ''.join(chars)
+
+
+def distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Ikki nuqta orasidagi masofa (metr, haversine)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi, d_lambda = phi2 - phi1, math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+# --- Limiter ---
+class TokenBucket:
+    """rate token/sekund, capacity - bir martalik 'portlash'. acquire() navbat bilan kutadi."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, max_wait: float) -> bool:
+        """Token olinsa True; kutish max_wait'dan oshadigan bo'lsa darhol False (navbatda turmaymiz)."""
+        async with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+            if wait > max_wait:
+                return False
+            self.tokens -= 1  # Kelajakdagi tokenni band qilamiz (manfiy bo'lishi mumkin)
+        if wait:
+            await asyncio.sleep(wait)
+        return True
+
+
+# --- Upstream geocoderlar ---
+class NominatimGeocoder:
+    url = "https://nominatim.openstreetmap.org/reverse"
+
+    async def reverse(self, latitude: float, longitude: float) -> str | None:
+        """Berilgan koordinatalar uchun Nominatim orqali manzilni olishga harakat qiladi."""
+        params = {
+            'format': 'json',
+            'lat': str(latitude),
+            'lon': str(longitude),
+            'accept-language': 'uz,ru',  # Qaysi tillarda natija kerakligi
+            'addressdetails': '1'  # Batafsilroq ma'lumot olish uchun
+        }
+        try:
+            # Doimiy 'geocode' klienti (User-Agent Nominatim siyosati uchun o'sha yerda o'rnatilgan)
+            response = await get_client('geocode').get(self.url, params=params)
+            response.raise_for_status()  # HTTP xatolik bo'lsa
+            data = response.json()
+        except httpx.HTTPStatusError as e:
+            logger.error(
+                f"Nominatim API HTTP error for ({latitude},{longitude}): {e.response.status_code} - {e.response.text}")
+            return None
+        except httpx.RequestError as e:
+            logger.error(f"Nominatim API Request error for ({latitude},{longitude}): {e}")
+            return None
+        except ValueError as e:
+            logger.error(f"Nominatim returned invalid JSON for ({latitude},{longitude}): {e}")
+            return None
+
+        # display_name odatda to'liq manzilni beradi
+        address_text = data.get('display_name')
+        if address_text:
+            return address_text
+        # Agar display_name bo'lmasa, address obyektidan yig'ishga harakat qilamiz
+        addr_parts = data.get('address', {})
+        road = addr_parts.get('road', '')
+        house_number = addr_parts.get('house_number', '')
+        suburb = addr_parts.get('suburb', addr_parts.get('borough', addr_parts.get('neighbourhood', '')))
+        city_district = addr_parts.get('city_district', '')
+        city = addr_parts.get('city', addr_parts.get('town', addr_parts.get('village', '')))
+        parts_list = [p for p in [house_number, road, suburb, city_district, city] if p]
+        if parts_list:
+            return ", ".join(parts_list)
+        logger.warning(f"Could not extract meaningful address from Nominatim for ({latitude},{longitude}). "
+                       f"Response: {data}")
+        return None
+
+
+class StubGeocoder:
+    """Tarmoqsiz geocoder: lokal ishlab chiqish va test uchun."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def reverse(self, latitude: float, longitude: float) -> str | None:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return f"Test manzil {geohash(latitude, longitude, 6)} ({latitude:.5f}, {longitude:.5f})"
+
+
+# --- Doimiy kesh ---
+class GeocodeCacheStorage:
+    """SQLite: katak -> manzil. Sinxron, faqat ReverseGeocoder'ning yagona thread'idan chaqiriladi."""
+
+    def __init__(self, path: str = DB_PATH, max_entries: int = BOT_GEOCODE_CACHE_SIZE,
+                 ttl: float = BOT_GEOCODE_TTL_DAYS * 86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.conn = None
+        self._inserts = 0
+
+    def init(self) -> None:
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                cell TEXT PRIMARY KEY,
+                address_text TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS geocode_cache_last_used ON geocode_cache (last_used)")
+        self.conn.commit()
+
+    def get(self, cell: str) -> str | None:
+        row = self.conn.execute("SELECT address_text, created_at FROM geocode_cache WHERE cell = ?",
+                                (cell,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        with self.conn:
+            self.conn.execute("UPDATE geocode_cache SET last_used = ? WHERE cell = ?", (time.time(), cell))
+        return row[0]
+
+    def put(self, cell: str, address_text: str) -> None:
+        now = time.time()
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO geocode_cache (cell, address_text, created_at, last_used) VALUES (?, ?, ?, ?)
+                ON CONFLICT(cell) DO UPDATE SET address_text = excluded.address_text,
+                    created_at = excluded.created_at, last_used = excluded.last_used
+            """, (cell, address_text, now, now))
+        self._inserts += 1
+        if self._inserts % 100 == 0:
+            self.evict()
+
+    def evict(self) -> None:
+        """LRU: eng uzoq ishlatilmagan yozuvlar max_entries'gacha o'chiriladi."""
+        with self.conn:
+            self.conn.execute("""
+                DELETE FROM geocode_cache WHERE cell IN (
+                    SELECT cell FROM geocode_cache ORDER BY last_used
+                    LIMIT max(0, (SELECT count(*) FROM geocode_cache) - ?)
+                )
+            """, (self.max_entries,))
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+# --- Saqlangan manzillar ---
+def _nearest_saved_address(telegram_id: int, latitude: float, longitude: float, radius_m: float) -> str | None:
+    from api.models import UserAddress
+    d_lat = radius_m / 111320.0
+    d_lon = radius_m / (111320.0 * max(math.cos(math.radians(latitude)), 0.01))
+    candidates = (
+        UserAddress.objects
+        .filter(user__telegram_id=telegram_id,
+                latitude__range=(latitude - d_lat, latitude + d_lat),
+                longitude__range=(longitude - d_lon, longitude + d_lon))
+        .exclude(address_text__isnull=True).exclude(address_text='')
+        .values_list('latitude', 'longitude', 'address_text')
+    )
+    best = min(((distance_m(latitude, longitude, lat, lon), text) for lat, lon, text in candidates), default=None)
+    return best[1] if best and best[0] <= radius_m else None
+
+
+class ReverseGeocoder:
+
+    def __init__(self, upstream, storage: GeocodeCacheStorage | None = None, rate: float = BOT_GEOCODE_RATE,
+                 max_wait: float = BOT_GEOCODE_MAX_WAIT, memory_size: int = BOT_GEOCODE_MEMORY_SIZE,
+                 snap_meters: float = BOT_GEOCODE_SNAP_METERS):
+        self.upstream = upstream
+        self.storage = storage
+        self.limiter = TokenBucket(rate)
+        self.max_wait = max_wait
+        self.memory_size = memory_size
+        self.snap_meters = snap_meters
+        self._memory = OrderedDict()  # katak -> manzil
+        self._inflight = {}  # katak -> asyncio.Task
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='geocode-cache')
+        self._storage_ready = None
+        self.stats = {'saved': 0, 'memory': 0, 'disk': 0, 'upstream': 0, 'rate_limited': 0}
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def _storage(self) -> GeocodeCacheStorage | None:
+        if self.storage is None:
+            return None
+        if self._storage_ready is None:
+            self._storage_ready = asyncio.ensure_future(self._run(self.storage.init))
+        try:
+            await self._storage_ready
+        except Exception as e:
+            logger.error(f"Geocode cache storage unavailable, using memory only: {e}")
+            self.storage = None
+            return None
+        return self.storage
+
+    def _remember(self, cell: str, address_text: str) -> None:
+        self._memory[cell] = address_text
+        self._memory.move_to_end(cell)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    async def reverse(self, latitude: float, longitude: float, telegram_id: int | None = None) -> str | None:
+        # 1. Foydalanuvchining o'z saqlangan manzili (boshqalarnikidan foydalanmaymiz: unda kvartira va h.k. bo'lishi mumkin)
+        if telegram_id is not None and self.snap_meters > 0:
+            try:
+                saved = await sync_to_async(_nearest_saved_address, thread_sensitive=False)(
+                    telegram_id, latitude, longitude, self.snap_meters)
+            except Exception as e:
+                logger.warning(f"Saved address lookup failed for user {telegram_id}: {e}")
+                saved = None
+            if saved:
+                self.stats['saved'] += 1
+                return saved
+
+        # 2. Kesh
+        cell = geohash(latitude, longitude)
+        address_text = self._memory.get(cell)
+        if address_text is not None:
+            self._memory.move_to_end(cell)
+            self.stats['memory'] += 1
+            return address_text
+        storage = await self._storage()
+        if storage is not None:
+            address_text = await self._run(storage.get, cell)
+            if address_text is not None:
+                self._remember(cell, address_text)
+                self.stats['disk'] += 1
+                return address_text
+
+        # 3. Upstream: bir katak uchun bir vaqtda bitta so'rov
+        task = self._inflight.get(cell)
+        if task is None:
+            task = self._inflight[cell] = asyncio.ensure_future(self._fetch(cell, latitude, longitude))
+            task.add_done_callback(lambda _t: self._inflight.pop(cell, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, cell: str, latitude: float, longitude: float) -> str | None:
+        if not await self.limiter.acquire(self.max_wait):
+            self.stats['rate_limited'] += 1
+            logger.warning(f"Geocoder rate limit: skipping lookup for cell {cell}.")
+            return None
+        self.stats['upstream'] += 1
+        address_text = await self.upstream.reverse(latitude, longitude)
+        if address_text:
+            self._remember(cell, address_text)
+            storage = await self._storage()
+            if storage is not None:
+                try:
+                    await self._run(storage.put, cell, address_text)
+                except Exception as e:
+                    logger.error(f"Geocode cache write failed for cell {cell}: {e}")
+        return address_text
+
+    async def close(self) -> None:
+        if self.storage is not None and self._storage_ready is not None:
+            await self._run(self.storage.close)
+        self._executor.shutdown(wait=False)
+        logger.info(f"Reverse geocoder stats: {self.stats}")
+
+
+# --- Jarayon bo'yicha yagona geocoder ---
+_geocoder = None
+
+
+def get_reverse_geocoder() -> ReverseGeocoder:
+    global _geocoder
+    if _geocoder is None:
+        if BOT_GEOCODER == 'stub':
+            _geocoder = ReverseGeocoder(StubGeocoder(), storage=None, rate=1000.0)
+        else:
+            _geocoder = ReverseGeocoder(NominatimGeocoder(), storage=GeocodeCacheStorage())
+    return _geocoder
+
+
+async def close_reverse_geocoder(application=None) -> None:
+    """Application.post_shutdown uchun."""
+    global _geocoder
+    if _geocoder is not None:
+        await _geocoder.close()
+        _geocoder = None
@@ -2,7 +2,7 @@
 import logging
 from telegram.ext import ContextTypes
 
-from bot.utils.db_utils import get_user_session_data, save_user_session_data
+from bot.utils.session_store import get_session_store
 
 logger = logging.getLogger(__name__)
 
@@ -22,8 +22,8 @@ def get_user_lang(context: ContextTypes.DEFAULT_TYPE) -> str:
 # Persistence ishlatilganda bularni context.user_data orqali boshqarsa ham bo'ladi
 
 async def get_user_token_data(context: ContextTypes.DEFAULT_TYPE, user_id: int) -> dict | None:
-    """Token ma'lumotlarini DB dan oladi."""
-    session = get_user_session_data(user_id)
+    """Token ma'lumotlarini sessiya omboridan oladi (odatda xotiradagi keshdan)."""
+    session = await get_session_store().get(user_id)
     if session and session.get('access') and session.get('refresh'):
         # context.user_data['tokens'] ga qayta yozish shart emas, make_api_request o'zi oladi
         return {'access': session['access'], 'refresh': session['refresh']}
@@ -34,7 +34,7 @@ async def store_user_token_data(context: ContextTypes.DEFAULT_TYPE, user_id: int
     """Tokenlarni va joriy tilni DB ga saqlaydi."""
     # Joriy tilni user_data dan olamiz (set_language_callback uni o'rnatgan bo'lishi kerak)
     current_lang = context.user_data.get('language_code', 'uz')
-    save_user_session_data(user_id, access_token=access, refresh_token=refresh, language_code=current_lang)
+    await get_session_store().update(user_id, access=access, refresh=refresh, lang=current_lang)
     logger.info(f"Tokens and lang '{current_lang}' stored in DB for user {user_id}")
 
 
@@ -42,9 +42,9 @@ async def clear_user_token_data(context: ContextTypes.DEFAULT_TYPE, user_id: int
     """Tokenlarni DB dan o'chiradi (tilni saqlab qolishi mumkin)."""
     # Faqat tokenlarni None qilish yoki butun yozuvni o'chirish
     # Hozircha faqat tokenlarni None qilamiz:
-    save_user_session_data(user_id, access_token="", refresh_token="")  # Bo'sh satr yoki None
+    await get_session_store().update(user_id, access="", refresh="")  # Bo'sh satr yoki None
     # Yoki butunlay o'chirish uchun:
-    # clear_user_session_data(user_id) # Bu tilni ham o'chiradi
+    # await get_session_store().delete(user_id) # Bu tilni ham o'chiradi
 
     # context.user_data dan ham o'chiramiz
     if 'tokens' in context.user_data:
@@ -54,7 +54,7 @@ async def clear_user_token_data(context: ContextTypes.DEFAULT_TYPE, user_id: int
 
 async def save_user_language_preference(user_id: int, lang_code: str):
     """Foydalanuvchining faqat til sozlamasini DB ga saqlaydi."""
-    save_user_session_data(telegram_id=user_id, language_code=lang_code)
+    await get_session_store().update(user_id, lang=lang_code)
     logger.info(f"Language preference '{lang_code}' saved to DB for user {user_id}")
 # Tilni DBda yangilash funksiyasi (make_api_request'ni talab qiladi)
 # Buni api_client.py ga ko'chirish yoki shu yerda qoldirish mumkin
@@ -0,0 +1,175 @@
+# bot/utils/http_clients.py
+"""
+Bot ishlatadigan httpx klientlari reyestri. Har bir tashqi xizmat uchun bitta uzoq yashovchi klient
+(ulanishlar pool'i va keep-alive qayta ishlatiladi), endpoint bo'yicha timeout/retry siyosati
+va pool to'lishi metrikalari. Klientlar post_shutdown'da close_all_clients() bilan yopiladi.
+"""
+import time
+import random
+import asyncio
+import logging
+from collections import namedtuple
+
+import httpx
+
+from ..config import (
+    API_BASE_URL, BOT_HTTP_MAX_CONNECTIONS, BOT_HTTP_MAX_KEEPALIVE, BOT_HTTP_KEEPALIVE_EXPIRY, BOT_HTTP2,
+    BOT_HTTP_POOL_TIMEOUT, BOT_HTTP_RETRIES, BOT_HTTP_RETRY_BACKOFF,
+)
+
+logger = logging.getLogger(__name__)
+
+# --- Timeout/retry siyosatlari ---
+# timeout - butun so'rov uchun (sekund); retries - faqat idempotent so'rovlar uchun qo'shimcha urinishlar
+Policy = namedtuple('Policy', ['timeout', 'retries'])
+
+DEFAULT_READ_POLICY = Policy(10.0, BOT_HTTP_RETRIES)
+DEFAULT_WRITE_POLICY = Policy(15.0, 0)
+# (metod, endpoint prefiksi, siyosat) - birinchi mos kelgani olinadi
+ENDPOINT_POLICIES = (
+    ('GET', 'cart/', Policy(5.0, BOT_HTTP_RETRIES)),
+    ('GET', 'categories/', Policy(5.0, BOT_HTTP_RETRIES)),
+    ('GET', 'products/', Policy(5.0, BOT_HTTP_RETRIES)),
+    ('GET', 'branches/', Policy(5.0, BOT_HTTP_RETRIES)),
+    ('GET', 'promotions/', Policy(5.0, BOT_HTTP_RETRIES)),
+    ('PATCH', 'cart/', Policy(8.0, 0)),
+    ('POST', 'cart/', Policy(8.0, 0)),
+    ('DELETE', 'cart/', Policy(8.0, 0)),
+    ('POST', 'orders/checkout/', Policy(30.0, 0)),
+    ('POST', 'auth/token/refresh/', Policy(10.0, 0)),
+)
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+
+def get_policy(method: str, endpoint: str) -> Policy:
+    for policy_method, prefix, policy in ENDPOINT_POLICIES:
+        if method == policy_method and endpoint.startswith(prefix):
+            return policy
+    return DEFAULT_READ_POLICY if method in IDEMPOTENT_METHODS else DEFAULT_WRITE_POLICY
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class ManagedClient:
+    """
+    httpx.AsyncClient o'rami: request()/get()/post()/aclose() va base_url - httpx bilan bir xil interfeys.
+    Idempotent so'rovlar tarmoq xatosi yoki 502/503/504 da jitter'li eksponensial kutish bilan qayta yuboriladi.
+    """
+
+    def __init__(self, name: str, base_url: str = '', max_connections: int = BOT_HTTP_MAX_CONNECTIONS,
+                 max_keepalive: int = BOT_HTTP_MAX_KEEPALIVE, http2: bool = BOT_HTTP2, headers: dict | None = None):
+        self.name = name
+        self.base_url = base_url
+        self.max_connections = max_connections
+        if http2 and not _http2_available():
+            logger.warning(f"HTTP client '{name}': HTTP/2 requested but 'h2' is not installed (pip install h2), "
+                           f"using HTTP/1.1.")
+            http2 = False
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            http2=http2,
+            headers=headers,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive,
+                                keepalive_expiry=BOT_HTTP_KEEPALIVE_EXPIRY),
+            timeout=httpx.Timeout(DEFAULT_WRITE_POLICY.timeout, pool=BOT_HTTP_POOL_TIMEOUT),
+        )
+        # --- Metrikalar ---
+        self.requests = self.retries = self.errors = self.pool_timeouts = 0
+        self.in_flight = self.peak_in_flight = 0
+        self._saturation_logged_at = 0.0
+
+    def _endpoint(self, url: str) -> str:
+        url = str(url)
+        return url[len(self.base_url):] if self.base_url and url.startswith(self.base_url) else url.lstrip('/')
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        method = method.upper()
+        policy = get_policy(method, self._endpoint(url))
+        kwargs.setdefault('timeout', httpx.Timeout(policy.timeout, pool=BOT_HTTP_POOL_TIMEOUT))
+        attempts = 1 + (policy.retries if method in IDEMPOTENT_METHODS else 0)
+
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            self._enter()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.PoolTimeout:
+                self.pool_timeouts += 1
+                self.errors += 1
+                raise  # Pool to'la: qayta urinish vaziyatni og'irlashtiradi
+            except httpx.TransportError:
+                self.errors += 1
+                if last_attempt:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    return response
+                await response.aclose()
+            finally:
+                self.in_flight -= 1
+            self.retries += 1
+            # Full jitter: bir vaqtda xato olgan so'rovlar serverga birdaniga qaytib kelmasin
+            await asyncio.sleep(random.uniform(0, BOT_HTTP_RETRY_BACKOFF * (2 ** attempt)))
+
+    def _enter(self) -> None:
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        if self.in_flight >= self.max_connections and time.monotonic() - self._saturation_logged_at > 60:
+            self._saturation_logged_at = time.monotonic()
+            logger.warning(f"HTTP client '{self.name}' pool saturated: {self.in_flight} requests in flight "
+                           f"(max_connections={self.max_connections}).")
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('POST', url, **kwargs)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    def metrics(self) -> dict:
+        return {
+            'requests': self.requests, 'retries': self.retries, 'errors': self.errors,
+            'pool_timeouts': self.pool_timeouts, 'in_flight': self.in_flight, 'peak_in_flight': self.peak_in_flight,
+            'max_connections': self.max_connections,
+            'peak_saturation': round(self.peak_in_flight / self.max_connections, 2),
+        }
+
+
+# --- Reyestr ---
+# Klient nomi -> ManagedClient parametrlari
+CLIENT_CONFIGS = {
+    'api': {'base_url': API_BASE_URL},
+    # Nominatim siyosati: kam ulanish va User-Agent majburiy
+    'geocode': {'base_url': 'https://nominatim.openstreetmap.org/', 'max_connections': 2, 'max_keepalive': 2,
+                'http2': False, 'headers': {'User-Agent': 'TelegramFoodOrderBot/1.0 (dev)'}},
+}
+_clients = {}
+
+
+def get_client(name: str) -> ManagedClient:
+    """Nomlangan klient (birinchi chaqiruvda yaratiladi, keyin qayta ishlatiladi)."""
+    client = _clients.get(name)
+    if client is None:
+        client = _clients[name] = ManagedClient(name, **CLIENT_CONFIGS[name])
+    return client
+
+
+def get_http_metrics() -> dict:
+    return {name: client.metrics() for name, client in _clients.items()}
+
+
+async def close_all_clients() -> None:
+    for name in list(_clients):
+        client = _clients.pop(name)
+        logger.info(f"Closing HTTP client '{name}': {client.metrics()}")
+        await client.aclose()
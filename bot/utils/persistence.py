@@ -0,0 +1,395 @@
+# bot/utils/persistence.py
+"""
+PicklePersistence o'rniga: har bir foydalanuvchi/chat/suhbat kaliti alohida qatorda saqlanadi.
+- Ishga tushganda foydalanuvchi ma'lumotlari yuklanmaydi: birinchi update kelganda
+  (refresh_user_data) faqat o'sha foydalanuvchining qatori o'qiladi.
+- Yozishda faqat o'zgargan qatorlar yoziladi (oxirgi yozilgan qiymat xeshi bilan solishtiriladi),
+  bir intervaldagi barcha o'zgarishlar bitta tranzaksiyada.
+- Tugagan suhbatlar va bo'sh user_data qatorlari o'chiriladi; fonda vaqti-vaqti bilan siqiladi.
+Barcha DB ishlari bitta fon thread'ida bajariladi, event loop bloklanmaydi.
+"""
+import os
+import json
+import time
+import pickle
+import sqlite3
+import asyncio
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from telegram.ext import BasePersistence, PersistenceInput, PicklePersistence
+
+from ..config import (
+    BOT_PERSISTENCE_BACKEND, BOT_PERSISTENCE_URL, BOT_PERSISTENCE_UPDATE_INTERVAL, BOT_PERSISTENCE_COMPACT_INTERVAL,
+)
+from .session_backends import PROJECT_ROOT
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.path.join(PROJECT_ROOT, "bot_persistence.sqlite")
+LEGACY_PICKLE_PATH = "bot_storage.pickle"  # Eski PicklePersistence fayli (bir martalik import uchun)
+
+USER, CHAT, BOT = 'user', 'chat', 'bot'
+
+
+def _conversation_kind(name: str) -> str:
+    return f"conv:{name}"
+
+
+def _conversation_key(key: tuple) -> str:
+    return json.dumps(list(key))
+
+
+# --- Saqlash qatlami (sinxron, faqat persistence thread'idan) ---
+class PersistenceStorage:
+    """Jadval: (kind, key) -> pickle blob. data=None yozilsa qator o'chiriladi."""
+    placeholder = '?'
+
+    def connect(self) -> None:
+        raise NotImplementedError
+
+    def execute(self, sql: str, params=()):
+        raise NotImplementedError
+
+    def load(self, kind: str, key: str) -> bytes | None:
+        p = self.placeholder
+        rows = self.execute(f"SELECT data FROM bot_persistence WHERE kind = {p} AND key = {p}", (kind, key))
+        return bytes(rows[0][0]) if rows else None
+
+    def load_kind(self, kind: str) -> list[tuple[str, bytes]]:
+        rows = self.execute(f"SELECT key, data FROM bot_persistence WHERE kind = {self.placeholder}", (kind,))
+        return [(key, bytes(data)) for key, data in rows]
+
+    def is_empty(self) -> bool:
+        return not self.execute("SELECT 1 FROM bot_persistence LIMIT 1")
+
+    def write_many(self, rows: dict) -> None:
+        raise NotImplementedError
+
+    def compact(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SQLitePersistenceStorage(PersistenceStorage):
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self.conn = None
+
+    def connect(self) -> None:
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # Faqat yangi faylda ta'sir qiladi
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS bot_persistence (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                data BLOB NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            )
+        """)
+        self.conn.commit()
+        logger.info(f"Bot persistence DB initialized/checked at {self.path} (WAL)")
+
+    def execute(self, sql: str, params=()):
+        return self.conn.execute(sql, params).fetchall()
+
+    def write_many(self, rows: dict) -> None:
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM bot_persistence WHERE kind = ? AND key = ?",
+                [(kind, key) for (kind, key), data in rows.items() if data is None]
+            )
+            self.conn.executemany("""
+                INSERT INTO bot_persistence (kind, key, data, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(kind, key) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at
+            """, [(kind, key, data, now) for (kind, key), data in rows.items() if data is not None])
+
+    def compact(self) -> None:
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.execute("PRAGMA incremental_vacuum")
+        self.conn.commit()
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class PostgresPersistenceStorage(PersistenceStorage):
+    placeholder = '%s'
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self.conn = None
+
+    def connect(self) -> None:
+        import psycopg2
+        self.conn = psycopg2.connect(self.dsn)
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS bot_persistence (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    data BYTEA NOT NULL,
+                    updated_at DOUBLE PRECISION NOT NULL,
+                    PRIMARY KEY (kind, key)
+                )
+            """)
+        logger.info("Bot persistence connected to PostgreSQL.")
+
+    def execute(self, sql: str, params=()):
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def write_many(self, rows: dict) -> None:
+        import psycopg2
+        now = time.time()
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.executemany(
+                "DELETE FROM bot_persistence WHERE kind = %s AND key = %s",
+                [(kind, key) for (kind, key), data in rows.items() if data is None]
+            )
+            cursor.executemany("""
+                INSERT INTO bot_persistence (kind, key, data, updated_at) VALUES (%s, %s, %s, %s)
+                ON CONFLICT (kind, key) DO UPDATE SET data = EXCLUDED.data, updated_at = EXCLUDED.updated_at
+            """, [(kind, key, psycopg2.Binary(data), now) for (kind, key), data in rows.items() if data is not None])
+
+    def compact(self) -> None:
+        self.conn.autocommit = True  # VACUUM tranzaksiya ichida ishlamaydi
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute("VACUUM (ANALYZE) bot_persistence")
+        finally:
+            self.conn.autocommit = False
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+# --- PTB persistence ---
+class SQLPersistence(BasePersistence):
+    """user_data, chat_data, bot_data va ConversationHandler holatlari uchun qatorma-qator persistence."""
+
+    def __init__(self, storage: PersistenceStorage, update_interval: float = BOT_PERSISTENCE_UPDATE_INTERVAL,
+                 compact_interval: float = BOT_PERSISTENCE_COMPACT_INTERVAL):
+        super().__init__(store_data=PersistenceInput(callback_data=False), update_interval=update_interval)
+        self.storage = storage
+        self.compact_interval = compact_interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bot-persistence')
+        self._ready = None
+        self._loaded = set()  # (kind, key) - shu jarayonda DB'dan o'qilgan user/chat qatorlari
+        self._loading = {}  # (kind, key) -> asyncio.Task (bir vaqtdagi o'qishlar birlashadi)
+        self._written = {}  # (kind, key) -> oxirgi yozilgan blob xeshi (o'zgarmagan qatorlar qayta yozilmaydi)
+        self._pending = {}  # (kind, key) -> blob yoki None (o'chirish)
+        self._commit_task = None
+        self._last_compact = time.monotonic()
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def _ensure_ready(self) -> None:
+        if self._ready is None:
+            self._ready = asyncio.ensure_future(self._open())
+        await self._ready
+
+    async def _open(self) -> None:
+        await self._run(self.storage.connect)
+        if await self._run(self.storage.is_empty) and os.path.exists(LEGACY_PICKLE_PATH):
+            await self._import_pickle(LEGACY_PICKLE_PATH)
+
+    async def _import_pickle(self, path: str) -> None:
+        """Eski bot_storage.pickle dan bir martalik ko'chirish."""
+        try:
+            with open(path, 'rb') as file:
+                data = pickle.load(file)
+        except Exception as e:
+            logger.warning(f"Could not import legacy persistence file {path}: {e}")
+            return
+        rows = {}
+        for user_id, user_data in (data.get('user_data') or {}).items():
+            if user_data:
+                rows[(USER, str(user_id))] = pickle.dumps(user_data)
+        for chat_id, chat_data in (data.get('chat_data') or {}).items():
+            if chat_data:
+                rows[(CHAT, str(chat_id))] = pickle.dumps(chat_data)
+        if data.get('bot_data'):
+            rows[(BOT, '')] = pickle.dumps(data['bot_data'])
+        for name, conversations in (data.get('conversations') or {}).items():
+            for key, state in conversations.items():
+                if state is not None:
+                    rows[(_conversation_kind(name), _conversation_key(key))] = pickle.dumps(state)
+        await self._run(self.storage.write_many, rows)
+        logger.info(f"Imported {len(rows)} rows from legacy persistence file {path}.")
+
+    # --- O'qish ---
+    async def _load(self, kind: str, key: str):
+        await self._ensure_ready()
+        blob = await self._run(self.storage.load, kind, key)
+        if blob is None:
+            return None
+        self._written[(kind, key)] = _digest(blob)
+        return pickle.loads(blob)
+
+    async def get_user_data(self) -> dict:
+        return {}  # Dangasa yuklash: refresh_user_data
+
+    async def get_chat_data(self) -> dict:
+        return {}  # Dangasa yuklash: refresh_chat_data
+
+    async def get_bot_data(self) -> dict:
+        return await self._load(BOT, '') or {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        """Faqat faol suhbatlar saqlanadi (tugaganlari o'chiriladi), shuning uchun bu ro'yxat kichik."""
+        await self._ensure_ready()
+        kind = _conversation_kind(name)
+        rows = await self._run(self.storage.load_kind, kind)
+        conversations = {}
+        for key, blob in rows:
+            self._written[(kind, key)] = _digest(blob)
+            conversations[tuple(json.loads(key))] = pickle.loads(blob)
+        return conversations
+
+    async def _refresh(self, kind: str, key: str, data: dict) -> None:
+        """Qator jarayonda faqat bir marta o'qiladi va xotiradagi lug'atga qo'shiladi."""
+        row_key = (kind, key)
+        if row_key in self._loaded:
+            return
+        task = self._loading.get(row_key)
+        if task is not None:
+            await asyncio.shield(task)
+            return
+        task = self._loading[row_key] = asyncio.ensure_future(self._load(kind, key))
+        try:
+            stored = await asyncio.shield(task)
+        finally:
+            del self._loading[row_key]
+        self._loaded.add(row_key)
+        for field, value in (stored or {}).items():
+            data.setdefault(field, value)  # Xotiradagi (yangiroq) qiymat ustun
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        await self._refresh(USER, str(user_id), user_data)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        await self._refresh(CHAT, str(chat_id), chat_data)
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass  # Ishga tushganda bir marta yuklangan
+
+    # --- Yozish ---
+    async def _queue(self, kind: str, key: str, data, force: bool = False) -> None:
+        blob = pickle.dumps(data) if data is not None else None
+        digest = _digest(blob) if blob is not None else None
+        if not force and self._written.get((kind, key)) == digest:
+            return  # O'zgarmagan
+        self._written[(kind, key)] = digest
+        self._pending[(kind, key)] = blob
+        await self._commit_soon()
+
+    async def _commit_soon(self) -> None:
+        """Bir vaqtda kelgan yozuvlar (Application ularni gather qiladi) bitta tranzaksiyaga yig'iladi."""
+        if self._commit_task is None or self._commit_task.done():
+            self._commit_task = asyncio.ensure_future(self._commit())
+        await asyncio.shield(self._commit_task)
+
+    async def _commit(self) -> None:
+        await asyncio.sleep(0)  # Shu tsikldagi boshqa update_* chaqiruvlari ham navbatga tushsin
+        await self._ensure_ready()
+        while self._pending:
+            batch, self._pending = self._pending, {}
+            try:
+                await self._run(self.storage.write_many, batch)
+            except Exception as e:
+                logger.error(f"Bot persistence write failed ({len(batch)} rows), will retry: {e}", exc_info=True)
+                for row_key, blob in batch.items():
+                    self._pending.setdefault(row_key, blob)
+                    self._written.pop(row_key, None)
+                raise
+            logger.debug(f"Bot persistence wrote {len(batch)} rows.")
+
+    async def _update(self, kind: str, key: str, data: dict) -> None:
+        if (kind, key) not in self._loaded:
+            if not data:
+                return  # Hech qachon o'qilmagan va bo'sh: DB'dagi qiymatni bo'sh bilan ustidan yozmaymiz
+            await self._refresh(kind, key, data)
+        await self._queue(kind, key, data or None)  # Bo'sh lug'at - qator o'chiriladi
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        await self._update(USER, str(user_id), data)
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        await self._update(CHAT, str(chat_id), data)
+
+    async def update_bot_data(self, data: dict) -> None:
+        await self._queue(BOT, '', data)
+        self._maybe_compact()
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def update_conversation(self, name: str, key: tuple, new_state) -> None:
+        await self._queue(_conversation_kind(name), _conversation_key(key), new_state)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._loaded.add((USER, str(user_id)))
+        await self._queue(USER, str(user_id), None, force=True)  # DB'da o'qilmagan qator ham bo'lishi mumkin
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._loaded.add((CHAT, str(chat_id)))
+        await self._queue(CHAT, str(chat_id), None, force=True)
+
+    # --- Xizmat ---
+    def _maybe_compact(self) -> None:
+        """update_bot_data har intervalda chaqiriladi; siqish fonda, yozuvlar bilan bir thread'da bajariladi."""
+        if self._ready is None or time.monotonic() - self._last_compact < self.compact_interval:
+            return
+        self._last_compact = time.monotonic()
+
+        def compact():
+            try:
+                self.storage.compact()
+                logger.info("Bot persistence compacted.")
+            except Exception as e:
+                logger.error(f"Bot persistence compaction failed: {e}", exc_info=True)
+
+        self._executor.submit(compact)
+
+    async def flush(self) -> None:
+        """Application.stop() oxirida chaqiriladi: qolgan yozuvlar saqlanadi va ulanish yopiladi."""
+        if self._ready is None:
+            return
+        if self._pending:
+            await self._commit_soon()
+        await self._run(self.storage.close)
+        self._ready = None
+        self._loaded.clear()
+
+
+def _digest(blob: bytes) -> bytes:
+    return hashlib.blake2b(blob, digest_size=16).digest()
+
+
+def build_persistence(name: str = BOT_PERSISTENCE_BACKEND, url: str | None = BOT_PERSISTENCE_URL) -> BasePersistence:
+    """BOT_PERSISTENCE_BACKEND bo'yicha: 'sqlite' (standart), 'postgres' yoki eski 'pickle'."""
+    if name == 'pickle':
+        return PicklePersistence(filepath=url or LEGACY_PICKLE_PATH)
+    if name == 'postgres':
+        if not url:
+            raise ValueError("BOT_PERSISTENCE_BACKEND=postgres uchun BOT_PERSISTENCE_URL (DSN) kerak.")
+        return SQLPersistence(PostgresPersistenceStorage(url))
+    return SQLPersistence(SQLitePersistenceStorage(url or DB_PATH))
@@ -0,0 +1,138 @@
+# bot/utils/photo_cache.py
+import asyncio
+import logging
+from urllib.parse import urlparse, parse_qs
+
+from telegram import Message
+from telegram.error import BadRequest, TelegramError
+from telegram.ext import Application, ContextTypes
+
+from ..config import BOT_PHOTO_CACHE_CHAT_ID
+from . import api_client as api_module
+
+logger = logging.getLogger(__name__)
+
+# bot_data ichidagi kalit: {rasm kaliti: Telegram file_id}. PicklePersistence orqali qayta ishga tushganda ham saqlanadi.
+PHOTO_FILE_IDS_KEY = 'photo_file_ids'
+
+_uploads = {}  # rasm kaliti -> asyncio.Future (bir vaqtda bir xil rasm faqat bir marta yuklanadi)
+
+
+def photo_cache_key(photo_url: str) -> str:
+    """
+    Google Drive URL'idan fayl ID'si ('...uc?export=view&id=<id>'). google_drive_file_id o'zgarsa
+    URL ham o'zgaradi, shuning uchun eski file_id avtomatik ishlatilmay qoladi.
+    """
+    file_id = parse_qs(urlparse(photo_url).query).get('id')
+    return f"gdrive:{file_id[0]}" if file_id else photo_url
+
+
+def _file_ids(bot_data: dict) -> dict:
+    return bot_data.setdefault(PHOTO_FILE_IDS_KEY, {})
+
+
+def _remember(bot_data: dict, key: str, message: Message) -> str | None:
+    if message and message.photo:
+        file_id = message.photo[-1].file_id  # Eng katta o'lcham
+        _file_ids(bot_data)[key] = file_id
+        return file_id
+    return None
+
+
+async def send_cached_photo(context: ContextTypes.DEFAULT_TYPE, chat_id: int, photo_url: str, **kwargs) -> Message:
+    """
+    context.bot.send_photo o'rniga. Birinchi marta rasm URL orqali yuboriladi (Telegram uni Drive'dan
+    yuklab oladi), qaytgan file_id saqlanadi va keyingi safar URL o'rniga ishlatiladi.
+    Xatolik bo'lsa TelegramError ko'tariladi (chaqiruvchi matn bilan yuborishi mumkin).
+    """
+    key = photo_cache_key(photo_url)
+    file_ids = _file_ids(context.bot_data)
+
+    # Boshqa so'rov shu rasmni hozir yuklayapti - uning file_id'sini kutamiz
+    pending = _uploads.get(key)
+    if pending is not None and key not in file_ids:
+        try:
+            await asyncio.shield(pending)
+        except Exception:
+            pass
+
+    file_id = file_ids.get(key)
+    if file_id:
+        try:
+            return await context.bot.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+        except BadRequest as e:
+            logger.warning(f"Cached file_id for {key} rejected ({e}), re-uploading from URL.")
+            file_ids.pop(key, None)
+
+    future = asyncio.get_running_loop().create_future()
+    _uploads[key] = future
+    try:
+        message = await context.bot.send_photo(chat_id=chat_id, photo=photo_url, **kwargs)
+        future.set_result(_remember(context.bot_data, key, message))
+        return message
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # Kutuvchi bo'lmasa "exception never retrieved" ogohlantirishi chiqmasin
+        raise
+    finally:
+        if _uploads.get(key) is future:
+            del _uploads[key]
+
+
+# --- Oldindan isitish (pre-warm) ---
+async def _collect_image_urls() -> set[str]:
+    """Kategoriya, mahsulot va aksiyalarning barcha rasm URL'lari (hamma sahifalar)."""
+    urls = set()
+    for endpoint in ('categories/', 'products/', 'promotions/'):
+        next_url = endpoint
+        while next_url:
+            response = await api_module.api_client.get(next_url, headers={"Accept": "application/json"})
+            response.raise_for_status()
+            data = response.json()
+            items = data.get('results', []) if isinstance(data, dict) else data
+            for item in items:
+                for obj in (item, item.get('category') or {}):
+                    if obj.get('image_url'):
+                        urls.add(obj['image_url'])
+            next_url = data.get('next') if isinstance(data, dict) else None
+    return urls
+
+
+async def warm_photo_cache(application: Application, chat_id: int = BOT_PHOTO_CACHE_CHAT_ID) -> int:
+    """
+    Hali file_id'si yo'q rasmlarni xizmat chatiga yuklab, file_id'larni saqlaydi va xabarlarni o'chiradi.
+    Katalogda endi yo'q rasmlarning file_id'lari tozalanadi. Yangi yuklangan rasmlar sonini qaytaradi.
+    """
+    if not chat_id:
+        return 0
+    try:
+        urls = await _collect_image_urls()
+    except Exception as e:
+        logger.error(f"Photo cache warm-up: could not load catalog images: {e}")
+        return 0
+
+    file_ids = _file_ids(application.bot_data)
+    current_keys = {photo_cache_key(url): url for url in urls}
+    for stale_key in set(file_ids) - set(current_keys):
+        del file_ids[stale_key]
+
+    uploaded = 0
+    for key, url in current_keys.items():
+        if key in file_ids:
+            continue
+        try:
+            message = await application.bot.send_photo(chat_id=chat_id, photo=url, disable_notification=True)
+            if _remember(application.bot_data, key, message):
+                uploaded += 1
+            await message.delete()
+        except TelegramError as e:
+            logger.warning(f"Photo cache warm-up: failed to upload {url}: {e}")
+        await asyncio.sleep(0.1)  # Telegram flood limitlariga tushmaslik uchun
+    logger.info(f"Photo cache warm-up done: {uploaded} uploaded, {len(file_ids)} cached.")
+    return uploaded
+
+
+async def start_photo_cache_warmup(application: Application) -> None:
+    """Application.post_init uchun: isitish fonda bajariladi, bot ishga tushishini kutdirmaydi."""
+    if BOT_PHOTO_CACHE_CHAT_ID:
+        application.create_task(warm_photo_cache(application))
@@ -0,0 +1,196 @@
+# bot/utils/session_backends.py
+"""
+Bot sessiyasi (tokenlar va til) uchun saqlash backendlari.
+Barcha metodlar sinxron va faqat SessionStore'ning yagona fon thread'idan chaqiriladi.
+Sessiya yozuvi: {'access': str | None, 'refresh': str | None, 'lang': str | None}
+"""
+import os
+import json
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Eski joylashuv saqlanadi: loyiha root papkasida (manage.py bilan bir joyda)
+DB_NAME = "bot_user_data.sqlite"
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DB_PATH = os.path.join(PROJECT_ROOT, DB_NAME)
+
+SESSION_FIELDS = ('access', 'refresh', 'lang')
+
+
+class SessionBackend:
+    """Backend interfeysi. Yangi backend shu metodlarni amalga oshiradi."""
+
+    def init(self) -> None:
+        """Ulanishni ochadi va kerakli jadval/strukturani tayyorlaydi."""
+
+    def load(self, telegram_id: int) -> dict | None:
+        raise NotImplementedError
+
+    def write_many(self, rows: dict[int, dict]) -> None:
+        """{telegram_id: sessiya} - bitta tranzaksiya/pipeline'da yozadi (upsert)."""
+        raise NotImplementedError
+
+    def delete(self, telegram_id: int) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+# --- SQLite (standart) ---
+class SQLiteSessionBackend(SessionBackend):
+    """Bitta doimiy ulanish, WAL rejimi: o'qishlar yozishni kutmaydi, har bir commit fsync qilmaydi."""
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self.conn = None
+
+    def init(self) -> None:
+        # Ulanish faqat store'ning yagona thread'ida ishlatiladi
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS user_settings (
+                telegram_id INTEGER PRIMARY KEY,
+                access_token TEXT,
+                refresh_token TEXT,
+                language_code TEXT
+            )
+        """)
+        self.conn.commit()
+        logger.info(f"Session DB initialized/checked at {self.path} (WAL)")
+
+    def load(self, telegram_id: int) -> dict | None:
+        row = self.conn.execute(
+            "SELECT access_token, refresh_token, language_code FROM user_settings WHERE telegram_id = ?",
+            (telegram_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'access': row['access_token'], 'refresh': row['refresh_token'], 'lang': row['language_code']}
+
+    def write_many(self, rows: dict[int, dict]) -> None:
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO user_settings (telegram_id, access_token, refresh_token, language_code)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(telegram_id) DO UPDATE SET
+                    access_token = excluded.access_token,
+                    refresh_token = excluded.refresh_token,
+                    language_code = excluded.language_code
+            """, [(telegram_id, row.get('access'), row.get('refresh'), row.get('lang'))
+                  for telegram_id, row in rows.items()])
+
+    def delete(self, telegram_id: int) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM user_settings WHERE telegram_id = ?", (telegram_id,))
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+# --- Redis (yoki Redis protokoliga mos: KeyDB, Valkey, Dragonfly) ---
+class RedisSessionBackend(SessionBackend):
+    KEY_PREFIX = "bot:session:"
+
+    def __init__(self, url: str):
+        self.url = url
+        self.client = None
+
+    def init(self) -> None:
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("BOT_SESSION_BACKEND=redis uchun 'redis' paketini o'rnating (pip install redis).") from e
+        self.client = redis.Redis.from_url(self.url, decode_responses=True)
+        self.client.ping()
+        logger.info("Session store connected to Redis.")
+
+    def load(self, telegram_id: int) -> dict | None:
+        raw = self.client.get(f"{self.KEY_PREFIX}{telegram_id}")
+        return json.loads(raw) if raw else None
+
+    def write_many(self, rows: dict[int, dict]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for telegram_id, row in rows.items():
+            pipe.set(f"{self.KEY_PREFIX}{telegram_id}", json.dumps({field: row.get(field) for field in SESSION_FIELDS}))
+        pipe.execute()
+
+    def delete(self, telegram_id: int) -> None:
+        self.client.delete(f"{self.KEY_PREFIX}{telegram_id}")
+
+    def close(self) -> None:
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+
+# --- PostgreSQL (bir nechta bot jarayoni umumiy bazadan foydalansa) ---
+class PostgresSessionBackend(SessionBackend):
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self.conn = None
+
+    def init(self) -> None:
+        import psycopg2
+        self.conn = psycopg2.connect(self.dsn)
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS bot_user_settings (
+                    telegram_id BIGINT PRIMARY KEY,
+                    access_token TEXT,
+                    refresh_token TEXT,
+                    language_code TEXT
+                )
+            """)
+        logger.info("Session store connected to PostgreSQL.")
+
+    def load(self, telegram_id: int) -> dict | None:
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT access_token, refresh_token, language_code FROM bot_user_settings WHERE telegram_id = %s",
+                (telegram_id,)
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return {'access': row[0], 'refresh': row[1], 'lang': row[2]}
+
+    def write_many(self, rows: dict[int, dict]) -> None:
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.executemany("""
+                INSERT INTO bot_user_settings (telegram_id, access_token, refresh_token, language_code)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (telegram_id) DO UPDATE SET
+                    access_token = EXCLUDED.access_token,
+                    refresh_token = EXCLUDED.refresh_token,
+                    language_code = EXCLUDED.language_code
+            """, [(telegram_id, row.get('access'), row.get('refresh'), row.get('lang'))
+                  for telegram_id, row in rows.items()])
+
+    def delete(self, telegram_id: int) -> None:
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute("DELETE FROM bot_user_settings WHERE telegram_id = %s", (telegram_id,))
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def build_backend(name: str, url: str | None = None) -> SessionBackend:
+    """BOT_SESSION_BACKEND qiymati bo'yicha backend yaratadi: 'sqlite', 'redis' yoki 'postgres'."""
+    if name == 'redis':
+        return RedisSessionBackend(url or "redis://localhost:6379/0")
+    if name == 'postgres':
+        if not url:
+            raise ValueError("BOT_SESSION_BACKEND=postgres uchun BOT_SESSION_URL (DSN) kerak.")
+        return PostgresSessionBackend(url)
+    return SQLiteSessionBackend(url or DB_PATH)
@@ -0,0 +1,174 @@
+# bot/utils/session_store.py
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ..config import BOT_SESSION_BACKEND, BOT_SESSION_URL, BOT_SESSION_CACHE_SIZE, BOT_SESSION_FLUSH_DELAY
+from .session_backends import SessionBackend, SESSION_FIELDS, build_backend
+
+logger = logging.getLogger(__name__)
+
+_EMPTY_SESSION = {'access': None, 'refresh': None, 'lang': None}
+
+
+class SessionStore:
+    """
+    Foydalanuvchi sessiyalari (tokenlar, til) uchun asinxron qatlam.
+    - O'qish: xotiradagi LRU keshdan; kesh bo'sh bo'lsa backenddan (event loop'ni bloklamasdan).
+    - Yozish: kesh darhol yangilanadi, backendga esa fon vazifasi qisqa kechikish bilan
+      to'plab yozadi (write-behind). Disk sekinlashsa ham boshqa foydalanuvchilar kutmaydi.
+    Backend bilan barcha ishlar bitta thread'da bajariladi (SQLite ulanishi uchun shart).
+    """
+
+    def __init__(self, backend: SessionBackend, cache_size: int = BOT_SESSION_CACHE_SIZE,
+                 flush_delay: float = BOT_SESSION_FLUSH_DELAY):
+        self.backend = backend
+        self.cache_size = cache_size
+        self.flush_delay = flush_delay
+        self._cache = OrderedDict()  # telegram_id -> sessiya (None emas; yo'q yozuv - _EMPTY_SESSION)
+        self._pending = {}  # telegram_id -> backendga hali yozilmagan sessiya
+        self._loading = {}  # telegram_id -> asyncio.Future (bir vaqtdagi bir xil o'qishlar birlashadi)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='session-store')
+        self._wakeup = None
+        self._flush_task = None
+        self._started = None
+
+    # --- Hayot sikli ---
+    async def start(self) -> None:
+        """Backendni ochadi va fon yozuvchisini ishga tushiradi (bir marta)."""
+        if self._started is None:
+            self._started = asyncio.ensure_future(self._start())
+        await self._started
+
+    async def _start(self) -> None:
+        await self._run(self.backend.init)
+        self._wakeup = asyncio.Event()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._started is None:
+            return
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        await self._run(self.backend.close)
+        self._executor.shutdown(wait=True)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # --- Kesh ---
+    def _remember(self, telegram_id: int, session: dict) -> None:
+        self._cache[telegram_id] = session
+        self._cache.move_to_end(telegram_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _cached(self, telegram_id: int) -> dict | None:
+        session = self._cache.get(telegram_id)
+        if session is not None:
+            self._cache.move_to_end(telegram_id)
+            return session
+        # Keshdan chiqarib yuborilgan, lekin hali yozilmagan bo'lishi mumkin
+        return self._pending.get(telegram_id)
+
+    # --- O'qish ---
+    async def get(self, telegram_id: int) -> dict:
+        """Sessiya nusxasi: {'access', 'refresh', 'lang'} (yo'q bo'lsa - hammasi None)."""
+        session = self._cached(telegram_id)
+        if session is not None:
+            return dict(session)
+
+        await self.start()
+        future = self._loading.get(telegram_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._loading[telegram_id] = future
+            try:
+                row = await self._run(self.backend.load, telegram_id)
+                session = dict(_EMPTY_SESSION, **(row or {}))
+                # O'qish davomida yozilgan yangi qiymat ustunroq
+                session = self._cached(telegram_id) or session
+                self._remember(telegram_id, session)
+                future.set_result(session)
+            except Exception as e:
+                logger.error(f"Session load failed for user {telegram_id}: {e}", exc_info=True)
+                future.set_result(dict(_EMPTY_SESSION))
+            finally:
+                del self._loading[telegram_id]
+        return dict(await future)
+
+    # --- Yozish ---
+    async def update(self, telegram_id: int, **fields) -> None:
+        """Berilgan maydonlarni yangilaydi (None - o'zgarmaydi, '' - tozalaydi)."""
+        unknown = set(fields) - set(SESSION_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown session fields: {unknown}")
+        session = await self.get(telegram_id)
+        session.update({field: value for field, value in fields.items() if value is not None})
+        self._remember(telegram_id, session)
+        self._pending[telegram_id] = session
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def delete(self, telegram_id: int) -> None:
+        await self.start()
+        self._pending.pop(telegram_id, None)
+        self._remember(telegram_id, dict(_EMPTY_SESSION))
+        await self._run(self.backend.delete, telegram_id)
+
+    async def flush(self) -> None:
+        """Yozilmagan sessiyalarni backendga bitta partiyada yozadi."""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            await self._run(self.backend.write_many, batch)
+            logger.debug(f"Session store flushed {len(batch)} sessions.")
+        except Exception as e:
+            logger.error(f"Session store flush failed ({len(batch)} sessions), will retry: {e}", exc_info=True)
+            # Shu orada kelgan yangi yozuvlarni ustiga yozmaymiz
+            for telegram_id, session in batch.items():
+                self._pending.setdefault(telegram_id, session)
+            raise
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.flush_delay)  # Bir vaqtdagi yozuvlarni bitta partiyaga yig'amiz
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                await asyncio.sleep(1.0)
+                self._wakeup.set()
+
+
+# --- Jarayon bo'yicha yagona store ---
+_store = None
+
+
+def get_session_store() -> SessionStore:
+    global _store
+    if _store is None:
+        _store = SessionStore(build_backend(BOT_SESSION_BACKEND, BOT_SESSION_URL))
+    return _store
+
+
+async def start_session_store(application=None) -> None:
+    """Application.post_init uchun."""
+    await get_session_store().start()
+
+
+async def close_session_store(application=None) -> None:
+    """Application.post_shutdown uchun: yozilmagan sessiyalar diskka tushiriladi."""
+    global _store
+    if _store is not None:
+        await _store.close()
+        _store = None
@@ -0,0 +1,144 @@
+# bot/utils/transports.py
+"""
+make_api_request uchun transportlar. Ikkalasi ham bir xil interfeysga ega (httpx.AsyncClient kabi):
+request(method, url, headers=, json=, params=), get(), post(), aclose(), base_url.
+- 'http' (standart): alohida ishlayotgan API serverga (http_clients reyestridagi 'api' klienti).
+- 'inprocess': bot va API bitta jarayonda. So'rov HTTP/TCP'siz, to'g'ridan-to'g'ri DRF view'ga
+  uzatiladi (cheklangan thread pool'da), javob JSON'ga o'girilmasdan response.data sifatida qaytadi.
+  Permission, validatsiya, serializer va JWT autentifikatsiyasi HTTP'dagi bilan bir xil ishlaydi.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urljoin, urlsplit
+
+import httpx
+
+from ..config import API_BASE_URL, BOT_API_TRANSPORT, BOT_INPROCESS_WORKERS
+from .http_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+# HTTP sarlavhasi -> Django META kaliti
+_HEADER_META = {
+    'authorization': 'HTTP_AUTHORIZATION',
+    'accept': 'HTTP_ACCEPT',
+    'accept-language': 'HTTP_ACCEPT_LANGUAGE',
+    'if-none-match': 'HTTP_IF_NONE_MATCH',
+    'if-modified-since': 'HTTP_IF_MODIFIED_SINCE',
+    'idempotency-key': 'HTTP_IDEMPOTENCY_KEY',
+}
+
+
+class InProcessResponse:
+    """httpx.Response'ning make_api_request ishlatadigan qismi: status_code, headers, json(), text, raise_for_status()."""
+
+    def __init__(self, method: str, url: str, status_code: int, data=None, headers: dict | None = None):
+        self.request = httpx.Request(method, url)
+        self.status_code = status_code
+        self.headers = httpx.Headers(headers or {})
+        self._data = data
+
+    def json(self):
+        if self._data is None:
+            raise json.JSONDecodeError("No JSON content", "", 0)
+        # Yuqori daraja nusxalanadi (chaqiruvchi 'status_code' qo'shadi); ichki obyektlar katalog
+        # snapshoti bilan umumiy bo'lishi mumkin - ular faqat o'qish uchun.
+        if isinstance(self._data, dict):
+            return dict(self._data)
+        if isinstance(self._data, list):
+            return list(self._data)
+        return self._data
+
+    @property
+    def text(self) -> str:
+        return json.dumps(self._data, default=str, ensure_ascii=False) if self._data is not None else ''
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise httpx.HTTPStatusError(f"{self.status_code} for {self.request.url}", request=self.request,
+                                        response=self)
+
+
+class InProcessTransport:
+
+    def __init__(self, base_url: str = API_BASE_URL, max_workers: int = BOT_INPROCESS_WORKERS):
+        self.base_url = base_url
+        parts = urlsplit(base_url)
+        self._base_path = parts.path if parts.path.endswith('/') else f"{parts.path}/"
+        self._host = parts.netloc or 'localhost'
+        self._secure = parts.scheme == 'https'
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='api-inprocess')
+        self._dispatch_async = None
+        self._factory = None
+
+    def _setup(self):
+        # Django faqat birinchi so'rovda kerak (bot.py django.setup() ni bu moduldan keyin chaqiradi)
+        from asgiref.sync import sync_to_async
+        from rest_framework.test import APIRequestFactory
+        self._factory = APIRequestFactory()
+        self._dispatch_async = sync_to_async(self._dispatch, thread_sensitive=False, executor=self._executor)
+
+    def _path(self, url: str, params: dict | None) -> str:
+        parts = urlsplit(urljoin(self._base_path, url))
+        query = parts.query
+        if params:
+            query = f"{query}&{urlencode(params, doseq=True)}" if query else urlencode(params, doseq=True)
+        return f"{parts.path}?{query}" if query else parts.path
+
+    def _dispatch(self, method: str, path: str, headers: dict, body) -> InProcessResponse:
+        from django.db import close_old_connections
+        from django.urls import Resolver404, resolve
+        from django.utils import translation
+
+        url = f"{self.base_url.rstrip('/')}{path}"
+        close_old_connections()  # request_started/finished signallari kabi (CONN_MAX_AGE hisobga olinadi)
+        try:
+            try:
+                match = resolve(urlsplit(path).path)
+            except Resolver404:
+                return InProcessResponse(method, url, 404, {'detail': 'Not found.'})
+
+            meta = {_HEADER_META[name.lower()]: value for name, value in headers.items()
+                    if name.lower() in _HEADER_META}
+            request = self._factory.generic(
+                method, path, data=json.dumps(body) if body is not None else '',
+                content_type='application/json', secure=self._secure, HTTP_HOST=self._host, **meta
+            )
+            # LocaleMiddleware o'rniga: Accept-Language bo'yicha til faollashtiriladi
+            language = translation.get_language_from_request(request)
+            with translation.override(language):
+                request.LANGUAGE_CODE = language
+                response = match.func(request, *match.args, **match.kwargs)
+            data = getattr(response, 'data', None)
+            if data is None and response.content and response.get('Content-Type', '').startswith('application/json'):
+                data = json.loads(response.content)
+            return InProcessResponse(method, url, response.status_code, data, dict(response.headers))
+        except Exception as e:
+            logger.error(f"In-process API error for {method} {path}: {e}", exc_info=True)
+            return InProcessResponse(method, url, 500, {'detail': "Server xatoligi."})
+        finally:
+            close_old_connections()
+
+    async def request(self, method: str, url: str, *, headers: dict | None = None, json: dict | None = None,
+                      params: dict | None = None) -> InProcessResponse:
+        if self._dispatch_async is None:
+            self._setup()
+        return await self._dispatch_async(method.upper(), self._path(url, params), headers or {}, json)
+
+    async def get(self, url: str, **kwargs) -> InProcessResponse:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> InProcessResponse:
+        return await self.request('POST', url, **kwargs)
+
+    async def aclose(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+def build_api_transport(name: str = BOT_API_TRANSPORT):
+    """BOT_API_TRANSPORT bo'yicha: 'http' (alohida API server) yoki 'inprocess' (bitta jarayon)."""
+    if name == 'inprocess':
+        logger.info("Bot API transport: in-process (Django views called directly).")
+        return InProcessTransport()
+    return get_client('api')
@@ -0,0 +1,167 @@
+# bot/webhook.py
+"""
+Webhook rejimi: Telegram update'larni HTTPS orqali yuboradi, ASGI ilova ularni Application'ga uzatadi.
+Polling'dan farqi: bir nechta ulanishda parallel qabul qilinadi va qayta ishga tushirishda
+navbatdagi update'lar yo'qolmaydi (Telegram ularni o'zida saqlab, keyin qayta yuboradi).
+
+Ishga tushirish: BOT_MODE=webhook python -m bot.bot  (uvicorn kerak: pip install uvicorn)
+"""
+import json
+import hmac
+import logging
+
+from telegram import Update
+from telegram.ext import Application
+
+from .config import (
+    BOT_WEBHOOK_URL, BOT_WEBHOOK_PATH, BOT_WEBHOOK_SECRET, BOT_WEBHOOK_LISTEN, BOT_WEBHOOK_PORT,
+    BOT_WEBHOOK_MAX_CONNECTIONS, BOT_DROP_PENDING_UPDATES,
+)
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = b'x-telegram-bot-api-secret-token'
+MAX_BODY_SIZE = 1024 * 1024  # Telegram update'lari bundan ancha kichik
+
+
+class TelegramWebhookApp:
+    """
+    Minimal ASGI ilova (framework'siz):
+    - POST <path>: secret token tekshiriladi, update navbatga qo'yiladi va darhol 200 qaytadi.
+    - GET /healthz: holat.
+    - lifespan: Application'ni ishga tushiradi, webhook'ni o'rnatadi; to'xtashda yangi update'larni
+      qabul qilmaydi (503 - Telegram keyinroq qayta yuboradi) va navbatdagilarini oxirigacha bajaradi.
+    """
+
+    def __init__(self, application: Application, path: str = BOT_WEBHOOK_PATH, secret_token: str = BOT_WEBHOOK_SECRET,
+                 webhook_url: str | None = BOT_WEBHOOK_URL, max_connections: int = BOT_WEBHOOK_MAX_CONNECTIONS):
+        self.application = application
+        self.path = path
+        self.secret_token = secret_token.encode()
+        self.webhook_url = webhook_url
+        self.max_connections = max_connections
+        self.accepting = False
+        self.received = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    # --- Hayot sikli ---
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    logger.critical(f"Webhook startup failed: {e}", exc_info=True)
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def startup(self) -> None:
+        application = self.application
+        await application.initialize()
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        if self.webhook_url:
+            await application.bot.set_webhook(
+                url=f"{self.webhook_url.rstrip('/')}{self.path}",
+                secret_token=self.secret_token.decode(),
+                max_connections=self.max_connections,
+                allowed_updates=Update.ALL_TYPES,
+                drop_pending_updates=BOT_DROP_PENDING_UPDATES,
+            )
+            logger.info(f"Webhook set: {self.webhook_url}{self.path} (max_connections={self.max_connections})")
+        self.accepting = True
+
+    async def shutdown(self) -> None:
+        """Webhook o'chirilmaydi: to'xtab turgan paytdagi update'lar Telegram'da navbatda kutadi."""
+        self.accepting = False
+        application = self.application
+        pending = application.update_queue.qsize()
+        logger.info(f"Webhook draining: {pending} queued updates, received {self.received} in total.")
+        if application.running:
+            await application.stop()  # Navbatdagi update'lar va create_task vazifalari tugashini kutadi
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+        logger.info("Webhook drained and application shut down.")
+
+    # --- HTTP ---
+    async def _http(self, scope, receive, send):
+        method, path = scope['method'], scope['path']
+        if path == '/healthz' and method == 'GET':
+            status = 200 if self.accepting else 503
+            return await _respond(send, status, json.dumps({
+                'accepting': self.accepting, 'queued': self.application.update_queue.qsize(),
+                'received': self.received,
+            }).encode(), content_type=b'application/json')
+        if path != self.path:
+            return await _respond(send, 404)
+        if method != 'POST':
+            return await _respond(send, 405)
+
+        headers = dict(scope['headers'])
+        if not hmac.compare_digest(headers.get(SECRET_HEADER, b''), self.secret_token):
+            logger.warning(f"Webhook request with invalid secret token from {scope.get('client')}")
+            return await _respond(send, 403)
+        if not self.accepting:
+            return await _respond(send, 503)  # To'xtayapmiz: Telegram update'ni keyinroq qayta yuboradi
+
+        body = await _read_body(receive)
+        if body is None:
+            return await _respond(send, 413)
+        try:
+            update = Update.de_json(json.loads(body), self.application.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Webhook received invalid update payload: {e}")
+            return await _respond(send, 400)
+        if update is None:
+            return await _respond(send, 400)
+
+        self.received += 1
+        await self.application.update_queue.put(update)
+        await _respond(send, 200)
+
+
+async def _read_body(receive) -> bytes | None:
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_SIZE:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _respond(send, status: int, body: bytes = b'', content_type: bytes = b'text/plain') -> None:
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', content_type), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def run_webhook(application: Application) -> None:
+    """ASGI ilovani uvicorn bilan ishga tushiradi (SIGTERM/SIGINT'da lifespan.shutdown - drenaj)."""
+    try:
+        import uvicorn
+    except ImportError as e:
+        raise ImportError("BOT_MODE=webhook uchun 'uvicorn' paketini o'rnating (pip install uvicorn).") from e
+    if not BOT_WEBHOOK_SECRET:
+        raise ValueError("BOT_MODE=webhook uchun BOT_WEBHOOK_SECRET ni o'rnating.")
+    logger.info(f"Starting webhook server on {BOT_WEBHOOK_LISTEN}:{BOT_WEBHOOK_PORT}{BOT_WEBHOOK_PATH}")
+    uvicorn.run(TelegramWebhookApp(application), host=BOT_WEBHOOK_LISTEN, port=BOT_WEBHOOK_PORT,
+                lifespan='on', log_level='info', timeout_graceful_shutdown=30)
@@ -0,0 +1,79 @@
+# bot/webhook_loadgen.py
+"""
+Webhook endpoint'iga sintetik Update JSON'larini yuborib, o'tkazuvchanlikni o'lchaydi.
+Misol: python -m bot.webhook_loadgen --url http://127.0.0.1:8443/telegram/webhook --count 5000 --concurrency 40
+Eslatma: update'lar haqiqiy handlerlarga tushadi; test uchun alohida (test) bot tokenidan foydalaning.
+"""
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+import httpx
+
+from .config import BOT_WEBHOOK_SECRET, BOT_WEBHOOK_PORT, BOT_WEBHOOK_PATH
+from .utils.callback_data import encode_callback
+
+
+def make_update(update_id: int, user_id: int, kind: str) -> dict:
+    user = {'id': user_id, 'is_bot': False, 'first_name': f"Load{user_id}", 'language_code': 'uz'}
+    chat = {'id': user_id, 'type': 'private', 'first_name': user['first_name']}
+    now = int(time.time())
+    if kind == 'callback':
+        return {
+            'update_id': update_id,
+            'callback_query': {
+                'id': str(update_id), 'from': user, 'chat_instance': str(user_id), 'data': encode_callback('cart_info', 0),
+                'message': {'message_id': 1, 'date': now, 'chat': chat, 'text': '-'},
+            },
+        }
+    return {
+        'update_id': update_id,
+        'message': {'message_id': update_id, 'date': now, 'chat': chat, 'from': user, 'text': 'loadtest'},
+    }
+
+
+async def run(url: str, secret: str, count: int, concurrency: int, users: int, kind: str) -> None:
+    latencies, statuses = [], {}
+    counter = iter(range(1, count + 1))
+
+    async def worker(client: httpx.AsyncClient):
+        for update_id in counter:
+            payload = make_update(update_id, random.randint(1, users), kind)
+            started = time.perf_counter()
+            try:
+                response = await client.post(url, json=payload, headers={'X-Telegram-Bot-Api-Secret-Token': secret})
+                code = response.status_code
+            except httpx.HTTPError as e:
+                code = type(e).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[code] = statuses.get(code, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+    print(f"updates={count} concurrency={concurrency} kind={kind} elapsed={elapsed:.2f}s "
+          f"throughput={count / elapsed:.0f} upd/s statuses={statuses}")
+    print(f"latency p50={statistics.median(latencies):.1f}ms p95={p95:.1f}ms max={latencies[-1]:.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Webhook endpoint uchun yuklama generatori")
+    parser.add_argument('--url', default=f"http://127.0.0.1:{BOT_WEBHOOK_PORT}{BOT_WEBHOOK_PATH}")
+    parser.add_argument('--secret', default=BOT_WEBHOOK_SECRET)
+    parser.add_argument('--count', type=int, default=2000, help="Yuboriladigan update'lar soni")
+    parser.add_argument('--concurrency', type=int, default=40, help="Bir vaqtdagi ulanishlar (max_connections kabi)")
+    parser.add_argument('--users', type=int, default=500, help="Turli foydalanuvchilar soni")
+    parser.add_argument('--kind', choices=('message', 'callback'), default='message')
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.secret, args.count, args.concurrency, args.users, args.kind))
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const productsListDiv = document.getElementById('products-list'); // Yangi div
     const loadingDiv = document.getElementById('loading');
     const errorDiv = document.getElementById('error');
+    const searchInput = document.getElementById('product-search');
 
     const API_BASE_URL = 'http://127.0.0.1:8000/api/v1/';
     const userLanguage = tg.initDataUnsafe?.user?.language_code || 'uz';
@@ -22,6 +23,7 @@ document.addEventListener('DOMContentLoaded', function() {
         try {
             const response = await fetch(API_BASE_URL + 'categories/', {
                 method: 'GET',
+                cache: 'no-cache', // Brauzer keshini ETag orqali tekshiradi (304 bo'lsa qayta yuklamaydi)
                 headers: { 'Accept': 'application/json', 'Accept-Language': userLanguage }
             });
             if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
@@ -64,13 +66,24 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // --- YANGI: Mahsulotlarni olish va ko'rsatish funksiyasi ---
-    async function fetchAndDisplayProducts(categoryId) {
+    let productsRequest = null; // Yozish davomida eskirgan so'rovni bekor qilish uchun
+
+    async function fetchAndDisplayProducts(categoryId, searchQuery = '') {
         productsListDiv.innerHTML = '<p>Mahsulotlar yuklanmoqda...</p>'; // Yuklanish xabari
         errorDiv.style.display = 'none'; // Eski xatoni yashirish
 
+        if (productsRequest) productsRequest.abort();
+        productsRequest = new AbortController();
+
+        const params = new URLSearchParams();
+        if (categoryId) params.set('category_id', categoryId);
+        if (searchQuery) params.set('search', searchQuery);
+
         try {
-            const response = await fetch(`${API_BASE_URL}products/?category_id=${categoryId}`, { // Kategoriya ID si bilan so'rov
+            const response = await fetch(`${API_BASE_URL}products/?${params.toString()}`, { // Kategoriya/qidiruv bilan so'rov
                 method: 'GET',
+                signal: productsRequest.signal,
+                cache: 'no-cache', // ETag/Last-Modified bilan qayta tekshirish
                 headers: { 'Accept': 'application/json', 'Accept-Language': userLanguage }
                 // Agar mahsulotlarni ko'rish uchun ham login kerak bo'lsa, 'Authorization' qo'shiladi
             });
@@ -83,6 +96,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 displayProducts([]);
             }
         } catch (error) {
+            if (error.name === 'AbortError') return; // Yangiroq so'rov yuborilgan
             console.error(`Kategoriya ${categoryId} uchun mahsulotlarni olishda xatolik:`, error);
             productsListDiv.innerHTML = `<p style="color: red;">Mahsulotlarni yuklashda xatolik: ${error.message}</p>`;
         }
@@ -133,6 +147,20 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
 
+    // --- Qidiruv: yozish davomida (har bir harfdan keyin emas, 250 ms pauzadan keyin) ---
+    let searchTimer = null;
+    searchInput.addEventListener('input', () => {
+        clearTimeout(searchTimer);
+        const searchQuery = searchInput.value.trim();
+        searchTimer = setTimeout(() => {
+            if (searchQuery.length === 0) {
+                productsListDiv.innerHTML = '<p>Iltimos, yuqoridan kategoriya tanlang.</p>';
+                return;
+            }
+            fetchAndDisplayProducts(null, searchQuery);
+        }, 250);
+    });
+
     // Sahifa yuklanganda kategoriyalarni olib kelamiz
     fetchCategories();
 